@@ -0,0 +1,128 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+import time
+import tempfile
+import backtrader as bt
+import strategy
+from utility import *
+from optimal import get_trade_labels, get_trade_labels_many, labels_to_dict, label_trades_jit
+from strategy import BTStrategy, sweep_thresholds
+
+def random_walk(length, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def benchmark(length, series, tolerances):
+    prices = random_walk(length)
+    results = {}
+    results['python'], expected = timed(get_trade_labels, prices, tolerances[0], jit=False)
+    if label_trades_jit:
+        # compile before timing
+        get_trade_labels(prices[:10], tolerances[0])
+        get_trade_labels_many([prices[:10]], tolerances[:1])
+        results['jit'], labels = timed(get_trade_labels, prices, tolerances[0])
+        if labels_to_dict(labels) != labels_to_dict(expected):
+            raise Exception('JIT labels differ from the Python labels')
+    prices_list = [random_walk(length // series, seed) for seed in range(series)]
+    results['batch'], _ = timed(get_trade_labels_many, prices_list, tolerances)
+    return results
+
+def random_bars(length, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = random_walk(length, seed)
+    opens = closes * np.exp(rng.normal(0, 0.005, length))
+    highs = np.maximum(opens, closes) * (1 + np.abs(rng.normal(0, 0.004, length)))
+    lows = np.minimum(opens, closes) * (1 - np.abs(rng.normal(0, 0.004, length)))
+    predictions = np.tanh(rng.normal(0, 1.2, length))
+    dates = [str(d) for d in np.busday_offset('2000-01-03', np.arange(length), roll='forward')]
+    return dates, opens, highs, lows, closes, predictions
+
+# trades of one threshold with backtrader, set up as Strategy.get_cerebro
+def backtrader_trades(path, dates, predictions, threshold):
+    cerebro = bt.Cerebro()
+    cerebro.addstrategy(BTStrategy, threshold=threshold,
+                        predictions=dict(zip(dates, predictions.tolist())))
+    cerebro.adddata(bt.feeds.GenericCSVData(
+        dataname=path, fromdate=to_date(dates[0]), todate=to_date(dates[-1]),
+        dtformat=('%Y-%m-%d'), openinterest=-1, open=1, high=2, low=3, close=4, volume=5))
+    cerebro.broker.setcash(strategy.INITIAL_FUNDS)
+    cerebro.broker.setcommission(commission=strategy.COMMISION)
+    cerebro.broker.set_slippage_perc(strategy.SLIPPAGE)
+    cerebro.addsizer(bt.sizers.FixedSize, stake=strategy.STAKE)
+    return cerebro.run()[0].get_results()
+
+# a threshold sweep with the vectorized kernel against backtrader, which runs one
+# threshold per cerebro run and is timed once and scaled by the thresholds
+def benchmark_sweep(length, count):
+    dates, opens, highs, lows, closes, predictions = random_bars(length)
+    thresholds = np.linspace(0.05, 0.95, count)
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'feed.csv')
+        with open(path, 'w') as fh:
+            fh.write('Date,open,high,low,close,volume\n')
+            for row in zip(dates, opens, highs, lows, closes):
+                fh.write(','.join([row[0]] + [repr(float(v)) for v in row[1:]]) + ',1000\n')
+        seconds, expected = timed(backtrader_trades, path, dates, predictions, thresholds[0])
+        results['backtrader'] = seconds * count
+    # the feed's todate excludes the last date
+    arrays = [dates[:-1]] + [a[:-1] for a in [opens, highs, lows, closes, predictions]]
+    # compile before timing
+    sweep_thresholds(*arrays, thresholds[:1])
+    results['vectorized'], trades = timed(sweep_thresholds, *arrays, thresholds)
+    if trades[0] != expected:
+        raise Exception('Vectorized trades differ from the backtrader trades')
+    return results
+
+def add_args(parser):
+    parser.add_argument('-n', '--length', type=int, default=1000000,
+                        help='number of prices to label')
+    parser.add_argument('--series', type=int, default=10,
+                        help='number of series the batch splits the prices into')
+    parser.add_argument('-t', '--tolerances', type=float, nargs='+', default=[0.01, 0.02, 0.05],
+                        help='tolerances labeled by the batch')
+    parser.add_argument('--bars', type=int, default=500,
+                        help='number of bars in the strategy threshold sweep')
+    parser.add_argument('--thresholds', type=int, default=20,
+                        help='number of thresholds in the strategy threshold sweep')
+
+def handle_args(args, parser):
+    pass
+
+def main():
+    args = parse_args('Benchmark optimal trade labeling and strategy threshold sweeps.', add_args, handle_args)
+    results = benchmark(args.length, args.series, args.tolerances)
+    for name, seconds in results.items():
+        log('%s: %.3f s' % (name, seconds), force=True)
+    log('batch: %d series x %d tolerances' % (args.series, len(args.tolerances)), force=True)
+    results = benchmark_sweep(args.bars, args.thresholds)
+    for name, seconds in results.items():
+        log('sweep %s: %.3f s' % (name, seconds), force=True)
+    log('sweep speedup: %.0fx' % (results['backtrader'] / results['vectorized']), force=True)
+
+if __name__ == '__main__':
+    main()
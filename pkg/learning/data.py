@@ -54,7 +54,7 @@ class Data:
 
     def get_base_path(self):
         if not self.path:
-            file_name = shorten_path(encrypt_dict(self.params))
+            file_name = hash_dict(self.params)
             cwd = os.getcwd()
             self.path = os.path.join(cwd, PARAMS['data_folder'], self.get_folder(), file_name)
         return self.path
@@ -0,0 +1,172 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, RLock
+from collections import deque
+from requests.adapters import HTTPAdapter
+import requests
+import json
+import time
+from utility import *
+
+ALPHAVANTAGE_URL = 'https://www.alphavantage.co/query'
+# API quota, requests per period seconds
+CALLS_PER_MINUTE = 5
+PERIOD = 60
+WORKERS = 4
+# cached responses older than this many seconds are downloaded again
+MAX_AGE = 12 * 60 * 60
+# retries and wait in seconds when the API reports the quota was exceeded
+RETRIES = 3
+RETRY_WAIT = 60
+# response keys AlphaVantage uses for quota messages
+THROTTLE_KEYS = ['Note', 'Information']
+
+class DownloadException(Exception):
+    pass
+
+# sliding window of request times, blocks until a request is allowed
+class RateLimiter:
+
+    def __init__(self, calls, period):
+        self.calls = calls
+        self.period = period
+        self.times = deque()
+        self.lock = Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.times and now - self.times[0] >= self.period:
+                    self.times.popleft()
+                if len(self.times) < self.calls:
+                    self.times.append(now)
+                    return
+                wait = self.period - (now - self.times[0])
+            time.sleep(wait)
+
+class DownloadManager:
+
+    def __init__(self, url=ALPHAVANTAGE_URL, calls=CALLS_PER_MINUTE, period=PERIOD,
+                 workers=WORKERS, max_age=MAX_AGE, retry_wait=RETRY_WAIT, folder=None):
+        self.url = url
+        self.limiter = RateLimiter(calls, period)
+        self.pool = ThreadPoolExecutor(workers)
+        self.max_age = max_age
+        self.retry_wait = retry_wait
+        self.folder = folder
+        self.session = requests.Session()
+        self.session.mount(url, HTTPAdapter(pool_maxsize=workers))
+        # key -> future of requests in flight, shared by identical requests
+        self.pending = {}
+        self.lock = RLock()
+        self.downloads = 0
+
+    def get_folder(self):
+        return self.folder or os.path.join(os.getcwd(), PARAMS['data_folder'], 'download')
+
+    def get_cache_path(self, key):
+        return os.path.join(self.get_folder(), key + '.json')
+
+    # options exclude the API key, which is added to the request only
+    def submit(self, options, max_age=None):
+        key = hash_dict(options)
+        with self.lock:
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pool.submit(self.fetch, key, options, max_age)
+                self.pending[key] = future
+                future.add_done_callback(lambda f: self.finish(key))
+            return future
+
+    def get(self, options, max_age=None):
+        return self.submit(options, max_age).result()
+
+    def get_all(self, options_list, max_age=None):
+        futures = [self.submit(options, max_age) for options in options_list]
+        return [future.result() for future in futures]
+
+    def finish(self, key):
+        with self.lock:
+            self.pending.pop(key, None)
+
+    def fetch(self, key, options, max_age):
+        data = self.read_cache(key, self.max_age if max_age is None else max_age)
+        if data is not None:
+            return data
+        data = self.download(options)
+        self.write_cache(key, options, data)
+        return data
+
+    def download(self, options):
+        for retry in range(RETRIES + 1):
+            self.limiter.acquire()
+            log('Requesting %s...' % options)
+            data = self.session.get(self.url, params={**options, 'apikey': API_KEY}).json()
+            self.downloads += 1
+            if 'Error Message' in data:
+                raise DownloadException(data['Error Message'])
+            if not is_throttled(data):
+                return data
+            log('Request quota exceeded, retrying in %s seconds...' % self.retry_wait)
+            time.sleep(self.retry_wait)
+        raise DownloadException('Request quota exceeded: %s' % options)
+
+    # responses are stale once older than max_age or a newer trading day has closed
+    def read_cache(self, key, max_age):
+        path = self.get_cache_path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as fh:
+            cached = json.load(fh)
+        if time.time() - cached['fetched'] > max_age or cached['weekday'] != get_latest_weekday():
+            return None
+        return cached['response']
+
+    def write_cache(self, key, options, data):
+        path = self.get_cache_path(key)
+        make_path(path)
+        cached = {
+            'options': options,
+            'fetched': time.time(),
+            'weekday': get_latest_weekday(),
+            'response': data
+        }
+        with open(path + '.tmp', 'w') as fh:
+            json.dump(cached, fh)
+        os.replace(path + '.tmp', path)
+
+def is_throttled(data):
+    return any(key in data for key in THROTTLE_KEYS) and len(data) == 1
+
+MANAGER = None
+
+def get_manager():
+    global MANAGER
+    if MANAGER is None:
+        MANAGER = DownloadManager()
+    return MANAGER
+
+def set_manager(manager):
+    global MANAGER
+    MANAGER = manager
@@ -0,0 +1,112 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from binascii import unhexlify
+from Crypto.Cipher import AES
+from utility import *
+import csv
+
+# key the column names and cache folders were AES encrypted with
+LEGACY_CRYPT_KEY = b'1234567890123456'
+
+def legacy_decrypt(crypt):
+    e = AES.new(LEGACY_CRYPT_KEY, AES.MODE_CFB, LEGACY_CRYPT_KEY)
+    s = e.decrypt(unhexlify(crypt))
+    return json.loads(s.decode('utf-8'))
+
+def migrate_column(column, dry_run):
+    if column == 'Date' or column in read_key_index():
+        return column
+    options = legacy_decrypt(column)
+    key = hash_dict(options)
+    if not dry_run:
+        register_keys({key: options})
+    return key
+
+def migrate_csv(path, dry_run):
+    with open(path, 'r', newline='') as fh:
+        rows = list(csv.reader(fh))
+    if not rows:
+        return False
+    headers = [migrate_column(column, dry_run) for column in rows[0]]
+    if headers == rows[0]:
+        return False
+    log('Rewriting headers of', path)
+    if not dry_run:
+        with open(path + '.tmp', 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(headers)
+            writer.writerows(rows[1:])
+        os.replace(path + '.tmp', path)
+    return True
+
+# SymbolData folders are keyed by symbol alone, params.pkl holds the rest
+def get_folder_params(folder, params):
+    if folder == 'symbol':
+        return {'symbol': params['symbol']}
+    return params
+
+def migrate_data(data_folder, dry_run=False):
+    PARAMS['data_folder'] = data_folder
+    root = os.path.join(os.getcwd(), data_folder)
+    counts = {'folders': 0, 'csvs': 0, 'skipped': 0}
+    for folder in sorted(os.listdir(root)):
+        folder_path = os.path.join(root, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        for name in sorted(os.listdir(folder_path)):
+            path = os.path.join(folder_path, name)
+            params = read_pickle(os.path.join(path, 'params.pkl'))
+            if params is None:
+                continue
+            for file_name in os.listdir(path):
+                if file_name.endswith('.csv'):
+                    counts['csvs'] += migrate_csv(os.path.join(path, file_name), dry_run)
+            new_path = os.path.join(folder_path, hash_dict(get_folder_params(folder, params)))
+            if new_path == path:
+                continue
+            if os.path.exists(new_path):
+                log('Skipping', path, 'as', new_path, 'exists', force=True)
+                counts['skipped'] += 1
+                continue
+            log('Moving', path, 'to', new_path)
+            if not dry_run:
+                os.rename(path, new_path)
+            counts['folders'] += 1
+    return counts
+
+def add_args(parser):
+    parser.add_argument('-d', '--data-folder', type=str, default=PARAMS['data_folder'],
+                        help='data folder to migrate')
+    parser.add_argument('-n', '--dry-run', action='store_true',
+                        help='report changes without making them')
+
+def handle_args(args, parser):
+    if not os.path.isdir(args.data_folder):
+        parser.error('No data folder ' + args.data_folder)
+
+def main():
+    args = parse_args('Migrate cached data to hashed column and folder keys.', add_args,
+                      handle_args)
+    counts = migrate_data(args.data_folder, args.dry_run)
+    log(counts, force=True)
+
+if __name__ == '__main__':
+    main()
@@ -25,11 +25,17 @@ from kur import Kurfile
 from kur.engine import JinjaEngine
 from kur.utils import DisableLogging
 from sys import stdout
+from threading import Lock
 import preprocess
 from analysis import get_accuracy, get_average_distance
 from utility import *
 from data import Data
 
+# (model path, weights path, weights mtimes) -> compiled model with restored
+# weights, reloaded when the model is retrained
+MODELS = {}
+MODEL_LOCK = Lock()
+
 class NeuralNetwork(Data):
 
     def __init__(self, **params):
@@ -87,16 +93,42 @@ class NeuralNetwork(Data):
         return make_model(training, validation, evaluation, folder, self.epochs,
                           self.nodes, self.activation, self.loss, part_data.get_shape())
 
+    def get_compiled_model(self):
+        return load_model(self.get_model_path(), self.get_path('weights'))
+
     def predict(self, data):
-        kurfile = Kurfile(self.get_model_path(), JinjaEngine())
-        kurfile.parse()
-        model = kurfile.get_model()
-        with DisableLogging(logging.WARNING):
-            model.backend.compile(model)
-        model.restore(self.get_path('weights'))
-        pdf, metrics = model.backend.evaluate(model, data={'in': np.array([data])})
-        prediction = pdf['out'][0][0]
-        return prediction
+        return self.predict_many(np.array([data]))[0]
+
+    # one prediction per row of matrix, in a single evaluation pass
+    def predict_many(self, matrix):
+        model = self.get_compiled_model()
+        pdf, metrics = model.backend.evaluate(model, data={'in': np.asarray(matrix)})
+        return np.asarray(pdf['out'])[:, 0]
+
+def get_mtime(path):
+    # weights are saved as a folder of files, rewritten in place on retraining
+    if not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        return tuple(sorted((entry.name, entry.stat().st_mtime_ns)
+                            for entry in os.scandir(path)))
+    return os.stat(path).st_mtime_ns
+
+def load_model(model_path, weights_path):
+    key = (model_path, weights_path, get_mtime(weights_path))
+    with MODEL_LOCK:
+        if key not in MODELS:
+            kurfile = Kurfile(model_path, JinjaEngine())
+            kurfile.parse()
+            model = kurfile.get_model()
+            with DisableLogging(logging.WARNING):
+                model.backend.compile(model)
+            model.restore(weights_path)
+            # drop models compiled from earlier weights
+            for old in [k for k in MODELS if k[:2] == key[:2]]:
+                del MODELS[old]
+            MODELS[key] = model
+        return MODELS[key]
 
 def make_model(training, validation, evaluation, folder, epochs, nodes, activation, loss, shape):
     with open('model.yml', 'r') as fh:
@@ -135,6 +167,9 @@ def get_loss(log_path, path):
 
 def add_args(parser):
     preprocess.add_args(parser)
+    add_model_args(parser)
+
+def add_model_args(parser):
     parser.add_argument('-e', '--epochs', type=int, default=50,
                         help='number of epochs to train for')
     parser.add_argument('-n', '--nodes', type=int, default=128,
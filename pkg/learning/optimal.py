@@ -22,6 +22,14 @@ from __future__ import (absolute_import, division, print_function, unicode_liter
 from data import Data
 from utility import *
 from symbol import SymbolCloseData, add_symbol_args, handle_symbol_args, handle_date_args
+from types import FunctionType
+
+# compile the labeling kernels if numba is installed
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
 
 BUY = 1
 SELL = -1
@@ -60,48 +68,85 @@ def get_optimal_trades(symbol, start, end, tolerance):
 
 def calc_trades(data, tolerance):
     dates = sorted(data)
-    prices = [data[date] for date in dates]
-    trades = optimize_trades(prices, tolerance)
-    trades = smooth_trades(trades, prices)
-    trade_data = {dates[key]: val for key, val in trades.items()}
-    return trade_data
+    labels = get_trade_labels([data[date] for date in dates], tolerance)
+    return labels_to_dict(labels, dates)
+
+# dense labels, BUY/SELL at trades, smoothed between trades and nan elsewhere
+def get_trade_labels(prices, tolerance, jit=True):
+    prices = np.asarray(prices, dtype=float)
+    return smooth_labels(optimize_labels(prices, tolerance, jit), prices)
+
+# labels for every series and tolerance, one (tolerances, len(series)) array per series
+def get_trade_labels_many(prices_list, tolerances, jit=True):
+    series = [np.asarray(prices, dtype=float) for prices in prices_list]
+    offsets = np.cumsum([0] + [len(prices) for prices in series])
+    prices = np.concatenate(series) if series else np.empty(0)
+    tolerances = np.asarray(tolerances, dtype=float)
+    labels = np.full((len(tolerances), len(prices)), np.nan)
+    kernel = label_batch_jit if jit and label_batch_jit else label_batch
+    kernel(prices, offsets, tolerances, labels)
+    return [
+        np.array([smooth_labels(row[start:end], series[i]) for row in labels])
+        for i, (start, end) in enumerate(zip(offsets[:-1], offsets[1:]))
+    ]
+
+def labels_to_dict(labels, keys=None):
+    indices = np.flatnonzero(~np.isnan(labels))
+    keys = range(len(labels)) if keys is None else keys
+    return {keys[i]: v for i, v in zip(indices.tolist(), labels[indices].tolist())}
+
+def dict_to_labels(trades, length):
+    labels = np.full(length, np.nan)
+    labels[list(trades)] = list(trades.values())
+    return labels
 
 def smooth_trades(trades, prices):
-    if len(trades) < 2:
-        return trades
-
-    ordered_trades = sorted(trades.items())
-
-    for i, (date, trade) in enumerate(ordered_trades[1:]):
-        last_date = ordered_trades[i][0]
-        if trade == BUY:
-            buy_price = prices[date]
-            sell_price = prices[last_date]
-        else:
-            buy_price = prices[last_date]
-            sell_price = prices[date]
-        for j, price in enumerate(prices[last_date + 1:date]):
-            trades[last_date + 1 + j] = smooth_trade(price, buy_price, sell_price)
+    prices = np.asarray(prices, dtype=float)
+    return labels_to_dict(smooth_labels(dict_to_labels(trades, len(prices)), prices))
 
-    return trades
+# fill between consecutive trades with the price's position from the buy to the sell price
+def smooth_labels(labels, prices):
+    labels = labels.copy()
+    trades = np.flatnonzero(~np.isnan(labels))
+    if len(trades) < 2:
+        return labels
+    buying = labels[trades[1:]] == BUY
+    buy_prices = np.where(buying, prices[trades[1:]], prices[trades[:-1]])
+    sell_prices = np.where(buying, prices[trades[:-1]], prices[trades[1:]])
+    between = np.arange(trades[0] + 1, trades[-1])
+    between = between[np.isnan(labels[between])]
+    segments = np.searchsorted(trades, between) - 1
+    labels[between] = smooth_trade(prices[between], buy_prices[segments], sell_prices[segments])
+    return labels
 
 def smooth_trade(price, buy_price, sell_price):
     return 1 - 2 * (price - buy_price) / (sell_price - buy_price)
 
 def optimize_trades(prices, tolerance):
+    return labels_to_dict(optimize_labels(np.asarray(prices, dtype=float), tolerance))
+
+def optimize_labels(prices, tolerance, jit=True):
+    labels = np.full(len(prices), np.nan)
+    if label_trades_jit and jit:
+        label_trades_jit(prices, tolerance, labels)
+    else:
+        # plain lists iterate faster than arrays without the JIT
+        label_trades(prices.tolist(), tolerance, labels)
+    return labels
+
+def label_trades(prices, tolerance, labels):
     if len(prices) < 2:
-        return {}
+        return
 
     # determine whether to buy or sell first
     buying = should_buy_first(prices, tolerance)
 
     delay = 0
-    trades = {}
 
     # determine when to buy and sell
-    for index, price in enumerate(prices[1:]):
-        index -= delay  # index is behind by one = index - 1
-        price_diff = (price - prices[index]) / prices[index]
+    for i in range(1, len(prices)):
+        index = i - 1 - delay
+        price_diff = (prices[i] - prices[index]) / prices[index]
 
         if buying:  # looking to buy
             if 0 <= price_diff <= tolerance:
@@ -109,7 +154,7 @@ def optimize_trades(prices, tolerance):
             else:
                 delay = 0
                 if price_diff > 0:
-                    trades[index] = BUY
+                    labels[index] = BUY
                     buying = False
         else:  # looking to sell
             if -tolerance <= price_diff <= 0:
@@ -117,17 +162,15 @@ def optimize_trades(prices, tolerance):
             else:
                 delay = 0
                 if price_diff < 0:
-                    trades[index] = SELL
+                    labels[index] = SELL
                     buying = True
 
-    return trades
-
 def should_buy_first(prices, tolerance):
     delay = 0
 
-    for index, price in enumerate(prices[1:]):
-        index -= delay  # index is behind by one = index - 1
-        price_diff = (price - prices[index]) / prices[index]
+    for i in range(1, len(prices)):
+        index = i - 1 - delay
+        price_diff = (prices[i] - prices[index]) / prices[index]
 
         if 0 <= price_diff <= tolerance:
             delay += 1
@@ -142,6 +185,30 @@ def should_buy_first(prices, tolerance):
             if price_diff < 0:
                 return False
 
+    return False
+
+def label_batch(prices, offsets, tolerances, labels):
+    series = len(offsets) - 1
+    for job in prange(len(tolerances) * series):
+        t = job // series
+        s = job % series
+        label_trades(prices[offsets[s]:offsets[s + 1]], tolerances[t],
+                     labels[t, offsets[s]:offsets[s + 1]])
+
+# compile function with its calls to other kernels resolved to their compiled versions
+def jit_kernel(function, parallel=False, **kernels):
+    function = FunctionType(function.__code__, {**function.__globals__, **kernels},
+                            function.__name__)
+    return njit(parallel=parallel)(function)
+
+if njit is not None:
+    should_buy_first_jit = jit_kernel(should_buy_first)
+    label_trades_jit = jit_kernel(label_trades, should_buy_first=should_buy_first_jit)
+    label_batch_jit = jit_kernel(label_batch, parallel=True, label_trades=label_trades_jit)
+else:
+    label_trades_jit = None
+    label_batch_jit = None
+
 def get_optimal_trades_dict(symbols, start, end, tolerance):
     trades = {}
     for symbol in symbols:
@@ -17,3 +17,113 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Queue
+from itertools import product
+import random
+import json
+import neural
+from neural import NeuralNetwork
+from preprocess import NeuralNetworkData
+from analysis import get_accuracy, get_average_distance
+from utility import *
+
+# NeuralNetwork params a sweep can vary, days and tolerance change the preprocessed data
+SWEEP_KEYS = ['days', 'tolerance', 'epochs', 'nodes', 'activation', 'loss']
+RESULT_KEYS = ['accuracy', 'average_distance']
+
+def get_configs(grid, defaults, samples=None, seed=None):
+    keys = sorted(grid)
+    configs = [{**defaults, **dict(zip(keys, values))}
+               for values in product(*[grid[k] for k in keys])]
+    # random search samples the grid instead of training all of it
+    if samples and samples < len(configs):
+        configs = random.Random(seed).sample(configs, samples)
+    return configs
+
+# each distinct days and tolerance is preprocessed once, trainings read it from disk
+def preprocess_configs(parts, options_list, configs):
+    for days, tolerance in remove_duplicates([(c['days'], c['tolerance']) for c in configs]):
+        NeuralNetworkData(**parts, options_list=options_list, days=days, tolerance=tolerance)
+
+def pin_worker(cpus):
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpus.get()})
+
+def get_cpus(workers):
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') \
+        else list(range(os.cpu_count()))
+    queue = Queue()
+    for i in range(workers):
+        queue.put(cpus[i % len(cpus)])
+    return queue
+
+# finished configs are read back from their NeuralNetwork data folder
+def train_config(parts, options_list, config):
+    data = NeuralNetwork(**parts, options_list=options_list, **config).get_data()
+    return {**config, **{
+        'accuracy': get_accuracy(data['output']),
+        'average_distance': get_average_distance(data['output'])
+    }}
+
+def sweep(parts, options_list, configs, workers):
+    preprocess_configs(parts, options_list, configs)
+    with ProcessPoolExecutor(workers, initializer=pin_worker,
+                             initargs=(get_cpus(workers),)) as pool:
+        futures = [pool.submit(train_config, parts, options_list, c) for c in configs]
+        return rank_results([f.result() for f in futures])
+
+def rank_results(results):
+    return sorted(results, key=lambda r: (
+        -(r['accuracy'] or 0),
+        float('inf') if r['average_distance'] is None else r['average_distance']))
+
+def format_results(results):
+    keys = ['rank'] + SWEEP_KEYS + RESULT_KEYS
+    rows = [keys] + [[str(i + 1)] + [str(r[k]) for k in keys[1:]]
+                     for i, r in enumerate(results)]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(keys))]
+    return '\n'.join('  '.join(v.ljust(w) for v, w in zip(row, widths)).rstrip() for row in rows)
+
+def parse_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+def parse_grid(specs):
+    grid = {}
+    for spec in specs:
+        key, values = spec.split('=')
+        if key not in SWEEP_KEYS:
+            raise Exception('%s is not one of %s' % (key, SWEEP_KEYS))
+        grid[key] = [parse_value(v) for v in values.split(',')]
+    return grid
+
+def add_args(parser):
+    neural.add_args(parser)
+    parser.add_argument('-g', '--grid', type=str, nargs='+', default=[],
+                        help='values to sweep as key=v1,v2 with keys from %s' % SWEEP_KEYS)
+    parser.add_argument('--random', type=int,
+                        help='train this many configurations sampled from the grid')
+    parser.add_argument('--seed', type=int, help='random search seed')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='number of trainings to run in parallel')
+
+def handle_args(args, parser):
+    neural.handle_args(args, parser)
+    try:
+        args.grid = parse_grid(args.grid)
+    except Exception as e:
+        parser.error(str(e))
+    args.defaults = {k: getattr(args, k) for k in SWEEP_KEYS}
+
+def main():
+    args = parse_args('Sweep neural network hyperparameters.', add_args, handle_args)
+    configs = get_configs(args.grid, args.defaults, args.random, args.seed)
+    results = sweep(args.parts, args.options_list, configs, args.workers)
+    log(format_results(results), force=args.print)
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,8 @@
 # THE SOFTWARE.
 
 from argparse import Action
+from concurrent.futures import ThreadPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
 from data import Data, DataException
 from symbol import SymbolData, handle_options_args
 import symbol
@@ -28,6 +30,8 @@ from screener import get_symbols
 
 DATA_PARTS = ['training', 'validation', 'evaluation']
 NUM_PARTS = len(DATA_PARTS)
+# symbols preprocessed in parallel
+WORKERS = 8
 
 class NeuralNetworkData(Data):
 
@@ -83,45 +87,69 @@ def write_data_part(folder, data, part):
 def write_preprocess(folder, data):
     [write_data_part(folder, data, p) for p in DATA_PARTS]
 
+# complete rows of a symbol's data, columns in sorted key order
+def get_symbol_matrix(symbol, options_list):
+    dates, values = SymbolData(symbol=symbol, options_list=options_list).get_arrays()
+    columns = sorted(values)
+    matrix = np.column_stack([values[c] for c in columns])
+    complete = ~np.isnan(matrix).any(axis=1)
+    return dates[complete], matrix[complete], columns
+
 def get_symbol_part(symbol, options_list, start, end, days, tolerance):
-    symbol_data = SymbolData(symbol=symbol, options_list=options_list).get_data()
+    dates, matrix, columns = get_symbol_matrix(symbol, options_list)
     trades = OptimalTrades(symbol=symbol, start=start, end=end, tolerance=tolerance).get_data()
-    data_in, data_out = filter_matching(symbol_data, trades)
-    data_in = add_prior_days(data_in, days, symbol_data)
-    new_in = json_to_matrix(data_in)
-    new_out = json_to_matrix(data_out)
-    return new_in, new_out
+    trade_dates = sorted(trades)
+    trade_values = np.array([trades[date] for date in trade_dates], dtype=float)
+    matrix = add_prior_days_matrix(matrix, columns, days)
+    _, rows_in, rows_out = np.intersect1d(
+        dates[days:], np.array(trade_dates, dtype='datetime64[D]'), assume_unique=True,
+        return_indices=True)
+    return matrix[rows_in], trade_values[rows_out]
 
 def get_data_part(symbols, options_list, start, end, days, tolerance):
-    matrix_in = None
-    matrix_out = None
-    for symbol in symbols:
-        new_in, new_out = get_symbol_part(symbol, options_list, start, end, days, tolerance)
-        if matrix_in is None:
-            matrix_in = new_in
-            matrix_out = new_out
-        else:
-            matrix_in = np.concatenate((matrix_in, new_in))
-            matrix_out = np.concatenate((matrix_out, new_out))
+    with ThreadPoolExecutor(WORKERS) as pool:
+        parts = list(pool.map(
+            lambda symbol: get_symbol_part(symbol, options_list, start, end, days, tolerance),
+            symbols))
+    if not parts:
+        return None, None
+    rows = sum(len(new_out) for _, new_out in parts)
+    matrix_in = np.empty((rows, parts[0][0].shape[1]))
+    matrix_out = np.empty(rows)
+    row = 0
+    for new_in, new_out in parts:
+        matrix_in[row:row + len(new_out)] = new_in
+        matrix_out[row:row + len(new_out)] = new_out
+        row += len(new_out)
     return matrix_in, matrix_out
 
+# features ordered as the sorted column + prior names of the original dict rows
+def get_prior_days_order(columns, days):
+    names = sorted((str(col) + str(prior), i, days - prior)
+                   for i, col in enumerate(columns) for prior in range(days + 1))
+    return [i for _, i, _ in names], [lag for _, _, lag in names]
+
+# add data from prior days to each row, dropping the first days rows
+def add_prior_days_matrix(matrix, columns, days):
+    if len(matrix) <= days:
+        return np.empty((0, len(columns) * (days + 1)))
+    cols, lags = get_prior_days_order(columns, days)
+    windows = sliding_window_view(matrix, days + 1, axis=0)
+    return windows[:, cols, lags]
+
 # add data from prior days to the data for the current date
 def add_prior_days(data, days, full_data):
     if not data:
         return data
-    new_data = {}
-    date_list = list(enumerate(sorted(data)))
-    full_data_sorted = sorted(full_data)
-    full_date_list = list(enumerate(full_data_sorted))
-    start_date = full_data_sorted.index(date_list[0][1])
-    end_date = full_data_sorted.index(date_list[-1][1])
-    for current, date in full_date_list[start_date:end_date + 1]:
-        new_data[date] = {}
-        for prior in range(days + 1):
-            prior_data = full_data[full_date_list[current - prior][1]]
-            for col in list(prior_data):
-                new_data[date][str(col) + str(prior)] = prior_data[col]
-    return new_data
+    full_dates = sorted(full_data)
+    columns = sorted(full_data[full_dates[0]])
+    matrix = np.array([[full_data[date][col] for col in columns] for date in full_dates],
+                      dtype=float)
+    matrix = add_prior_days_matrix(matrix, columns, days)
+    first, last = min(data), max(data)
+    return {
+        date: row for date, row in zip(full_dates[days:], matrix) if first <= date <= last
+    }
 
 def validate_parts(parts):
     [validate_part(p) for p in parts]
@@ -0,0 +1,188 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import csv
+import numpy as np
+from utility import *
+
+DATES_FILE = 'dates.i8'
+COLUMN_EXT = '.f8'
+
+# one raw little-endian file per column, rows aligned to a sorted date index,
+# so appends write only the new rows and reads are memory-mapped
+class ColumnStore:
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_dates_path(self):
+        return os.path.join(self.path, DATES_FILE)
+
+    def get_column_path(self, column):
+        return os.path.join(self.path, column + COLUMN_EXT)
+
+    def get_dates(self):
+        return read_array(self.get_dates_path(), '<i8').view('datetime64[D]')
+
+    def get_column(self, column):
+        return read_array(self.get_column_path(column), '<f8')
+
+    def get_columns(self):
+        try:
+            return sorted(name[:-len(COLUMN_EXT)] for name in os.listdir(self.path)
+                          if name.endswith(COLUMN_EXT))
+        except FileNotFoundError:
+            return []
+
+    def __len__(self):
+        return len(self.get_dates())
+
+    # inclusive, dates as strings
+    def get_range(self, start=None, end=None):
+        dates = self.get_dates()
+        first = np.searchsorted(dates, np.datetime64(start, 'D')) if start else 0
+        last = np.searchsorted(dates, np.datetime64(end, 'D'), 'right') if end else len(dates)
+        return slice(first, last)
+
+    # zero-copy views of the rows between start and end
+    def read(self, columns=None, start=None, end=None):
+        rows = self.get_range(start, end)
+        columns = self.get_columns() if columns is None else columns
+        empty = np.full(len(self.get_dates()), np.nan)
+        return self.get_dates()[rows], {
+            column: (self.get_column(column) if self.has_column(column) else empty)[rows]
+            for column in columns
+        }
+
+    def has_column(self, column):
+        return os.path.exists(self.get_column_path(column))
+
+    def write(self, data):
+        if not data:
+            return
+        make_path(self.get_dates_path())
+        new_dates = np.array(sorted(data), dtype='datetime64[D]')
+        dates = self.get_dates()
+        columns = set(self.get_columns())
+        self.truncate(columns, len(dates))
+        new_columns = set(column for datum in data.values() for column in datum)
+        rewritten = set()
+        if len(dates) and new_dates[0] <= dates[-1]:
+            old = np.isin(new_dates, dates)
+            if not old.all() and new_dates[~old][0] <= dates[-1]:
+                return self.rewrite(data, new_dates, dates, columns | new_columns)
+            # values for existing rows rewrite only their columns
+            rewritten = new_columns
+            new_dates = new_dates[~old]
+        elif len(dates):
+            # new columns are padded for the existing rows
+            rewritten = new_columns - columns
+        for column in rewritten:
+            self.rewrite_column(column, dates, data)
+        tail = [str(date) for date in new_dates]
+        for column in columns | new_columns:
+            append_array(self.get_column_path(column), column_values(data, tail, column))
+        append_array(self.get_dates_path(), new_dates.astype('<i8'))
+
+    # drop rows of an append interrupted before its dates were written
+    def truncate(self, columns, length):
+        for column in columns:
+            path = self.get_column_path(column)
+            if os.path.getsize(path) > length * 8:
+                os.truncate(path, length * 8)
+
+    def rewrite_column(self, column, dates, data):
+        values = np.array(self.get_column(column)) if self.has_column(column) \
+            else np.full(len(dates), np.nan)
+        for i, date in enumerate(np.datetime_as_string(dates)):
+            if date in data and column in data[date]:
+                values[i] = to_float(data[date][column])
+        write_array(self.get_column_path(column), values)
+
+    # dates inserted before the end, merge and rewrite every file
+    def rewrite(self, data, new_dates, dates, columns):
+        all_dates = np.union1d(dates, new_dates)
+        index = np.searchsorted(all_dates, dates)
+        strings = np.datetime_as_string(all_dates)
+        for column in columns:
+            values = np.full(len(all_dates), np.nan)
+            if self.has_column(column):
+                values[index] = self.get_column(column)
+            for i, date in enumerate(strings):
+                if date in data and column in data[date]:
+                    values[i] = to_float(data[date][column])
+            write_array(self.get_column_path(column), values)
+        write_array(self.get_dates_path(), all_dates.astype('<i8'))
+
+    # {date: {column: float}} of the rows with every column present
+    def to_dict(self, columns=None, start=None, end=None):
+        dates, values = self.read(columns, start, end)
+        if not values:
+            return {}
+        matrix = np.column_stack([values[column] for column in values])
+        complete = ~np.isnan(matrix).any(axis=1)
+        columns = list(values)
+        return {
+            date: dict(zip(columns, row.tolist()))
+            for date, row in zip(np.datetime_as_string(dates[complete]).tolist(), matrix[complete])
+        }
+
+    # CSV with a Date column and one column per key, as read by backtrader,
+    # optionally only the rows of the given dates
+    def export_csv(self, path, columns=None, dates=None):
+        all_dates, values = self.read(columns)
+        rows = np.arange(len(all_dates)) if dates is None else \
+            np.flatnonzero(np.isin(all_dates, np.array(dates, dtype='datetime64[D]')))
+        with open(path, 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(['Date'] + list(values))
+            matrix = np.column_stack([values[column] for column in values]) if values \
+                else np.empty((len(all_dates), 0))
+            for date, row in zip(np.datetime_as_string(all_dates[rows]), matrix[rows]):
+                writer.writerow([date] + ['' if v != v else repr(v) for v in row.tolist()])
+        return path
+
+    # legacy {date: {column: str}} CSV written by earlier versions
+    def import_csv(self, path):
+        data = {}
+        with open(path, 'r', newline='') as fh:
+            for row in csv.DictReader(fh):
+                data[row.pop('Date')] = row
+        self.write(data)
+
+def to_float(value):
+    return np.nan if value is None or value == '' else float(value)
+
+def column_values(data, dates, column):
+    return np.array([to_float(data[date].get(column)) for date in dates], dtype='<f8')
+
+def read_array(path, dtype):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+def append_array(path, values):
+    with open(path, 'ab') as fh:
+        fh.write(np.ascontiguousarray(values).tobytes())
+
+def write_array(path, values):
+    with open(path + '.tmp', 'wb') as fh:
+        fh.write(np.ascontiguousarray(values, dtype=values.dtype).tobytes())
+    os.replace(path + '.tmp', path)
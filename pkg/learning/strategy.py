@@ -25,12 +25,14 @@ import backtrader as bt
 from data import Data
 from symbol import SymbolData, SymbolCloseData
 from preprocess import add_prior_days
+from optimal import jit_kernel, njit, prange
 from utility import *
 
 COMMISION = 0.001
 SLIPPAGE = 0.01
 INITIAL_FUNDS = 10000
 STAKE = 10
+ENGINES = ['backtrader', 'vectorized']
 
 class Strategy(Data):
     
@@ -40,6 +42,8 @@ class Strategy(Data):
         self.end = params['end']
         self.symbol = params['symbol']
         self.threshold = params.get('threshold', 0.8)
+        # both engines produce the same trades, so the engine isn't part of the params
+        self.engine = params.get('engine', 'backtrader')
         self.options_list = self.neural.options_list
         self.days = self.neural.days
         super().__init__(neural=self.neural.params, start=self.start,
@@ -60,39 +64,67 @@ class Strategy(Data):
     def get_new_data(self):
         log('Backtesting strategy...')
         self.setup_input_data()
+        if self.engine == 'vectorized':
+            return self.backtest_vectorized()
         strategy = self.backtest()
         return strategy.get_results()
 
     def setup_input_data(self):
         # download OHLCV and specified indicators
         # OHLCV is used for backtesting stats, not as input to ANN
-        SymbolData(symbol=self.symbol, options_list=[DAILY_OPTIONS], 
+        self.daily_data = SymbolData(symbol=self.symbol, options_list=[DAILY_OPTIONS], 
                 start=self.start, end=self.end)
         symbol_data = SymbolData(symbol=self.symbol, options_list=self.options_list,
                 start=self.start, end=self.end)
-        # get the path to the data
-        self.symbol_path = symbol_data.get_symbol_path()
-        symbol_data = symbol_data.get_data()
-        # format data for input to neural network
-        self.input_data = add_prior_days(symbol_data, self.days, symbol_data)
-
-    # remove dates from feed that don't have any data
-    def data_filter(self):
-        def filter(data_feed):
-            date = from_date(data_feed.datetime.date())
-            if date not in self.input_data:
-                data_feed.backwards()
-                return True
-            return False
-        return filter
+        self.predictions = self.get_predictions(symbol_data)
+        # export only the dates with predictions for the backtrader CSV feed
+        self.symbol_path = symbol_data.get_store().export_csv(
+            self.get_path('feed.csv'), dates=sorted(self.predictions))
+
+    # predictions are kept with the network, shared by every threshold
+    def get_predictions_path(self):
+        key = hash_dict({'symbol': self.symbol, 'start': self.start, 'end': self.end})
+        return self.neural.get_path('predictions', key + '.pkl')
+
+    def get_predictions(self, symbol_data):
+        path = self.get_predictions_path()
+        predictions = read_pickle(path)
+        if predictions is None:
+            data = symbol_data.get_data()
+            # format data for input to neural network
+            input_data = add_prior_days(data, self.days, data)
+            # predict every date of the backtest in one pass
+            dates = sorted(input_data)
+            matrix = np.array([input_data[date] for date in dates])
+            values = self.neural.predict_many(matrix).tolist() if dates else []
+            predictions = dict(zip(dates, values))
+            make_path(path)
+            write_pickle(path, predictions)
+        return predictions
+
+    # dates, open, high, low, close and predictions of the rows in the backtrader feed
+    def get_signal_arrays(self):
+        # the feed's todate excludes the end date
+        dates = [date for date in sorted(self.predictions) if date < self.end]
+        store_dates, values = self.daily_data.get_arrays()
+        rows = np.flatnonzero(np.isin(store_dates, np.array(dates, dtype='datetime64[D]')))
+        daily_keys = get_daily_keys()
+        prices = [values[daily_keys[key]][rows] for key in ['open', 'high', 'low', 'close']]
+        return [dates] + prices + [np.array([self.predictions[date] for date in dates])]
+
+    def backtest_vectorized(self):
+        return backtest_signals(*self.get_signal_arrays(), self.threshold)
+
+    def sweep_thresholds(self, thresholds):
+        return sweep_thresholds(*self.get_signal_arrays(), thresholds)
 
     def get_data_feed(self):
         # get OHLCV column indices in CSV
         headers = get_csv_headers(self.symbol_path)
         daily_indices = {}
-        daily_crypt = get_daily_crypt()
-        for key in daily_crypt:
-            daily_indices[key] = headers.index(daily_crypt[key])
+        daily_keys = get_daily_keys()
+        for key in daily_keys:
+            daily_indices[key] = headers.index(daily_keys[key])
         # create BT data feed from saved symbol data in CSV
         data_feed = bt.feeds.GenericCSVData(
             dataname=self.symbol_path,
@@ -101,15 +133,13 @@ class Strategy(Data):
             dtformat=('%Y-%m-%d'),
             openinterest=-1,
             **daily_indices)
-        # remove dates without data
-        data_feed.addfilter(self.data_filter())
         return data_feed
 
     def get_cerebro(self):
         cerebro = bt.Cerebro()
         # add strategy based on given neural network
-        cerebro.addstrategy(BTStrategy, symbol_data=self.input_data,
-                    neural=self.neural, threshold=self.threshold)
+        cerebro.addstrategy(BTStrategy, predictions=self.predictions,
+                    threshold=self.threshold)
         data_feed = self.get_data_feed()
         cerebro.adddata(data_feed)
         # add drawdown observer
@@ -131,19 +161,15 @@ class Strategy(Data):
 class BTStrategy(bt.Strategy):
 
     params = (
-        ('symbol_data', None),
-        ('neural', None),
+        ('predictions', None),
         ('threshold', None)   
     )
 
     def __init__(self):
-        self.symbol_data = self.params.symbol_data
-        self.neural = self.params.neural
+        self.predictions = self.params.predictions
         self.threshold = self.params.threshold
-        if not self.symbol_data:
-            raise Exception('A Backtrader strategy expects a symbol_data parameter')
-        if not self.neural:
-            raise Exception('A Backtrader strategy expects a neural parameter')
+        if not self.predictions:
+            raise Exception('A Backtrader strategy expects a predictions parameter')
         if not self.threshold:
             raise Exception('A Backtrader strategy expects a threshold parameter')
         # keep track of pending orders
@@ -191,10 +217,8 @@ class BTStrategy(bt.Strategy):
         # check for pending order
         if self.order:
             return
-        # format input data for neural network
-        input_data = json_to_matrix(self.symbol_data[self.get_date()])
-        # use neural network
-        prediction = self.neural.predict(input_data)
+        # neural network prediction, computed before the backtest
+        prediction = self.predictions[self.get_date()]
         # buy/sell based on neural network prediction and position in market
         if not self.is_long() and prediction > self.threshold:
             self.order = self.buy()
@@ -205,3 +229,103 @@ class BTStrategy(bt.Strategy):
 
     def get_results(self):
         return self.trades
+
+def backtest_signals(dates, opens, highs, lows, closes, predictions, threshold):
+    return sweep_thresholds(dates, opens, highs, lows, closes, predictions, [threshold])[0]
+
+# BTStrategy trades for each threshold, from arrays aligned with the feed rows
+def sweep_thresholds(dates, opens, highs, lows, closes, predictions, thresholds):
+    arrays = [np.asarray(a, dtype=float) for a in [opens, highs, lows, closes, predictions]]
+    thresholds = np.asarray(thresholds, dtype=float)
+    shape = (len(thresholds), len(arrays[0]))
+    index = np.empty(shape, dtype=np.int64)
+    price = np.empty(shape)
+    size = np.empty(shape, dtype=np.int64)
+    counts = np.zeros(len(thresholds), dtype=np.int64)
+    if signal_batch_jit:
+        signal_batch_jit(*arrays, thresholds, STAKE, SLIPPAGE, INITIAL_FUNDS, COMMISION,
+                         index, price, size, counts)
+    else:
+        # plain lists iterate faster than arrays without the JIT
+        signal_batch(*[a.tolist() for a in arrays], thresholds.tolist(), STAKE, SLIPPAGE,
+                     INITIAL_FUNDS, COMMISION, index, price, size, counts)
+    return [
+        get_trade_records(dates, index[i, :count], price[i, :count], size[i, :count])
+        for i, count in enumerate(counts.tolist())
+    ]
+
+# same fields and float arithmetic as BTStrategy.trades, the executed price is
+# backtrader's size weighted average and a closing trade's value its entry cost
+def get_trade_records(dates, index, price, size):
+    trades = []
+    entry = None
+    for i, p, s in zip(index.tolist(), price.tolist(), size.tolist()):
+        trades.append({
+            'date': dates[i],
+            'buy': s > 0,
+            'price': s * p / s,
+            'value': s * p if entry is None else -s * entry,
+            'commission': abs(s) * COMMISION * p,
+            'size': s
+        })
+        entry = p if entry is None else None
+    return trades
+
+# cash left after trading quantity at price p, booked as backtrader's broker does for
+# stocks with shortcash: a stake always opens from or closes to flat
+def order_cash(cash, held, entry, quantity, p, commission):
+    if held != 0:
+        cash += -quantity * entry + -quantity * (p - entry)
+    else:
+        cash -= quantity * p
+    return cash - abs(quantity) * p * commission
+
+# BTStrategy.next as a single pass: orders are decided on a bar's prediction and
+# fill at the next bar's open, slipped by slippage but kept within the bar's range.
+# like backtrader's margin checks, an order is rejected if it would leave negative
+# cash at its creation bar's close, and an opening order also at its fill price
+def signal_trades(opens, highs, lows, closes, predictions, threshold, stake, slippage,
+                  funds, commission, index, price, size):
+    cash = funds * 1.0
+    position = 0
+    entry = 0.0
+    pending = 0
+    count = 0
+    for t in range(len(opens)):
+        if pending != 0:
+            quantity = pending * stake
+            held = position * stake
+            if order_cash(cash, held, entry, quantity, closes[t - 1], commission) >= 0:
+                if pending > 0:
+                    fill = min(opens[t] * (1 + slippage), highs[t])
+                else:
+                    fill = max(opens[t] * (1 - slippage), lows[t])
+                after = order_cash(cash, held, entry, quantity, fill, commission)
+                if held != 0 or after >= 0:
+                    price[count] = fill
+                    index[count] = t
+                    size[count] = quantity
+                    count += 1
+                    cash = after
+                    entry = fill
+                    position += pending
+            pending = 0
+        if position != 1 and predictions[t] > threshold:
+            pending = 1
+        elif position != -1 and predictions[t] < -threshold:
+            pending = -1
+    return count
+
+def signal_batch(opens, highs, lows, closes, predictions, thresholds, stake, slippage,
+                 funds, commission, index, price, size, counts):
+    for i in prange(len(thresholds)):
+        counts[i] = signal_trades(opens, highs, lows, closes, predictions, thresholds[i],
+                                  stake, slippage, funds, commission, index[i], price[i],
+                                  size[i])
+
+if njit is not None:
+    order_cash_jit = jit_kernel(order_cash)
+    signal_trades_jit = jit_kernel(signal_trades, order_cash=order_cash_jit)
+    signal_batch_jit = jit_kernel(signal_batch, parallel=True, signal_trades=signal_trades_jit)
+else:
+    signal_batch_jit = None
@@ -19,10 +19,10 @@
 # THE SOFTWARE.
 
 from __future__ import (absolute_import, division, print_function, unicode_literals)
-from urllib.parse import urlencode
-import requests
-import csv
+from concurrent.futures import ThreadPoolExecutor
 from data import Data
+from download import get_manager, WORKERS
+from store import ColumnStore
 from utility import *
 from screener import get_symbols
 
@@ -33,7 +33,7 @@ class SymbolData(Data):
         self.options_list = params['options_list']
         self.start = params.get('start', None)
         self.end = params.get('end', None)
-        self.all_data = {}
+        self.store = None
         super().__init__(symbol=self.symbol)
         self.params = params
         self.write_params()
@@ -44,41 +44,58 @@ class SymbolData(Data):
     def get_symbol_path(self):
         return self.get_path(self.symbol + '.csv')
 
-    def write_data(self):
-        write_symbol_data(self.get_all_data(), self.get_symbol_path())
+    def get_store(self):
+        if self.store is None:
+            self.store = ColumnStore(self.get_path('store'))
+            # import the CSV written by earlier versions
+            if not len(self.store) and os.path.exists(self.get_symbol_path()):
+                self.store.import_csv(self.get_symbol_path())
+        return self.store
+
+    def get_columns(self):
+        return list(map(lambda c: c[1], hash_options_list(self.options_list)))
 
-    def get_all_data(self):
-        if not self.all_data:
-            self.get_data()
-        return self.all_data
+    # append the downloaded rows to the store, then keep the stored view
+    # filtered to [start, end] so new data matches what read_data returns
+    def write_data(self):
+        self.get_store().write(self.data)
+        self.data = self.filter_data()
 
     def read_data(self):
-        self.all_data = self.read_all_data()
         self.refresh_data()
-        if self.all_data:
-            data = self.filter_data(self.all_data)
-            return data
+        if len(self.get_store()):
+            return self.filter_data()
 
-    def filter_data(self, data):
-        return filter_data(data, self.options_list, self.start, self.end)
+    def filter_data(self):
+        return self.get_store().to_dict(self.get_columns(), self.start, self.end)
 
-    def read_all_data(self):
-        return read_symbol_data(self.get_symbol_path())
+    # (dates, {column: values}) memory-mapped, without copying
+    def get_arrays(self):
+        return self.get_store().read(self.get_columns(), self.start, self.end)
+
+    def export_csv(self):
+        return self.get_store().export_csv(self.get_symbol_path())
 
     def get_new_data(self):
-        data = download_symbol_data(self.symbol, self.options_list)
-        dict_merge(self.all_data, data)
-        return self.filter_data(data)
+        return download_symbol_data(self.symbol, self.options_list)
 
     def refresh_data(self, update_old=False):
-        missing_columns = get_missing_columns(self.all_data, self.options_list)
-        if update_old:
-            missing_columns += get_old_columns(self.all_data)
+        missing_columns = list_subtract(self.get_columns(), self.get_store().get_columns())
         missing_options = columns_to_options(missing_columns)
         if missing_options:
             new_data = download_symbol_data(self.symbol, missing_options)
-            dict_merge(self.all_data, new_data)
-            self.write_data()
+            self.get_store().write(new_data)
+        if update_old:
+            self.update_data()
+
+    # download only the rows after each column's latest date and append them
+    def update_data(self):
+        watermarks = get_watermarks(self.get_store())
+        old_columns = [k for k, v in watermarks.items() if v is None or v < get_latest_weekday()]
+        old_options = columns_to_options(old_columns)
+        if old_options:
+            new_data = download_symbol_data(self.symbol, old_options, watermarks)
+            self.get_store().write(new_data)
 
 class SymbolCloseData(SymbolData):
 
@@ -92,35 +109,46 @@ class SymbolCloseData(SymbolData):
             self.data = filter_close(data)
         return self.data
 
-def download_symbol_datum(symbol, options):
-    options = {
-        key: value for key, value in options.items() if value is not 'columns'
-    }
-    log('Downloading %s data for %s...' % (options['function'], symbol))
-    data = request({**{
-        'symbol': symbol,
-        'apikey': API_KEY
-    }, **options})
-    if type(data) is str:
-        raise Exception(data)
-    data = sanitize_data(data)
-    data = convert_data(data, options)
-    return data
-
-def download_symbol_data(symbol, options_list):
+# AlphaVantage compact responses hold the latest 100 data points
+COMPACT_SIZE = 100
+
+def get_request_options(symbol, options, since=None):
+    request = {**{key: value for key, value in options.items() if key != 'columns'},
+               **{'symbol': symbol}}
+    if since and 'outputsize' in options and \
+            np.busday_count(since, get_latest_weekday()) < COMPACT_SIZE:
+        request['outputsize'] = 'compact'
+    return request
+
+# latest date all columns of the options have data for, None if any column is empty
+def get_since(options, watermarks):
+    if not watermarks:
+        return None
+    dates = [watermarks.get(key) for _, key in hash_options(options)]
+    return None if None in dates else min(dates)
+
+# requests for every option are queued at once and run concurrently,
+# with watermarks only rows after each column's latest date are kept
+def download_symbol_data(symbol, options_list, watermarks=None):
+    manager = get_manager()
+    since_list = [get_since(options, watermarks) for options in options_list]
+    for options, since in zip(options_list, since_list):
+        log('Downloading %s data for %s%s...' %
+            (options['function'], symbol, ' since ' + since if since else ''))
+    futures = [manager.submit(get_request_options(symbol, options, since))
+               for options, since in zip(options_list, since_list)]
     data = {}
-    for options in options_list:
-        new_data = download_symbol_datum(symbol, options)
+    for options, since, future in zip(options_list, since_list, futures):
+        new_data = parse_response(future.result())
+        new_data = sanitize_data(new_data)
+        if since:
+            new_data = {date: row for date, row in new_data.items() if date > since}
+        new_data = convert_data(new_data, options)
         dict_merge(data, new_data)
     return data
 
-def request(options):
-    url = 'https://www.alphavantage.co/query?%s' % urlencode(options)
-    data = requests.get(url).json()
-    if 'Error Message' in data:
-        raise Exception(data['Error Message'])
-    data = next(data[key] for key in data.keys() if key != 'Meta Data')
-    return data
+def parse_response(data):
+    return next(data[key] for key in data.keys() if key != 'Meta Data')
 
 def sanitize_data(data):
     return {date[:DATE_LENGTH]: sanitize_datum(data[date]) for date in data}
@@ -129,7 +157,7 @@ def sanitize_datum(datum):
     return {(key[3:] if key[1:3] == ". " else key): val for key, val in datum.items()}
 
 def convert_data(data, options):
-    columns = encrypt_options(options)
+    columns = hash_options(options)
     return {
         date: {
             column_hash: data[date][column]
@@ -137,77 +165,28 @@ def convert_data(data, options):
         } for date in data.keys()
     }
 
-def json_to_csv(data, date, headers):
-    return [date] + list(map(lambda col: data[date].get(col, ""), headers[1:]))
-
-def csv_to_json(datum):
-    date = datum['Date']
-    del datum['Date']
-    return {date: datum}
-
 def columns_to_options(columns):
-    options_list = [decrypt_dict(column) for column in columns]
+    options_list = [lookup_key(column) for column in columns]
     for options in options_list:
         del options['column']
     return remove_duplicates(options_list)
 
-def get_old_columns(data):
-    dates = sorted(data, reverse=True)
-    if len(dates) == 0:
-        return []
-    # check latest data against date
-    if dates[0] != get_latest_weekday():
-        return get_columns(data)
-    # check missing data
-    columns = set()
-    for date in dates:
-        old_columns = [k for k, v in data[date].items() if v == '']
-        if len(old_columns) > 0:
-            columns.update(old_columns)
-        else:
-            break
-    return list(columns)
-
-def get_missing_columns(data, options_list):
-    present_columns = get_columns(data)
-    columns = list(map(lambda c: c[1], encrypt_options_list(options_list)))
-    missing_columns = list_subtract(columns, present_columns)
-    return missing_columns
+# {column: latest date with data}, None for columns without data
+def get_watermarks(store):
+    dates = store.get_dates()
+    watermarks = {}
+    for column in store.get_columns():
+        rows = np.flatnonzero(~np.isnan(store.get_column(column)))
+        watermarks[column] = str(dates[rows[-1]]) if len(rows) else None
+    return watermarks
 
 def get_portfolio_data(symbols, options_list, start, end, refresh):
-    data = {}
-    for symbol in symbols:
-        data[symbol] = SymbolData(symbol=symbol, options_list=options_list, start=start, end=end)
-        data[symbol].refresh_data(update_old=refresh)
-    return data
-
-def write_symbol_data(data, path):
-    with open(path, 'w') as outfile:
-        csv_file = csv.writer(outfile)
-        columns = ['Date'] + get_columns(data)
-        csv_file.writerow(columns)
-        for date in sorted(data):
-            csv_file.writerow(json_to_csv(data, date, columns))
-
-def read_symbol_data(path):
-    try:
-        with open(path, 'r') as csv_file:
-            reader = csv.DictReader(csv_file)
-            data = {}
-            for row in reader:
-                new_data = csv_to_json(row)
-                dict_merge(data, new_data)
-            return data
-    except FileNotFoundError:
-        return {}
-
-def filter_data(data, options_list, start, end):
-    columns = list(map(lambda c: c[1], encrypt_options_list(options_list)))
-    data = filter_columns(columns, data)
-    if start and end:
-        data = filter_dates(data, start, end)
-    data = filter_incomplete(data)
-    return data
+    def get_symbol_data(symbol):
+        symbol_data = SymbolData(symbol=symbol, options_list=options_list, start=start, end=end)
+        symbol_data.refresh_data(update_old=refresh)
+        return symbol_data
+    with ThreadPoolExecutor(WORKERS) as pool:
+        return dict(zip(symbols, pool.map(get_symbol_data, symbols)))
 
 def add_symbol_args(parser):
     parser.add_argument('-s', '--symbols', type=str, nargs='+', help='symbol(s)')
@@ -20,13 +20,32 @@
 
 import unittest
 import shutil
-from neural import NeuralNetwork
+from neural import NeuralNetwork, load_model
+import neural
 from symbol import SymbolData
 from optimal import *
-from preprocess import NeuralNetworkData, stratify_parts
+from preprocess import NeuralNetworkData, stratify_parts, add_prior_days, add_prior_days_matrix
 from graph import OptimalTradesGraph
 from screener import yahoo
-from strategy import Strategy
+from strategy import Strategy, BTStrategy, sweep_thresholds
+import strategy
+import backtrader as bt
+from store import ColumnStore
+from optimize import get_configs, parse_grid, rank_results, format_results
+from walkforward import get_windows, get_trade_stats, get_report
+from download import DownloadManager, set_manager
+from symbol import download_symbol_data, get_request_options, get_watermarks
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from threading import Thread
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from migrate import migrate_data, LEGACY_CRYPT_KEY
+from Crypto.Cipher import AES
+from binascii import hexlify
+import tempfile
+import json
+import time
 
 class TestOptimal(unittest.TestCase):
 
@@ -117,6 +136,521 @@ class TestOptimal(unittest.TestCase):
         trades = {0: BUY, 1: SELL}
         self.assertEqual(smooth_trades(trades, prices), trades)
 
+    def test_labels(self):
+        prices = [10, 15, 25, 30, 10]
+        labels = get_trade_labels(prices, 0)
+        self.assertEqual(labels[:4].tolist(), [BUY, 0.5, -0.5, SELL])
+        self.assertTrue(np.isnan(labels[4]))
+        self.assertEqual(labels_to_dict(labels), labels_to_dict(get_trade_labels(prices, 0, jit=False)))
+
+    def test_labels_many(self):
+        prices_list = [[10, 20, 19, 30, 10, 15], [10, 20, 21, 10, 15]]
+        labels = get_trade_labels_many(prices_list, [0, 0.1])
+        self.assertEqual([l.shape for l in labels], [(2, 6), (2, 5)])
+        for prices, series in zip(prices_list, labels):
+            for tolerance, row in zip([0, 0.1], series):
+                self.assertEqual(labels_to_dict(row),
+                                 smooth_trades(optimize_trades(prices, tolerance), prices))
+
+# keys registered by any test go to a temporary data folder, not the cwd
+def setUpModule():
+    global ORIGINAL_DATA_FOLDER
+    ORIGINAL_DATA_FOLDER = PARAMS['data_folder']
+    PARAMS['data_folder'] = tempfile.mkdtemp()
+
+def tearDownModule():
+    remove_folder(PARAMS['data_folder'])
+    PARAMS['data_folder'] = ORIGINAL_DATA_FOLDER
+
+# registers keys in a fresh process, as optimize.py workers do
+def register_worker(folder, n):
+    PARAMS['data_folder'] = folder
+    KEY_INDEXES.clear()
+    register_keys({str(n): {'worker': n}})
+
+class TestKeys(unittest.TestCase):
+
+    def setUp(self):
+        self.data_folder = PARAMS['data_folder']
+        self.folder = tempfile.mkdtemp()
+        PARAMS['data_folder'] = self.folder
+
+    def tearDown(self):
+        PARAMS['data_folder'] = self.data_folder
+        remove_folder(self.folder)
+
+    def test_canonical(self):
+        self.assertEqual(hash_dict({'a': 1, 'b': [1, 2]}), hash_dict({'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(hash_dict({'a': 1}), hash_dict({'a': 2}))
+
+    def test_reversible(self):
+        options = get_options('sma')
+        for column, key in hash_options(options):
+            self.assertEqual(lookup_key(key), {**options, **{'column': column}})
+
+    def test_memoized(self):
+        options = get_options('ema')
+        self.assertIs(hash_options(options), hash_options(dict(options)))
+
+    def test_switch_folder(self):
+        options = get_options('rsi')
+        hash_options(options)
+        folder = tempfile.mkdtemp()
+        try:
+            PARAMS['data_folder'] = folder
+            for column, key in hash_options(options):
+                self.assertEqual(lookup_key(key), {**options, **{'column': column}})
+        finally:
+            PARAMS['data_folder'] = self.folder
+            remove_folder(folder)
+
+    def test_concurrent_register(self):
+        register_keys({'own': {'worker': None}})
+        # spawned, as forking after other tests started threads can hang
+        with ProcessPoolExecutor(4, mp_context=get_context('spawn')) as pool:
+            list(pool.map(register_worker, [self.folder] * 16, range(16)))
+        # keys written by the other processes are merged, not overwritten
+        with open(get_key_index_path()) as fh:
+            self.assertEqual(set(json.load(fh)), {'own'} | {str(n) for n in range(16)})
+        self.assertEqual(lookup_key('15'), {'worker': 15})
+
+def legacy_encrypt(options):
+    e = AES.new(LEGACY_CRYPT_KEY, AES.MODE_CFB, LEGACY_CRYPT_KEY)
+    return hexlify(e.encrypt(json.dumps(options).encode('utf-8'))).decode('utf-8')
+
+class TestMigrate(unittest.TestCase):
+
+    def setUp(self):
+        self.data_folder = PARAMS['data_folder']
+        self.folder = tempfile.mkdtemp()
+        self.options = {'symbol': 'AAPL', 'function': 'TIME_SERIES_DAILY', 'column': 'close'}
+        self.legacy = os.path.join(self.folder, 'symbol', legacy_encrypt({'symbol': 'AAPL'}))
+        os.makedirs(self.legacy)
+        write_pickle(os.path.join(self.legacy, 'params.pkl'), {'symbol': 'AAPL', 'verbose': False})
+        with open(os.path.join(self.legacy, 'AAPL.csv'), 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(['Date', legacy_encrypt(self.options)])
+            writer.writerow(['2018-01-02', '1.5'])
+
+    def tearDown(self):
+        PARAMS['data_folder'] = self.data_folder
+        remove_folder(self.folder)
+
+    def test_migrate(self):
+        counts = migrate_data(self.folder)
+        self.assertEqual(counts, {'folders': 1, 'csvs': 1, 'skipped': 0})
+        path = os.path.join(self.folder, 'symbol', hash_dict({'symbol': 'AAPL'}))
+        self.assertFalse(os.path.exists(self.legacy))
+        with open(os.path.join(path, 'AAPL.csv'), newline='') as fh:
+            rows = list(csv.reader(fh))
+        self.assertEqual(rows, [['Date', hash_dict(self.options)], ['2018-01-02', '1.5']])
+        self.assertEqual(lookup_key(rows[0][1]), self.options)
+        # already migrated data is left alone
+        self.assertEqual(migrate_data(self.folder), {'folders': 0, 'csvs': 0, 'skipped': 0})
+
+    def test_dry_run(self):
+        counts = migrate_data(self.folder, dry_run=True)
+        self.assertEqual(counts, {'folders': 1, 'csvs': 1, 'skipped': 0})
+        self.assertEqual(os.listdir(os.path.join(self.folder, 'symbol')),
+                         [os.path.basename(self.legacy)])
+        self.assertFalse(os.path.exists(get_key_index_path()))
+
+class TestStore(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.store = ColumnStore(os.path.join(self.folder, 'store'))
+        self.store.write({'2018-01-02': {'a': '1', 'b': '2'}, '2018-01-03': {'a': '3', 'b': ''}})
+
+    def tearDown(self):
+        remove_folder(self.folder)
+
+    def test_append(self):
+        self.store.write({'2018-01-04': {'a': '5', 'b': '6'}})
+        dates, values = self.store.read(['a', 'b'], '2018-01-03', '2018-01-04')
+        self.assertEqual(list(np.datetime_as_string(dates)), ['2018-01-03', '2018-01-04'])
+        self.assertEqual(values['a'].tolist(), [3, 5])
+        self.assertEqual(self.store.to_dict(['a', 'b']),
+                         {'2018-01-02': {'a': 1, 'b': 2}, '2018-01-04': {'a': 5, 'b': 6}})
+
+    def test_new_column(self):
+        self.store.write({'2018-01-03': {'c': '7'}})
+        self.assertEqual(self.store.to_dict(['a', 'c']), {'2018-01-03': {'a': 3, 'c': 7}})
+
+    def test_insert(self):
+        self.store.write({'2018-01-01': {'a': '0'}, '2018-01-03': {'b': '4'}})
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.to_dict(['a', 'b']),
+                         {'2018-01-02': {'a': 1, 'b': 2}, '2018-01-03': {'a': 3, 'b': 4}})
+
+    def test_csv(self):
+        path = self.store.export_csv(os.path.join(self.folder, 'AAPL.csv'))
+        imported = ColumnStore(os.path.join(self.folder, 'imported'))
+        imported.import_csv(path)
+        self.assertEqual(imported.to_dict(), self.store.to_dict())
+        self.assertEqual(get_csv_headers(path), ['Date', 'a', 'b'])
+
+    def test_csv_dates(self):
+        path = self.store.export_csv(os.path.join(self.folder, 'AAPL.csv'), dates=['2018-01-03'])
+        with open(path) as fh:
+            self.assertEqual(fh.read().splitlines()[1:], ['2018-01-03,3.0,'])
+
+class TestPriorDays(unittest.TestCase):
+
+    def setUp(self):
+        self.columns = ['a', 'b']
+        self.matrix = np.arange(10, dtype=float).reshape(5, 2)
+
+    def test_matrix(self):
+        matrix = add_prior_days_matrix(self.matrix, self.columns, 1)
+        # a0, a1, b0, b1 for each date with a full day of history
+        self.assertEqual(matrix.tolist(), [[2, 0, 3, 1], [4, 2, 5, 3], [6, 4, 7, 5], [8, 6, 9, 7]])
+
+    def test_short(self):
+        self.assertEqual(add_prior_days_matrix(self.matrix, self.columns, 5).shape, (0, 12))
+
+    def test_dict(self):
+        dates = ['2018-01-0' + str(i + 1) for i in range(5)]
+        full_data = {d: dict(zip(self.columns, row)) for d, row in zip(dates, self.matrix)}
+        data = add_prior_days({d: full_data[d] for d in dates[2:4]}, 2, full_data)
+        self.assertEqual(list(data), dates[2:4])
+        self.assertEqual(data['2018-01-03'].tolist(), [4, 2, 0, 5, 3, 1])
+
+# serves TIME_SERIES_DAILY style responses, one row per day of the month,
+# the last 5 days when compact
+class StubAlphaVantage(BaseHTTPRequestHandler):
+
+    requests = []
+    throttle = 0
+    delay = 0
+
+    def do_GET(self):
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        StubAlphaVantage.requests.append(query)
+        time.sleep(StubAlphaVantage.delay)
+        if StubAlphaVantage.throttle:
+            StubAlphaVantage.throttle -= 1
+            body = {'Note': 'Thank you for using Alpha Vantage!'}
+        elif query['symbol'] == 'INVALID':
+            body = {'Error Message': 'Invalid API call.'}
+        else:
+            body = {
+                'Meta Data': {'1. Information': query['function']},
+                'Time Series (Daily)': {
+                    '2018-01-%02d' % day: {'1. open': str(day), '2. high': str(day + 2),
+                                           '3. low': str(day - 1), '4. close': str(day + 1),
+                                           '5. volume': str(day * 100)}
+                    for day in range(6 if query.get('outputsize') == 'compact' else 1, 11)
+                }
+            }
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class TestDownload(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubAlphaVantage)
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = 'http://127.0.0.1:%d/query' % cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        StubAlphaVantage.requests = []
+        StubAlphaVantage.throttle = 0
+        StubAlphaVantage.delay = 0
+
+    def tearDown(self):
+        set_manager(None)
+        remove_folder(self.folder)
+
+    def get_manager(self, **params):
+        return DownloadManager(url=self.url, folder=self.folder, retry_wait=0, **params)
+
+    def test_dedupe(self):
+        StubAlphaVantage.delay = 0.1
+        manager = self.get_manager()
+        options = {'function': 'TIME_SERIES_DAILY', 'symbol': 'AAPL'}
+        results = manager.get_all([options, dict(options), options])
+        self.assertEqual(len(StubAlphaVantage.requests), 1)
+        self.assertEqual(results[0], results[2])
+
+    def test_cache(self):
+        options = {'function': 'TIME_SERIES_DAILY', 'symbol': 'AAPL'}
+        data = self.get_manager().get(options)
+        self.assertEqual(self.get_manager().get(options), data)
+        self.assertEqual(len(StubAlphaVantage.requests), 1)
+        self.get_manager(max_age=-1).get(options)
+        self.assertEqual(len(StubAlphaVantage.requests), 2)
+
+    def test_rate_limit(self):
+        manager = self.get_manager(calls=2, period=0.5)
+        start = time.time()
+        manager.get_all([{'function': 'SMA', 'symbol': s} for s in ['A', 'B', 'C', 'D', 'E']])
+        self.assertGreaterEqual(time.time() - start, 1)
+
+    def test_throttled(self):
+        StubAlphaVantage.throttle = 2
+        data = self.get_manager().get({'function': 'EMA', 'symbol': 'AAPL'})
+        self.assertIn('Time Series (Daily)', data)
+        self.assertEqual(len(StubAlphaVantage.requests), 3)
+
+    def test_error(self):
+        future = self.get_manager().submit({'function': 'EMA', 'symbol': 'INVALID'})
+        self.assertRaises(Exception, future.result)
+        self.assertFalse(os.listdir(self.folder))
+
+    def test_symbol_data(self):
+        set_manager(self.get_manager())
+        data = download_symbol_data('AAPL', [get_options('daily'), get_options('sma')])
+        self.assertEqual(len(data), 10)
+        self.assertEqual(len(StubAlphaVantage.requests), 2)
+        self.assertNotIn('columns', StubAlphaVantage.requests[0])
+        close = dict(hash_options(get_options('daily')))['close']
+        self.assertEqual(data['2018-01-02'][close], '3')
+
+    def test_incremental(self):
+        set_manager(self.get_manager())
+        options = get_options('daily')
+        store = ColumnStore(os.path.join(self.folder, 'store'))
+        data = download_symbol_data('AAPL', [options])
+        store.write({date: row for date, row in data.items() if date <= '2018-01-07'})
+        watermarks = get_watermarks(store)
+        self.assertEqual(set(watermarks.values()), {'2018-01-07'})
+        store.write(download_symbol_data('AAPL', [options], watermarks))
+        self.assertEqual(len(store), 10)
+        self.assertEqual(store.to_dict(), {
+            date: {k: float(v) for k, v in row.items()} for date, row in data.items()})
+
+    def test_symbol_store(self):
+        set_manager(self.get_manager())
+        data_folder = PARAMS['data_folder']
+        PARAMS['data_folder'] = self.folder
+        try:
+            params = {'symbol': 'AAPL', 'options_list': [get_options('daily')],
+                      'start': '2018-01-03', 'end': '2018-01-05'}
+            data = SymbolData(**params).get_data()
+            symbol = SymbolData(**params)
+            store = symbol.get_store()
+            symbol.data = symbol.get_new_data()
+            symbol.write_data()
+            self.assertEqual(symbol.data, data)
+            self.assertEqual(len(store), 10)
+            self.assertEqual(data, store.to_dict(None, '2018-01-03', '2018-01-05'))
+            self.assertEqual(data['2018-01-04'][get_close_key()], 5)
+            self.assertEqual(sorted(data), ['2018-01-03', '2018-01-04', '2018-01-05'])
+            self.assertEqual(len(StubAlphaVantage.requests), 1)
+        finally:
+            PARAMS['data_folder'] = data_folder
+
+    def test_compact(self):
+        options = get_options('daily')
+        since = str(np.busday_offset(get_latest_weekday(), -5))
+        self.assertEqual(get_request_options('AAPL', options, since)['outputsize'], 'compact')
+        self.assertEqual(get_request_options('AAPL', options, '2000-01-03')['outputsize'], 'full')
+        self.assertEqual(get_request_options('AAPL', options)['outputsize'], 'full')
+        self.assertNotIn('outputsize', get_request_options('AAPL', get_options('sma'), since))
+
+class TestOptimize(unittest.TestCase):
+
+    def setUp(self):
+        self.defaults = {'days': 0, 'tolerance': 0.01, 'epochs': 10, 'nodes': 128,
+                         'activation': 'tanh', 'loss': 'mean_squared_error'}
+
+    def test_grid(self):
+        grid = parse_grid(['nodes=64,128', 'days=0,5,10'])
+        self.assertEqual(grid, {'nodes': [64, 128], 'days': [0, 5, 10]})
+        configs = get_configs(grid, self.defaults)
+        self.assertEqual(len(configs), 6)
+        self.assertEqual(len(set(hash_dict(c) for c in configs)), 6)
+        self.assertTrue(all(c['epochs'] == 10 for c in configs))
+        self.assertRaises(Exception, parse_grid, ['weights=1'])
+
+    def test_random(self):
+        grid = parse_grid(['nodes=32,64,128', 'epochs=10,20,50'])
+        configs = get_configs(grid, self.defaults, samples=4, seed=1)
+        self.assertEqual(len(configs), 4)
+        self.assertEqual(configs, get_configs(grid, self.defaults, samples=4, seed=1))
+
+    def test_rank(self):
+        results = [{**self.defaults, **r} for r in [
+            {'nodes': 1, 'accuracy': 0.5, 'average_distance': 0.2},
+            {'nodes': 2, 'accuracy': 0.7, 'average_distance': 0.4},
+            {'nodes': 3, 'accuracy': 0.7, 'average_distance': 0.3},
+            {'nodes': 4, 'accuracy': None, 'average_distance': None}]]
+        self.assertEqual([r['nodes'] for r in rank_results(results)], [3, 2, 1, 4])
+        self.assertEqual(len(format_results(results).split('\n')), 5)
+
+class StubKurfile:
+    loads = 0
+
+    def __init__(self, path, engine):
+        self.path = path
+
+    def parse(self):
+        pass
+
+    def get_model(self):
+        StubKurfile.loads += 1
+        return StubModel()
+
+class StubModel:
+
+    def __init__(self):
+        self.backend = self
+        self.weights = None
+
+    def compile(self, model):
+        pass
+
+    def restore(self, path):
+        with open(os.path.join(path, 'weights'), 'r') as fh:
+            self.weights = fh.read()
+
+class TestModelCache(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.kurfile, neural.Kurfile = neural.Kurfile, StubKurfile
+        StubKurfile.loads = 0
+
+    def tearDown(self):
+        neural.Kurfile = self.kurfile
+        neural.MODELS.clear()
+        remove_folder(self.folder)
+
+    def write_weights(self, name, weights, mtime):
+        path = os.path.join(self.folder, name, 'weights')
+        make_path(path)
+        with open(path, 'w') as fh:
+            fh.write(weights)
+        os.utime(path, (mtime, mtime))
+        return os.path.dirname(path)
+
+    def test_reload(self):
+        model_path = os.path.join(self.folder, 'model.yml')
+        weights_path = self.write_weights('a', 'first', 1000)
+        model = load_model(model_path, weights_path)
+        self.assertIs(load_model(model_path, weights_path), model)
+        self.assertEqual(StubKurfile.loads, 1)
+
+        # retraining rewrites the weights in place
+        self.write_weights('a', 'second', 2000)
+        self.assertEqual(load_model(model_path, weights_path).weights, 'second')
+        self.assertEqual(len(neural.MODELS), 1)
+
+        # the same model with other weights is compiled separately
+        other_path = self.write_weights('b', 'other', 1000)
+        self.assertEqual(load_model(model_path, other_path).weights, 'other')
+        self.assertEqual(load_model(model_path, weights_path).weights, 'second')
+        self.assertEqual(StubKurfile.loads, 3)
+
+class TestWalkForward(unittest.TestCase):
+
+    def test_windows(self):
+        windows = get_windows('2018-01-01', '2018-12-31', 200, 60, 0.25)
+        self.assertEqual(len(windows), 2)
+        self.assertEqual(windows[0], {
+            'training': ('2018-01-01', '2018-05-31'),
+            'validation': ('2018-05-31', '2018-07-20'),
+            'test': ('2018-07-20', '2018-09-18')
+        })
+        self.assertEqual(windows[1]['training'][0], '2018-03-02')
+        self.assertEqual(windows[1]['test'], ('2018-09-18', '2018-11-17'))
+
+    def test_stats(self):
+        trades = [{'buy': True, 'price': 10}, {'buy': False, 'price': 11},
+                  {'buy': False, 'price': 11}, {'buy': True, 'price': 12.1},
+                  {'buy': True, 'price': 12}]
+        stats = get_trade_stats(trades)
+        self.assertEqual(stats['trades'], 2)
+        self.assertAlmostEqual(stats['return'], 1.1 * 0.9 - 1)
+        self.assertEqual(stats['win_rate'], 0.5)
+
+    def test_report(self):
+        results = [
+            {'symbol': 'AAPL', 'start': 'a', 'end': 'b', 'trades': 2, 'return': 0.1, 'win_rate': 1},
+            {'symbol': 'MSFT', 'start': 'a', 'end': 'b', 'trades': 2, 'return': -0.1, 'win_rate': 0},
+            {'symbol': 'AAPL', 'start': 'b', 'end': 'c', 'error': 'no data'}]
+        report = get_report(results)
+        self.assertEqual(len(report['windows']), 2)
+        self.assertEqual(report['total']['backtests'], 2)
+        self.assertEqual(report['total']['errors'], 1)
+        self.assertEqual(report['total']['win_rate'], 0.5)
+        self.assertAlmostEqual(report['symbols']['AAPL']['mean_return'], 0.1)
+
+class TestVectorized(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.make_feed(100)
+
+    def tearDown(self):
+        remove_folder(self.folder)
+
+    def make_feed(self, price, length=500):
+        rng = np.random.default_rng(0)
+        self.close = price * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+        self.open = self.close * np.exp(rng.normal(0, 0.01, length))
+        self.high = np.maximum(self.open, self.close) * (1 + np.abs(rng.normal(0, 0.008, length)))
+        self.low = np.minimum(self.open, self.close) * (1 - np.abs(rng.normal(0, 0.008, length)))
+        self.predictions = np.tanh(rng.normal(0, 1.2, length))
+        self.dates = [str(d) for d in np.busday_offset('2015-01-01', np.arange(length), roll='forward')]
+        self.path = os.path.join(self.folder, 'feed.csv')
+        with open(self.path, 'w') as fh:
+            fh.write('Date,open,high,low,close,volume\n')
+            for row in zip(self.dates, self.open, self.high, self.low, self.close):
+                fh.write(','.join([row[0]] + [repr(float(v)) for v in row[1:]]) + ',1000\n')
+
+    # the same setup as Strategy.get_cerebro
+    def backtrader_trades(self, threshold):
+        cerebro = bt.Cerebro()
+        cerebro.addstrategy(BTStrategy, threshold=threshold,
+                            predictions=dict(zip(self.dates, self.predictions.tolist())))
+        cerebro.adddata(bt.feeds.GenericCSVData(
+            dataname=self.path, fromdate=to_date(self.dates[0]), todate=to_date(self.dates[-1]),
+            dtformat=('%Y-%m-%d'), openinterest=-1, open=1, high=2, low=3, close=4, volume=5))
+        cerebro.broker.setcash(strategy.INITIAL_FUNDS)
+        cerebro.broker.setcommission(commission=strategy.COMMISION)
+        cerebro.broker.set_slippage_perc(strategy.SLIPPAGE)
+        cerebro.addsizer(bt.sizers.FixedSize, stake=strategy.STAKE)
+        return cerebro.run()[0].get_results()
+
+    # todate excludes the last date from the backtrader feed
+    def vectorized_trades(self, thresholds):
+        return sweep_thresholds(self.dates[:-1], self.open[:-1], self.high[:-1], self.low[:-1],
+                                self.close[:-1], self.predictions[:-1], thresholds)
+
+    def test_trades(self):
+        for threshold in [0.2, 0.5, 0.8]:
+            self.assertEqual(self.vectorized_trades([threshold])[0],
+                             self.backtrader_trades(threshold))
+
+    # a stake worth more than the cash, so backtrader rejects some orders on margin
+    def test_margin(self):
+        for price in [900, 1200, 5000]:
+            self.make_feed(price)
+            for threshold in [0.2, 0.5]:
+                self.assertEqual(self.vectorized_trades([threshold])[0],
+                                 self.backtrader_trades(threshold))
+
+    def test_sweep(self):
+        thresholds = [0.2, 0.5, 0.8]
+        for trades, threshold in zip(self.vectorized_trades(thresholds), thresholds):
+            self.assertEqual(trades, self.vectorized_trades([threshold])[0])
+
 def remove_last_line(path):
     file = open(path, 'r+', encoding='utf-8')
     file.seek(0, os.SEEK_END)
@@ -197,5 +731,13 @@ class TestAllData(unittest.TestCase):
         Strategy(neural=neural, start='2018-04-01', end='2018-05-01', symbol='MSFT', 
             threshold=0.7)
 
+    def test_strategy_vectorized(self):
+        neural = NeuralNetwork(**stratify_parts(['AAPL', 'MSFT'], [0.5, 0.1, 0.3], '2015-01-01',
+            '2018-01-01'), options_list=get_options_list(['sma', 'ema', 'macd']),
+            days=3, tolerance=0.05)
+        backtest = Strategy(neural=neural, start='2018-01-01', end='2018-03-01', symbol='AAPL')
+        backtest.setup_input_data()
+        self.assertEqual(backtest.backtest_vectorized(), backtest.backtest().get_results())
+
 if __name__ == '__main__':
     unittest.main()
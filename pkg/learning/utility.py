@@ -26,15 +26,15 @@ from itertools import filterfalse
 import json
 from datetime import datetime, timedelta, date as Date
 import numpy as np
-from binascii import hexlify, unhexlify
 import os
 import csv
-from Crypto.Cipher import AES
+import fcntl
+from threading import Lock
 from params import PARAMS
 
 DATE_LENGTH = 10
 DT_FORMAT = '%Y-%m-%d'
-CRYPT_KEY = '1234567890123456'
+KEY_INDEX = 'keys.json'
 API_KEY = PARAMS['credentials']['alphavantage']
 DAILY_OPTIONS = PARAMS['data_options']['daily']()
 
@@ -52,13 +52,9 @@ def log(*args, force=False, **kwargs):
 def set_verbosity(verbose):
     PARAMS['verbose'] = verbose or PARAMS['verbose']
 
-def shorten_path(path):
-    return str(sha1(path.encode('utf-8')).hexdigest())
-
 def make_path(path):
     dir_name = os.path.dirname(path)
-    if not os.path.exists(dir_name):
-        os.makedirs(dir_name)
+    os.makedirs(dir_name, exist_ok=True)
 
 def write_pickle(path, data):
     with open(path, 'wb') as fh:
@@ -100,19 +96,68 @@ def complete(datum):
     return True
 
 def json_to_matrix(data):
+    if type(data) is np.ndarray:
+        return data
     if type(data) is dict:
         return np.array([json_to_matrix(data[k]) for k in sorted(data)])
     return float(data)
 
-def encrypt_dict(d):
-    e = AES.new(CRYPT_KEY, AES.MODE_CFB, CRYPT_KEY)
-    s = json.dumps(d, sort_keys=True)
-    return hexlify(e.encrypt(s)).decode('utf-8')
+# (index path, canonical options json) -> [(column, key)], computed once per
+# option set and key index so switching data_folder registers keys again
+OPTION_KEYS = {}
+# index path -> {key: canonical json}, the reverse mapping of every key
+KEY_INDEXES = {}
+KEY_LOCK = Lock()
+
+def canonical(d):
+    return json.dumps(d, sort_keys=True, separators=(',', ':'))
+
+def hash_dict(d):
+    return sha1(canonical(d).encode('utf-8')).hexdigest()
 
-def decrypt_dict(crypt):
-    e = AES.new(CRYPT_KEY, AES.MODE_CFB, CRYPT_KEY)
-    s = e.decrypt(unhexlify(crypt))
-    return json.loads(s.decode('utf-8'))
+def get_key_index_path():
+    return os.path.join(os.getcwd(), PARAMS['data_folder'], KEY_INDEX)
+
+def load_key_file(path):
+    try:
+        with open(path, 'r') as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+def read_key_index():
+    path = get_key_index_path()
+    if path not in KEY_INDEXES:
+        KEY_INDEXES[path] = load_key_file(path)
+    return KEY_INDEXES[path]
+
+# other processes append to the same index, so merge in their keys under an
+# exclusive file lock before rewriting it
+def register_keys(keys):
+    with KEY_LOCK:
+        index = read_key_index()
+        new = {key: canonical(d) for key, d in keys.items() if key not in index}
+        if new:
+            path = get_key_index_path()
+            make_path(path)
+            with open(path + '.lock', 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                index.update(load_key_file(path))
+                index.update(new)
+                with open(path + '.tmp', 'w') as fh:
+                    json.dump(index, fh, sort_keys=True)
+                os.replace(path + '.tmp', path)
+
+def lookup_key(key):
+    index = read_key_index()
+    if key not in index:
+        # registered by another process since the index was read
+        with KEY_LOCK:
+            index.update(load_key_file(get_key_index_path()))
+    if key not in index:
+        raise KeyError('Unknown column key %s, run migrate.py on %s' %
+                       (key, PARAMS['data_folder']))
+    return json.loads(index[key])
 
 def dict_merge(dct, merge_dct):
     for k, v in merge_dct.items():
@@ -134,18 +179,24 @@ def list_subtract(l1, l2):
 def remove_duplicates(l):
     return [i for n, i in enumerate(l) if i not in l[:n]]
 
-def encrypt_options(options):
-    return [(column, encrypt_dict({**options, **{'column': column}}))
-            for column in options['columns']]
+def hash_options(options):
+    memo_key = (get_key_index_path(), canonical(options))
+    if memo_key not in OPTION_KEYS:
+        columns = {column: {**options, **{'column': column}}
+                   for column in options['columns']}
+        keys = [(column, hash_dict(d)) for column, d in columns.items()]
+        register_keys({key: columns[column] for column, key in keys})
+        OPTION_KEYS[memo_key] = keys
+    return OPTION_KEYS[memo_key]
 
-def encrypt_options_list(options_list):
-    return [column for options in options_list for column in encrypt_options(options)]
+def hash_options_list(options_list):
+    return [column for options in options_list for column in hash_options(options)]
 
-def get_daily_crypt():
-    return dict(encrypt_options(PARAMS['data_options']['daily']()))
+def get_daily_keys():
+    return dict(hash_options(DAILY_OPTIONS))
 
-def get_close_crypt():
-    return get_daily_crypt()['close']
+def get_close_key():
+    return get_daily_keys()['close']
 
 def filter_columns(keep, data):
     return {
@@ -182,8 +233,8 @@ def filter_dates(data, start, end):
     }
 
 def filter_close(data):
-    close_hash = get_close_crypt()
-    return {date: float(columns[close_hash]) for date, columns in data.items()}
+    close_key = get_close_key()
+    return {date: float(columns[close_key]) for date, columns in data.items()}
 
 def get_columns(data):
     cols = set()
@@ -0,0 +1,193 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+from concurrent.futures import ProcessPoolExecutor
+from data import Data, DataException
+from neural import NeuralNetwork, add_model_args
+from preprocess import make_parts
+from strategy import Strategy
+from optimize import SWEEP_KEYS
+from symbol import get_portfolio_data, add_symbol_args, handle_symbol_args, \
+    handle_options_args, handle_date_args
+from utility import *
+
+class WalkForward(Data):
+
+    def __init__(self, **params):
+        self.symbols = params['symbols']
+        self.options_list = params['options_list']
+        self.start = params.get('start') or '2002-01-01'
+        self.end = params.get('end') or from_date(Date.today())
+        self.train_days = params.get('train_days', 730)
+        self.test_days = params.get('test_days', 90)
+        self.validation = params.get('validation', 0.25)
+        self.threshold = params.get('threshold', 0.8)
+        self.model_params = {k: params[k] for k in SWEEP_KEYS if k in params}
+        # workers don't change the results
+        self.workers = params.pop('workers', os.cpu_count())
+        super().__init__(**params)
+
+    def get_folder(self):
+        return 'walkforward'
+
+    def get_data_path(self):
+        return self.get_path('data.pkl')
+
+    def read_data(self):
+        return read_pickle(self.get_data_path())
+
+    def write_data(self):
+        write_pickle(self.get_data_path(), self.get_data())
+
+    def get_windows(self):
+        return get_windows(self.start, self.end, self.train_days, self.test_days, self.validation)
+
+    def get_neural_params(self, window):
+        parts = [window[p] for p in ['training', 'validation', 'test']]
+        return {**make_parts(self.symbols, self.symbols, self.symbols,
+                             [p[0] for p in parts], [p[1] for p in parts]),
+                **{'options_list': self.options_list}, **self.model_params}
+
+    def get_new_data(self):
+        log('Walking forward...')
+        windows = self.get_windows()
+        if not windows:
+            raise Exception('No walk-forward windows between %s and %s' % (self.start, self.end))
+        # download every symbol once, the windows then only read the shared data
+        get_portfolio_data(self.symbols, self.options_list + [DAILY_OPTIONS], None, None, False)
+        neural_list = [self.get_neural_params(w) for w in windows]
+        # jobs are window-major so a worker reuses the compiled model of a window
+        jobs = [(n, s, w['test'][0], w['test'][1], self.threshold)
+                for n, w in zip(neural_list, windows) for s in self.symbols]
+        with ProcessPoolExecutor(self.workers) as pool:
+            list(pool.map(train_window, neural_list))
+            results = list(pool.map(backtest_window, *zip(*jobs)))
+        return get_report(results)
+
+# rolling train (training + validation) and test windows, each test window follows
+# its train window and the next window starts test_days later
+def get_windows(start, end, train_days, test_days, validation):
+    windows = []
+    train_start = to_date(start)
+    end = to_date(end)
+    while train_start + timedelta(train_days + test_days) <= end:
+        validation_start = train_start + timedelta(int(train_days * (1 - validation)))
+        test_start = train_start + timedelta(train_days)
+        test_end = test_start + timedelta(test_days)
+        windows.append({
+            'training': (from_date(train_start), from_date(validation_start)),
+            'validation': (from_date(validation_start), from_date(test_start)),
+            'test': (from_date(test_start), from_date(test_end))
+        })
+        train_start += timedelta(test_days)
+    return windows
+
+def train_window(neural_params):
+    NeuralNetwork(**neural_params)
+
+def backtest_window(neural_params, symbol, start, end, threshold):
+    result = {'symbol': symbol, 'start': start, 'end': end}
+    try:
+        neural = NeuralNetwork(**neural_params)
+        trades = Strategy(neural=neural, start=start, end=end, symbol=symbol,
+                          threshold=threshold).get_data()
+    except DataException as e:
+        log(e)
+        return {**result, **{'error': str(e).splitlines()[-1]}}
+    return {**result, **get_trade_stats(trades)}
+
+# fractional return of each closed trade, trades alternate opening and closing
+def get_trade_returns(trades):
+    return [
+        (1 if opened['buy'] else -1) * (closed['price'] / opened['price'] - 1)
+        for opened, closed in zip(trades[::2], trades[1::2])
+    ]
+
+def get_trade_stats(trade_list):
+    returns = np.array(get_trade_returns(trade_list))
+    return {
+        'trades': len(returns),
+        'return': float(np.prod(1 + returns) - 1),
+        'win_rate': float(np.mean(returns > 0)) if len(returns) else None
+    }
+
+def summarize(results):
+    returns = [r['return'] for r in results if 'return' in r]
+    wins = [r['win_rate'] * r['trades'] for r in results if r.get('trades')]
+    trades = sum(r.get('trades', 0) for r in results)
+    return {
+        'backtests': len(returns),
+        'errors': len(results) - len(returns),
+        'trades': trades,
+        'mean_return': float(np.mean(returns)) if returns else None,
+        'win_rate': sum(wins) / trades if trades else None
+    }
+
+def get_report(results):
+    windows = remove_duplicates([(r['start'], r['end']) for r in results])
+    return {
+        'results': results,
+        'windows': [{**{'start': start, 'end': end}, **summarize(
+            [r for r in results if (r['start'], r['end']) == (start, end)])}
+            for start, end in windows],
+        'symbols': {symbol: summarize([r for r in results if r['symbol'] == symbol])
+                    for symbol in remove_duplicates([r['symbol'] for r in results])},
+        'total': summarize(results)
+    }
+
+def add_args(parser):
+    add_symbol_args(parser)
+    parser.add_argument('-o', '--options', type=str, nargs='+',
+                        help='indices of data_options in params.py')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.01,
+                        help='tolerance to use in optimal trades algorithm')
+    parser.add_argument('-d', '--days', type=int, default=0,
+                        help='number of prior days of data to use as input per day')
+    add_model_args(parser)
+    parser.add_argument('--train_days', type=int, default=730,
+                        help='calendar days each network is trained and validated on')
+    parser.add_argument('--test_days', type=int, default=90,
+                        help='calendar days each network is backtested on, and the step between windows')
+    parser.add_argument('--validation', type=float, default=0.25,
+                        help='fraction of each train window used for validation')
+    parser.add_argument('--threshold', type=float, default=0.8,
+                        help='prediction magnitude needed to trade')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='number of processes training and backtesting windows')
+
+def handle_args(args, parser):
+    handle_symbol_args(args, parser)
+    handle_options_args(args, parser)
+    handle_date_args(args, parser)
+
+def main():
+    args = parse_args('Walk-forward backtest a strategy.', add_args, handle_args)
+    data = WalkForward(symbols=args.symbols, options_list=args.options_list, start=args.start,
+                       end=args.end, train_days=args.train_days, test_days=args.test_days,
+                       validation=args.validation, threshold=args.threshold, days=args.days,
+                       tolerance=args.tolerance, epochs=args.epochs, nodes=args.nodes,
+                       activation=args.activation, loss=args.loss, workers=args.workers)
+    log(data.get_data()['total'], force=args.print)
+    if args.path:
+        log(data.get_path(), force=args.print)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from abc import abstractmethod
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from stream import WebsocketStream
+from collections import deque
+from exchange import Exchange
+from decoder import loads, decode_response
+from threading import Thread, Lock
+from time import sleep
+import requests
+import bisect
+import time
+
+# Minutes per bar for each timeframe code, as in Strategy.TF_MINS.
+TIMEFRAME_MINUTES = {
+    "1Min": 1, "3Min": 3, "5Min": 5, "15Min": 15, "30Min": 30, "1H": 60,
+    "2H": 120, "3H": 180, "4H": 240, "6H": 360, "8H": 480, "12H": 720,
+    "16H": 960, "1D": 1440, "2D": 2880, "3D": 4320, "4D": 5760,
+    "7D": 10080, "14D": 20160, "28D": 40320}
+
+def resample_bars(bars: list, period: int):
+    """
+    Aggregate ascending 1 min bars into bars of period seconds, each
+    timestamped at the end of its period. Bars without trades are skipped.
+    """
+
+    resampled = []
+    for bar in bars:
+        if bar['close'] is None:
+            continue
+        end = -(-bar['timestamp'] // period) * period
+        if resampled and resampled[-1]['timestamp'] == end:
+            last = resampled[-1]
+            last['high'] = max(last['high'], bar['high'])
+            last['low'] = min(last['low'], bar['low'])
+            last['close'] = bar['close']
+            last['volume'] += bar['volume']
+        else:
+            resampled.append(dict(bar, timestamp=end))
+
+    return resampled
+
+class RateLimiter:
+    """
+    Thread-safe token bucket. Tokens refill continuously at rate per second
+    up to capacity; acquire() blocks until enough tokens are available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = Lock()
+
+    def acquire(self, cost=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                wait = (cost - self.tokens) / self.rate
+            time.sleep(wait)
+
+class AdapterStream(WebsocketStream):
+    """
+    One multiplexed websocket carrying every symbol and channel of an
+    adapter. Subscription and message decoding are delegated to the adapter.
+    """
+
+    def __init__(self, adapter):
+        super().__init__(adapter.logger, adapter.ws_url, adapter.get_name())
+        self.adapter = adapter
+
+    def on_open(self, ws):
+        for msg in self.adapter.subscription_messages():
+            ws.send(msg)
+
+        if self.adapter.HEARTBEAT:
+            Thread(target=self.heartbeat, args=(ws,), daemon=True).start()
+
+    def heartbeat(self, ws):
+        """
+        Send the venue's application level keepalive while ws is connected.
+        """
+
+        while True:
+            sleep(self.adapter.HEARTBEAT_INTERVAL)
+            if self.ws is not ws or not self.connected():
+                return
+            try:
+                ws.send(self.adapter.HEARTBEAT)
+            except Exception:
+                return
+
+    def on_message(self, ws, msg):
+        self.last_message = time.time()
+        try:
+            ticks = self.adapter.parse_stream_message(loads(msg))
+        except Exception as e:
+            self.logger.debug(
+                self.name + " failed to decode message: " + repr(e))
+            return
+        if ticks:
+            self.adapter.add_ticks(ticks)
+
+    def on_reconnect(self, outage):
+        self.adapter.backfill(*outage)
+
+class Adapter(Exchange):
+    """
+    Shared base for REST + websocket venues.
+
+    Implements pooled and rate limited REST requests, bar history,
+    a supervised multiplexed trade stream, tick buffering and tick to bar
+    aggregation once. Venues subclass it and supply only their URLs and the
+    request/parse hooks below. Adapters provide market data only, order
+    routing venues subclass TradingExchange.
+
+    Ticks use a normalised schema:
+        {'timestamp': datetime (UTC), 'symbol': str, 'side': "Buy"/"Sell",
+         'price': float, 'size': float, 'trade_id': venue trade ID}
+    Bars use the build_OHLCV schema, timestamped at the end of the minute.
+    """
+
+    NAME = None
+    BASE_URL = None
+    WS_URL = None
+    SYMBOLS = []
+    MAX_BARS_PER_REQUEST = 500
+    ORIGIN_TIMESTAMPS = {}
+
+    RATE_LIMIT = 10             # REST requests per second.
+    RATE_BURST = 10             # Requests allowed back to back.
+    POOL_SIZE = 10              # Pooled keep-alive connections.
+    MAX_TICKS = 15000           # Buffered ticks per symbol.
+
+    # Application level keepalive message and interval, if the venue needs
+    # one in addition to websocket pings.
+    HEARTBEAT = None
+    HEARTBEAT_INTERVAL = 15
+
+    def __init__(self, logger, symbols=None, base_url=None, ws_url=None,
+                 connect=True):
+        super().__init__()
+        self.logger = logger
+        self.name = self.NAME
+        self.symbols = list(symbols or self.SYMBOLS)
+        self.base_url = base_url or self.BASE_URL
+        self.ws_url = ws_url or self.WS_URL
+        self.origin_tss = dict(self.ORIGIN_TIMESTAMPS)
+
+        self.api_key, self.api_secret = self.load_api_keys()
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.POOL_SIZE))
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.POOL_SIZE))
+        self.limiter = RateLimiter(self.RATE_LIMIT, self.RATE_BURST)
+
+        # Non persistent datastores.
+        self.bars = {}
+        self.ticks = {}
+        self.tick_buffer = {i: deque(maxlen=self.MAX_TICKS)
+                            for i in self.symbols}
+        self.tick_lock = Lock()
+
+        self.ws = AdapterStream(self)
+        if connect:
+            self.ws.connect()
+
+    def request(self, path: str, params=None, method="GET"):
+        """
+        Send a rate limited request over the pooled session.
+
+        Args:
+            path: URL path relative to the venue base URL.
+            params: query parameters (dict).
+            method: HTTP method.
+
+        Returns:
+            Decoded JSON response.
+
+        Raises:
+            Request errors.
+        """
+
+        self.limiter.acquire()
+        response = self.session.request(
+            method, self.base_url + path, params=params)
+        response.raise_for_status()
+
+        return decode_response(response)
+
+    def add_ticks(self, ticks: list):
+        """
+        Buffer normalised ticks, in arrival order, for bar building.
+        """
+
+        with self.tick_lock:
+            for tick in ticks:
+                buffer = self.tick_buffer.get(tick['symbol'])
+                if buffer is not None:
+                    buffer.append(tick)
+
+    def parse_ticks(self, now=None):
+        now = self.clock.time() if now is None else now
+        start = datetime.fromtimestamp(self.previous_minute(now), timezone.utc)
+        end = datetime.fromtimestamp(
+            self.previous_minute(now) + 60, timezone.utc)
+
+        self.ticks = {}
+        self.bars = {}
+        for symbol in self.symbols:
+            with self.tick_lock:
+                buffered = list(self.tick_buffer[symbol])
+
+            stamps = [i['timestamp'] for i in buffered]
+            first = bisect.bisect_left(stamps, start)
+            last = bisect.bisect_left(stamps, end)
+            ticks = buffered[first:last]
+
+            bar = self.build_OHLCV(ticks, symbol, close_as_open=False, now=now)
+
+            # Previous traded price opens the bar, leaving no gaps.
+            if ticks and first > 0:
+                bar['open'] = buffered[first - 1]['price']
+
+            self.ticks[symbol] = ticks
+            self.bars[symbol] = [bar]
+
+    def get_bars_in_period(self, symbol, start_time, total):
+        total = min(total, self.MAX_BARS_PER_REQUEST)
+        path, params = self.bars_request(symbol, start_time, total)
+        response = self.request(path, params)
+
+        return [self.parse_bar(symbol, i) for i in self.bar_rows(response)]
+
+    def get_recent_bars(self, timeframe, symbol, n=1):
+        # Venue history is fetched as 1 min bars and resampled, the last
+        # bar is the most recent one to have closed.
+        period = TIMEFRAME_MINUTES[timeframe] * 60
+        end = (self.previous_minute() + 60) // period * period
+        start = end - n * period + 60
+
+        minute_bars = []
+        while start <= end:
+            page = self.get_bars_in_period(
+                symbol, start, (end - start) // 60 + 1)
+            if not page:
+                break
+            minute_bars += page
+            start = page[-1]['timestamp'] + 60
+
+        return resample_bars(minute_bars, period)
+
+    def get_recent_ticks(self, symbol, n=1):
+        start = datetime.fromtimestamp(
+            self.previous_minute() + 60 - n * 60, timezone.utc)
+        with self.tick_lock:
+            return [i for i in self.tick_buffer[symbol]
+                    if i['timestamp'] >= start]
+
+    def get_origin_timestamp(self, symbol: str):
+        if self.origin_tss.get(symbol) is None:
+            path, params = self.origin_request(symbol)
+            first = self.bar_rows(self.request(path, params))[0]
+            self.origin_tss[symbol] = self.parse_bar(symbol, first)['timestamp']
+            self.logger.debug(
+                self.name + " " + symbol + " origin timestamp: " +
+                str(self.origin_tss[symbol]))
+
+        return self.origin_tss[symbol]
+
+    def backfill(self, start_time, end_time):
+        """
+        Fetch ticks missed during a stream outage, if the venue supports it.
+        Ticks already buffered, such as those either side of the outage
+        boundaries, are skipped by trade ID.
+        """
+
+        for symbol in self.symbols:
+            try:
+                ticks = self.get_ticks_in_period(symbol, start_time, end_time)
+            except NotImplementedError:
+                return
+            except Exception as e:
+                self.logger.debug(
+                    self.name + " backfill failed: " + repr(e))
+                continue
+
+            with self.tick_lock:
+                buffer = self.tick_buffer[symbol]
+                seen = set(i['trade_id'] for i in buffer)
+                missed = [i for i in ticks if i['trade_id'] not in seen]
+                merged = sorted(
+                    list(buffer) + missed, key=lambda i: i['timestamp'])
+                buffer.clear()
+                buffer.extend(merged)
+
+    def get_ticks_in_period(self, symbol, start_time, end_time):
+        """
+        Args:
+            symbol: instrument ticker code (string)
+            start_time: period start epoch timestamp.
+            end_time: period end epoch timestamp, inclusive.
+
+        Returns:
+            Normalised ticks in the period, ascending and unique by trade ID.
+
+        Raises:
+            NotImplementedError if the venue has no tick history.
+        """
+
+        raise NotImplementedError(self.name + " tick history not supported.")
+
+    def origin_request(self, symbol: str):
+        """
+        Return (path, params) for a bar history request whose first bar is
+        the symbol's earliest.
+        """
+
+        return self.bars_request(symbol, 0, 1)
+
+    def bar_rows(self, response):
+        """
+        Return the list of raw bars from a bar history response.
+        """
+
+        return response
+
+    @abstractmethod
+    def bars_request(self, symbol: str, start_time: int, total: int):
+        """
+        Args:
+            symbol: instrument ticker code (string)
+            start_time: epoch timestamp of the first bar close (int)
+            total: number of 1 min bars (int)
+
+        Returns:
+            (path, params) tuple for the venue 1 min bar history endpoint.
+
+        Raises:
+            None.
+        """
+
+    @abstractmethod
+    def parse_bar(self, symbol: str, raw):
+        """
+        Args:
+            symbol: instrument ticker code (string)
+            raw: single bar as returned by the venue.
+
+        Returns:
+            Normalised bar dict, timestamped at the end of the minute.
+
+        Raises:
+            None.
+        """
+
+    @abstractmethod
+    def subscription_messages(self):
+        """
+        Args:
+            None.
+
+        Returns:
+            List of strings to send to subscribe to every symbol's trades.
+
+        Raises:
+            None.
+        """
+
+    @abstractmethod
+    def parse_stream_message(self, msg: dict):
+        """
+        Args:
+            msg: decoded websocket message.
+
+        Returns:
+            List of normalised ticks contained in msg, empty if none.
+
+        Raises:
+            None.
+        """
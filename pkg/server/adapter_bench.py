@@ -0,0 +1,72 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+from http.server import ThreadingHTTPServer
+from adapter_test import MockVenue, ORIGIN, binance_trade, ftx_trade
+from adapter import RateLimiter
+from threading import Thread
+from binance import Binance
+from ftx import FTX
+import logging
+import json
+import time
+
+VENUES = [
+    (Binance, binance_trade, "BTCUSDT", ""),
+    (FTX, ftx_trade, "BTC-PERP", "/api")]
+
+def bench_stream(venue, trade, symbol):
+    count = venue.MAX_TICKS
+    msgs = [json.dumps(trade(symbol, ORIGIN + i * 0.01, 100 + i % 7, 1, i % 2))
+            for i in range(count)]
+
+    start = time.perf_counter()
+    for msg in msgs:
+        venue.ws.on_message(None, msg)
+    return count / (time.perf_counter() - start)
+
+def bench_rest(venue, symbol, count=200):
+    start = time.perf_counter()
+    for i in range(count):
+        venue.get_bars_in_period(symbol, ORIGIN + 60, 10)
+    return count / (time.perf_counter() - start)
+
+if __name__ == '__main__':
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockVenue)
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:" + str(server.server_port)
+
+    for adapter, trade, symbol, path in VENUES:
+        venue = adapter(logging.getLogger(), symbols=[symbol],
+                        base_url=url + path, connect=False)
+
+        # Throughput is measured without the production rate limit.
+        venue.limiter = RateLimiter(10 ** 6, 10 ** 6)
+
+        print(venue.get_name() + " stream: %d msgs/s" % bench_stream(
+            venue, trade, symbol))
+        print(venue.get_name() + " REST:   %d requests/s" % bench_rest(
+            venue, symbol))
+
+    server.shutdown()
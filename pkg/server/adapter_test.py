@@ -0,0 +1,355 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+from adapter import RateLimiter
+from threading import Thread
+from binance import Binance
+from ftx import FTX
+import unittest
+import logging
+import json
+import time
+
+ORIGIN = 1577836800     # First mock bar open, 2020-01-01 00:00 UTC.
+
+def mock_bar(ts):
+    """
+    Deterministic OHLCV for the minute opening at ts.
+    """
+
+    base = 100 + (ts - ORIGIN) / 60
+    return base, base + 2, base - 1, base + 1, 10.0
+
+def mock_trade(n):
+    """
+    Deterministic (timestamp, price, size, seller) of trade ID n. Trades come
+    in pairs sharing a timestamp, 10 seconds apart from ORIGIN.
+    """
+
+    return ORIGIN + n // 2 * 10, 100.0 + n % 7, 1.0, n % 2 == 1
+
+def mock_trade_ids(start, end):
+    """
+    IDs of the mock trades timestamped from start to end inclusive.
+    """
+
+    return range(-(-(start - ORIGIN) // 10) * 2, (end - ORIGIN) // 10 * 2 + 2)
+
+class MockVenue(BaseHTTPRequestHandler):
+    """
+    Serves Binance klines and aggregate trades, and FTX candles and trades,
+    for a continuous history starting at ORIGIN. The FTX market NEW-PERP
+    has no history.
+    """
+
+    requests = 0
+
+    def do_GET(self):
+        MockVenue.requests += 1
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/api/v3/klines":
+            start = max(int(query.get('startTime', 0)) // 1000, ORIGIN)
+            body = [
+                [ts * 1000] + [str(i) for i in mock_bar(ts)]
+                for ts in range(start, start + int(query['limit']) * 60, 60)]
+
+        elif url.path == "/api/v3/aggTrades":
+            if 'fromId' in query:
+                first = int(query['fromId'])
+                ids = range(first, first + int(query['limit']))
+            else:
+                ids = mock_trade_ids(int(query['startTime']) // 1000,
+                                     int(query['endTime']) // 1000)
+                ids = ids[:int(query['limit'])]
+            body = [binance_trade("", *mock_trade(n), n) for n in ids]
+
+        elif url.path.endswith("/trades"):
+            # FTX returns the most recent trades in the range.
+            ids = mock_trade_ids(int(float(query['start_time'])),
+                                 int(float(query['end_time'])))
+            body = {'success': True, 'result': [
+                ftx_trade("", *mock_trade(n), n)['data'][0]
+                for n in reversed(ids)][:int(query['limit'])]}
+
+        elif url.path.startswith("/api/markets/NEW-PERP/"):
+            body = {'success': True, 'result': []}
+
+        elif url.path.startswith("/api/markets/"):
+            # FTX returns the most recent 1500 candles in the range.
+            resolution = int(query['resolution'])
+            start = max(-(-int(query['start_time']) // resolution), ORIGIN //
+                        resolution) * resolution
+            end = int(query['end_time']) // resolution * resolution
+            start = max(start, end - 1499 * resolution)
+            body = {'success': True, 'result': [{
+                'startTime': datetime.fromtimestamp(
+                    ts, timezone.utc).isoformat(),
+                'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+                for ts in range(start, end + 1, resolution)
+                for o, h, l, c, v in [mock_bar(ts)]]}
+
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class FixedClock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+def binance_trade(symbol, ts, price, size, seller, trade_id=0):
+    return {'e': "aggTrade", 's': symbol, 'a': trade_id,
+            'T': int(round(ts * 1000)), 'p': str(price), 'q': str(size),
+            'm': seller}
+
+def ftx_trade(symbol, ts, price, size, seller, trade_id=0):
+    return {'channel': "trades", 'type': "update", 'market': symbol,
+            'data': [{
+                'id': trade_id,
+                'time': datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                'price': price, 'size': size,
+                'side': "sell" if seller else "buy"}]}
+
+class AdapterConformance:
+    """
+    Conformance checks run against every adapter.
+    """
+
+    ADAPTER = None
+    TRADE = None
+    SYMBOL = None
+    BASE_PATH = ""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MockVenue)
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = ("http://127.0.0.1:" + str(cls.server.server_port) +
+                        cls.BASE_PATH)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.venue = self.ADAPTER(
+            logging.getLogger(), symbols=[self.SYMBOL], base_url=self.base_url,
+            connect=False)
+
+        # Throughput is measured without the production rate limit.
+        self.venue.limiter = RateLimiter(10 ** 6, 10 ** 6)
+
+    def test_bar_schema(self):
+        start = ORIGIN + 600
+        bars = self.venue.get_bars_in_period(self.SYMBOL, start, 50)
+
+        self.assertEqual(len(bars), 50)
+        for i, bar in enumerate(bars):
+            self.assertEqual(set(bar), {
+                'symbol', 'timestamp', 'open', 'high', 'low', 'close',
+                'volume'})
+            self.assertEqual(bar['symbol'], self.SYMBOL)
+            self.assertIsInstance(bar['timestamp'], int)
+            self.assertEqual(bar['timestamp'], start + i * 60)
+
+            o, h, l, c, v = mock_bar(bar['timestamp'] - 60)
+            self.assertEqual(
+                (bar['open'], bar['high'], bar['low'], bar['close'],
+                 bar['volume']), (o, h, l, c, v))
+
+    def test_bar_request_capped(self):
+        total = self.venue.get_max_bin_size() + 100
+        bars = self.venue.get_bars_in_period(self.SYMBOL, ORIGIN + 60, total)
+        self.assertEqual(len(bars), self.venue.get_max_bin_size())
+
+    def test_origin_timestamp(self):
+        self.assertEqual(
+            self.venue.get_origin_timestamp(self.SYMBOL), ORIGIN + 60)
+
+    def test_ticks_to_bar(self):
+        minute = ORIGIN + 3600
+        trades = [
+            (minute - 5, 99.0, 1, False),       # Previous minute close.
+            (minute + 1, 101.0, 2, False),
+            (minute + 20, 104.0, 3, True),
+            (minute + 40, 98.0, 1, True),
+            (minute + 59, 102.0, 4, False),
+            (minute + 61, 110.0, 5, False)]     # Following minute.
+
+        for ts, price, size, seller in trades:
+            msg = json.loads(json.dumps(
+                self.TRADE(self.SYMBOL, ts, price, size, seller)))
+            ticks = self.venue.parse_stream_message(msg)
+            self.assertEqual(len(ticks), 1)
+            self.assertEqual(ticks[0]['side'], "Sell" if seller else "Buy")
+            self.venue.add_ticks(ticks)
+
+        self.venue.parse_ticks(now=minute + 61)
+        bar = self.venue.get_new_bars()[self.SYMBOL][0]
+
+        self.assertEqual(bar, {
+            'symbol': self.SYMBOL, 'timestamp': minute + 60, 'open': 99.0,
+            'high': 104.0, 'low': 98.0, 'close': 102.0, 'volume': 10.0})
+
+    def test_empty_minute(self):
+        self.venue.parse_ticks(now=ORIGIN + 61)
+        bar = self.venue.get_new_bars()[self.SYMBOL][0]
+        self.assertIsNone(bar['close'])
+        self.assertEqual(bar['volume'], 0)
+
+    def test_ignores_other_messages(self):
+        self.assertEqual(self.venue.parse_stream_message({'result': None}), [])
+
+    def test_backfill_forward(self):
+        # Consecutive requests walk forward from the origin without gaps.
+        start = self.venue.get_origin_timestamp(self.SYMBOL)
+        total = self.venue.get_max_bin_size()
+        timestamps = []
+        for i in range(3):
+            bars = self.venue.get_bars_in_period(self.SYMBOL, start, total)
+            timestamps += [i['timestamp'] for i in bars]
+            start = bars[-1]['timestamp'] + 60
+
+        self.assertEqual(timestamps, list(range(
+            ORIGIN + 60, ORIGIN + 60 + 3 * total * 60, 60)))
+
+    def test_tick_history(self):
+        # Small pages exercise paging across trades sharing a timestamp.
+        self.venue.MAX_TICKS_PER_REQUEST = 7
+        start, end = ORIGIN + 3600, ORIGIN + 3695
+        ticks = self.venue.get_ticks_in_period(self.SYMBOL, start, end)
+
+        self.assertEqual([i['trade_id'] for i in ticks],
+                         list(mock_trade_ids(start, end)))
+        for tick in ticks:
+            ts, price, size, seller = mock_trade(tick['trade_id'])
+            self.assertEqual(tick['timestamp'].timestamp(), ts)
+            self.assertEqual((tick['symbol'], tick['price'], tick['size']),
+                             (self.SYMBOL, price, size))
+            self.assertEqual(tick['side'], "Sell" if seller else "Buy")
+
+    def test_backfill_merge(self):
+        self.venue.MAX_TICKS_PER_REQUEST = 7
+        start, end = ORIGIN + 3600, ORIGIN + 3690
+        ids = list(mock_trade_ids(start - 20, end + 20))
+
+        # The stream delivered the trades up to and after the outage,
+        # including those at its boundary timestamps.
+        received = [n for n in ids if not start < mock_trade(n)[0] < end]
+        for n in received:
+            self.venue.ws.on_message(None, json.dumps(self.TRADE(
+                self.SYMBOL, *mock_trade(n), n)))
+
+        self.venue.backfill(start, end)
+        buffered = self.venue.tick_buffer[self.SYMBOL]
+        self.assertEqual([i['trade_id'] for i in buffered], ids)
+
+    def test_recent_bars(self):
+        now = ORIGIN + 86400 * 3 + 125
+        self.venue.set_clock(FixedClock(now))
+
+        bars = self.venue.get_recent_bars("1Min", self.SYMBOL, 3)
+        self.assertEqual([i['timestamp'] for i in bars],
+                         [now - 125, now - 65, now - 5])
+
+        # Hourly bars are resampled from the minutes of each hour.
+        bars = self.venue.get_recent_bars("1H", self.SYMBOL, 2)
+        end = ORIGIN + 86400 * 3
+        self.assertEqual([i['timestamp'] for i in bars], [end - 3600, end])
+        o, h, l, c, v = mock_bar(end - 3600)
+        self.assertEqual(bars[1]['open'], o)
+        self.assertEqual(bars[1]['close'], mock_bar(end - 60)[3])
+        self.assertEqual(bars[1]['high'], mock_bar(end - 60)[1])
+        self.assertEqual(bars[1]['low'], l)
+        self.assertEqual(bars[1]['volume'], v * 60)
+
+        # Daily bars need more 1 min bars than one request returns.
+        bars = self.venue.get_recent_bars("1D", self.SYMBOL, 2)
+        self.assertEqual([i['timestamp'] for i in bars], [end - 86400, end])
+        self.assertEqual(bars[0]['volume'], 10.0 * 1440)
+
+    def test_stream_buffer(self):
+        count = self.venue.MAX_TICKS + 10
+        for i in range(count):
+            self.venue.ws.on_message(None, json.dumps(self.TRADE(
+                self.SYMBOL, ORIGIN + i * 0.01, 100 + i % 7, 1, i % 2, i)))
+
+        # Oldest ticks are dropped once the buffer is full.
+        buffered = self.venue.tick_buffer[self.SYMBOL]
+        self.assertEqual(len(buffered), self.venue.MAX_TICKS)
+        self.assertEqual(buffered[0]['timestamp'].timestamp(), ORIGIN + 0.1)
+
+class TestBinance(AdapterConformance, unittest.TestCase):
+    ADAPTER = Binance
+    TRADE = staticmethod(binance_trade)
+    SYMBOL = "BTCUSDT"
+
+class TestFTX(AdapterConformance, unittest.TestCase):
+    ADAPTER = FTX
+    TRADE = staticmethod(ftx_trade)
+    SYMBOL = "BTC-PERP"
+    BASE_PATH = "/api"
+
+    def test_origin_without_history(self):
+        now = ORIGIN + 86400 + 30
+        self.venue.set_clock(FixedClock(now))
+        self.assertEqual(
+            self.venue.get_origin_timestamp("NEW-PERP"),
+            self.venue.previous_minute())
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        limiter = RateLimiter(50, 5)
+        start = time.monotonic()
+        for i in range(15):
+            limiter.acquire()
+        elapsed = time.monotonic() - start
+
+        # First 5 pass immediately, the remaining 10 at 50 per second.
+        self.assertGreaterEqual(elapsed, 10 / 50 * 0.9)
+        self.assertLess(elapsed, 10 / 50 * 2)
+
+if __name__ == '__main__':
+    unittest.main()
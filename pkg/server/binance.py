@@ -0,0 +1,115 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from datetime import datetime, timezone
+from adapter import Adapter
+import json
+
+class Binance(Adapter):
+    """
+    Binance spot exchange model.
+    """
+
+    NAME = "Binance"
+    BASE_URL = "https://api.binance.com"
+    WS_URL = "wss://stream.binance.com:9443/ws"
+    KLINES_URL = "/api/v3/klines"
+    AGG_TRADES_URL = "/api/v3/aggTrades"
+    SYMBOLS = ["BTCUSDT"]
+    MAX_BARS_PER_REQUEST = 1000
+    MAX_TICKS_PER_REQUEST = 1000
+    MAX_TICK_WINDOW = 3600      # Longest aggTrades time range, seconds.
+
+    # Request weight budget is 1200 per minute.
+    RATE_LIMIT = 20
+    RATE_BURST = 20
+
+    def bars_request(self, symbol, start_time, total):
+        return self.KLINES_URL, {
+            'symbol': symbol,
+            'interval': "1m",
+            'startTime': (start_time - 60) * 1000,
+            'limit': total}
+
+    def parse_bar(self, symbol, raw):
+        return {
+            'symbol': symbol,
+            'timestamp': raw[0] // 1000 + 60,
+            'open': float(raw[1]),
+            'high': float(raw[2]),
+            'low': float(raw[3]),
+            'close': float(raw[4]),
+            'volume': float(raw[5])}
+
+    def subscription_messages(self):
+        return [json.dumps({
+            'method': "SUBSCRIBE",
+            'params': [i.lower() + "@aggTrade" for i in self.symbols],
+            'id': 1})]
+
+    def parse_stream_message(self, msg):
+        # Aggregate trades are streamed so their IDs match the REST history.
+        if msg.get('e') != "aggTrade":
+            return []
+
+        return [self.parse_trade(msg['s'], msg)]
+
+    def get_ticks_in_period(self, symbol, start_time, end_time):
+        # The first trades are found by time, an hour at most per request,
+        # later pages follow on from the last aggregate trade ID.
+        rows = []
+        window = start_time
+        while not rows and window < end_time:
+            rows = self.request(self.AGG_TRADES_URL, {
+                'symbol': symbol,
+                'startTime': int(window * 1000),
+                'endTime': int(
+                    min(end_time, window + self.MAX_TICK_WINDOW) * 1000),
+                'limit': self.MAX_TICKS_PER_REQUEST})
+            window += self.MAX_TICK_WINDOW
+
+        ticks = {}
+        while rows:
+            for row in rows:
+                if row['T'] <= end_time * 1000:
+                    ticks[row['a']] = self.parse_trade(symbol, row)
+            if rows[-1]['T'] >= end_time * 1000:
+                break
+            rows = self.request(self.AGG_TRADES_URL, {
+                'symbol': symbol,
+                'fromId': rows[-1]['a'] + 1,
+                'limit': self.MAX_TICKS_PER_REQUEST})
+
+        return sorted(
+            ticks.values(), key=lambda i: (i['timestamp'], i['trade_id']))
+
+    def parse_trade(self, symbol, raw):
+        return {
+            'timestamp': datetime.fromtimestamp(raw['T'] / 1000, timezone.utc),
+            'symbol': symbol,
+            'side': "Sell" if raw['m'] else "Buy",
+            'price': float(raw['p']),
+            'size': float(raw['q']),
+            'trade_id': raw['a']}
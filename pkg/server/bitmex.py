@@ -27,16 +27,20 @@ from datetime import timezone, datetime, timedelta
 from requests import Request, Session
 from requests.auth import AuthBase
 from urllib.parse import urlparse
+from functools import partial
 from bitmex_ws import Bitmex_WS
-from exchange import Exchange
-from dateutil import parser
+from ingest import ShardedIngestor
+from recorder import Recorder
+from exchange import TradingExchange
+from decoder import decode_response, parse_timestamp, parse_datetime
 import traceback
 import requests
 import hashlib
 import hmac
+import json
 import time
 
-class Bitmex(Exchange):
+class Bitmex(TradingExchange):
     """
     BitMEX exchange model.
     """
@@ -45,20 +49,39 @@ class Bitmex(Exchange):
     TIMESTAMP_FORMAT = '%Y-%m-%d%H:%M:%S.%f'
 
     BASE_URL = "https://www.bitmex.com/api/v1"
-    BASE_URL_TESTNET = "https://www.testnet.bitmex.com/api/v1"
+    BASE_URL_TESTNET = "https://testnet.bitmex.com/api/v1"
     WS_URL = "wss://www.bitmex.com/realtime"
+    WS_URL_TESTNET = "wss://testnet.bitmex.com/realtime"
+
+    # Set True to trade and stream market data on testnet instead.
+    TESTNET = False
     BARS_URL = "/trade/bucketed?binSize="
     TICKS_URL = "/trade?symbol="
     POSITIONS_URL = "/position"
     ORDERS_URL = "/order"
+    BULK_ORDERS_URL = "/order/bulk"
+
+    ORDER_TYPES = {
+        "LIMIT": "Limit",
+        "MARKET": "Market",
+        "STOP_MARKET": "Stop",
+        "STOP_LIMIT": "StopLimit"}
 
-    def __init__(self, logger):
+    def __init__(self, logger, shards=0, ws=None, record=None,
+                 orderbook=False, testnet=TESTNET):
         super()
         self.logger = logger
         self.name = "BitMEX"
+
+        # REST and websocket endpoints for the same environment.
+        self.base_url = self.BASE_URL_TESTNET if testnet else self.BASE_URL
+        self.ws_url = self.WS_URL_TESTNET if testnet else self.WS_URL
         self.symbols = ["XBTUSD"]  # "ETHUSD", "XRPUSD"
         self.channels = ["trade"]
 
+        # L2 book subscription, adds order book features to each bar.
+        self.book_channels = ["orderBookL2"] if orderbook else []
+
         self.origin_tss = {
             "XBTUSD": 1483228800,
             "ETHUSD": 1533200520,
@@ -70,22 +93,50 @@ class Bitmex(Exchange):
         self.bars = {}
         self.ticks = {}
 
-        # Connect to trade websocket.
-        self.ws = Bitmex_WS(
-            self.logger, self.symbols, self.channels, self.WS_URL,
-            self.api_key, self.api_secret)
-        if not self.ws.ws.sock.connected:
+        # Pooled keep-alive connection for authenticated requests.
+        self.session = Session()
+
+        if ws is not None:
+            # Injected websocket, e.g. for offline replay.
+            self.ws = ws
+            self.feed = self.ws
+
+        elif shards:
+            # Market data decoded by worker processes, one connection each.
+            self.feed = ShardedIngestor(
+                self.logger, self.symbols, self.channels, self.ws_url, shards,
+                backfill=partial(Bitmex.fetch_ticks, base_url=self.base_url))
+
+            # Account channels and the order book only on the main process
+            # connection.
+            self.ws = Bitmex_WS(
+                self.logger, self.symbols if orderbook else [],
+                self.book_channels, self.ws_url, self.api_key,
+                self.api_secret)
+        else:
+            # Connect to trade websocket, optionally recording raw frames.
+            self.ws = Bitmex_WS(
+                self.logger, self.symbols,
+                self.channels + self.book_channels, self.ws_url,
+                self.api_key, self.api_secret,
+                recorder=Recorder(record) if record else None)
+            self.ws.backfill = self.get_ticks_in_period
+            self.feed = self.ws
+
+        if not self.feed.connected():
             self.logger.debug("Failed to to connect to BitMEX websocket.")
 
-        # Note, for future channel subs, create new Bitmex_WS in new process.
-
-    def parse_ticks(self):
+    def parse_ticks(self, now=None):
 
-        if not self.ws.ws:
+        if not self.feed.connected():
             self.logger.debug("BitMEX websocket disconnected.")
         else:
-            all_ticks = self.ws.get_ticks()
-            target_minute = datetime.now().minute - 1
+            all_ticks = self.feed.get_ticks()
+            now = self.clock.time() if now is None else now
+            target = datetime.fromtimestamp(now, timezone.utc) - timedelta(
+                minutes=1)
+            target_minute = target.minute
+            prior_minute = (target - timedelta(minutes=1)).minute
             ticks_target_minute = []
             tcount = 0
 
@@ -94,7 +145,7 @@ class Bitmex(Exchange):
                 try:
                     ts = i['timestamp']
                     if type(ts) is not datetime:
-                        ts = parser.parse(ts)
+                        ts = parse_datetime(ts)
                 except Exception:
                     self.logger.debug(traceback.format_exc())
 
@@ -106,7 +157,7 @@ class Bitmex(Exchange):
 
                 # Store the previous-to-target bar's last
                 # traded price to use as the open price for target bar.
-                if ts.minute == target_minute - 1:
+                if ts.minute == prior_minute:
                     ticks_target_minute.append(i)
                     ticks_target_minute[tcount]['timestamp'] = ts
                     break
@@ -121,9 +172,40 @@ class Bitmex(Exchange):
             #  Build bars from ticks.
             self.bars = {i: [] for i in self.symbols}
             for symbol in self.symbols:
-                bar = self.build_OHLCV(self.ticks[symbol], symbol)
+                bar = self.build_OHLCV(self.ticks[symbol], symbol, now=now)
                 self.bars[symbol].append(bar)
 
+            self.add_book_features(now)
+
+    def add_book_features(self, now):
+        """
+        Merge the target minute's aggregated order book features into each
+        new bar, if subscribed to the L2 book. Minutes without book updates
+        get null features.
+
+        Args:
+            now: epoch timestamp ticks were parsed at.
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+        books = getattr(self.ws, 'books', None)
+        if not books:
+            return
+
+        minute = self.previous_minute(now)
+        for symbol in self.symbols:
+            book = books.get(symbol)
+            if book is None:
+                continue
+            features = book.collect(minute)
+            for bar in self.bars[symbol]:
+                bar.update(features or dict.fromkeys(book.AGGREGATES))
+
     def get_bars_in_period(self, symbol, start_time, total):
 
         if total >= self.MAX_BARS_PER_REQUEST:
@@ -134,21 +216,21 @@ class Bitmex(Exchange):
         timeframe = "1m"
 
         payload = (
-            f"{self.BASE_URL}{self.BARS_URL}{timeframe}&"
+            f"{self.base_url}{self.BARS_URL}{timeframe}&"
             f"symbol={symbol}&filter=&count={total}&"
             f"startTime={start}&reverse=false")
 
         # Uncomment below line to manually verify results.
         # self.logger.debug("API request string: " + payload)
 
-        bars_to_parse = requests.get(payload).json()
+        bars_to_parse = decode_response(requests.get(payload))
 
         # Store only required values (OHLCV) and convert timestamp to epoch.
         new_bars = []
         for bar in bars_to_parse:
             new_bars.append({
                 'symbol': symbol,
-                'timestamp': int(parser.parse(bar['timestamp']).timestamp()),
+                'timestamp': int(parse_timestamp(bar['timestamp'])),
                 'open': bar['open'],
                 'high': bar['high'],
                 'low': bar['low'],
@@ -157,17 +239,56 @@ class Bitmex(Exchange):
 
         return new_bars
 
+    def get_ticks_in_period(self, symbol, start_time, end_time):
+        return self.fetch_ticks(self.session, symbol, start_time, end_time,
+                                self.base_url)
+
+    @classmethod
+    def fetch_ticks(cls, session, symbol, start_time, end_time,
+                    base_url=None):
+        """
+        Fetch all ticks for symbol between two epoch timestamps.
+
+        Args:
+            session: requests Session to send requests with.
+            symbol: instrument ticker code (string).
+            start_time: period start epoch timestamp.
+            end_time: period end epoch timestamp.
+            base_url: REST endpoint, production if None.
+        Returns:
+            ticks: list of tick dicts in BitMEX trade table format.
+        Raises:
+            Request errors.
+        """
+
+        start = datetime.utcfromtimestamp(start_time).isoformat()
+        end = datetime.utcfromtimestamp(end_time).isoformat()
+        base_url = base_url or cls.BASE_URL
+
+        ticks = []
+        while True:
+            payload = (
+                f"{base_url}{cls.TICKS_URL}{symbol}&count=1000&"
+                f"start={len(ticks)}&reverse=false&startTime={start}&"
+                f"endTime={end}")
+            response = session.get(payload)
+            response.raise_for_status()
+            result = decode_response(response)
+            ticks += result
+            if len(result) < 1000:
+                return ticks
+
     def get_origin_timestamp(self, symbol: str):
 
         if self.origin_tss[symbol] is not None:
             return self.origin_tss[symbol]
         else:
             payload = (
-                f"{self.BASE_URL}{self.BARS_URL}1m&symbol={symbol}&filter=&"
+                f"{self.base_url}{self.BARS_URL}1m&symbol={symbol}&filter=&"
                 f"count=1&startTime=&reverse=false")
 
-            response = requests.get(payload).json()[0]['timestamp']
-            timestamp = int(parser.parse(response).timestamp())
+            response = decode_response(requests.get(payload))[0]['timestamp']
+            timestamp = int(parse_timestamp(response))
 
             self.logger.debug(
                 "BitMEX" + symbol + " origin timestamp: " + str(timestamp))
@@ -177,11 +298,11 @@ class Bitmex(Exchange):
     def get_recent_bars(timeframe, symbol, n=1):
 
         payload = str(
-            self.BASE_URL + self.BARS_URL + timeframe +
+            self.base_url + self.BARS_URL + timeframe +
             "&partial=false&symbol=" + symbol + "&count=" +
             str(n) + "&reverse=true")
 
-        result = requests.get(payload).json()
+        result = decode_response(requests.get(payload))
 
         bars = []
         for i in result:
@@ -211,11 +332,11 @@ class Bitmex(Exchange):
         # Initial poll.
         sleep(1)
         payload = str(
-            self.BASE_URL + self.TICKS_URL + symbol + "&count=" +
+            self.base_url + self.TICKS_URL + symbol + "&count=" +
             "1000&reverse=false&startTime=" + start_iso + "&endTime" + end_iso)
 
         ticks = []
-        initial_result = requests.get(payload).json()
+        initial_result = decode_response(requests.get(payload))
         for tick in initial_result:
             ticks.append(tick)
 
@@ -231,7 +352,7 @@ class Bitmex(Exchange):
                     BASE_URL + TICKS_URL + symbol + "&count=" +
                     "1000&reverse=false&startTime=" + ticks[-1]['timestamp'])
 
-                interim_result = requests.get(payload).json()
+                interim_result = decode_response(requests.get(payload))
                 for tick in interim_result:
                     ticks.append(tick)
 
@@ -239,41 +360,114 @@ class Bitmex(Exchange):
                     maxed_out = False
 
         # Check median tick timestamp matches start_iso.
-        median_dt = parser.parse(ticks[int((len(ticks) / 2))]['timestamp'])
-        match_dt = parser.parse(start_iso)
+        median_dt = parse_datetime(ticks[int((len(ticks) / 2))]['timestamp'])
+        match_dt = datetime.fromisoformat(start_iso)
         if median_dt.minute != match_dt.minute:
             raise Exception("Tick data timestamp error: timestamp mismatch.")
 
         # Populate list with matching-timestamped ticks only.
         final_ticks = [
-            i for i in ticks if parser.parse(
+            i for i in ticks if parse_datetime(
                 i['timestamp']).minute == match_dt.minute]
 
         return final_ticks
 
     def get_positions(self):
-        s = Session()
-        prepared_request = Request(
-            'GET',
-            self.BASE_URL_TESTNET + self.POSITIONS_URL,
-            params='').prepare()
-        request = self.generate_request_headers(prepared_request, api_key,
-                                                api_secret)
-        response = s.send(request).json()
+        positions = self.ws.get_positions()
+        if positions is not None:
+            return positions
 
-        return response
+        return self.send_request('GET', self.POSITIONS_URL)
 
     def get_orders(self):
-        s = Session()
+        orders = self.ws.get_orders()
+        if orders is not None:
+            return orders
+
+        return self.send_request('GET', self.ORDERS_URL,
+                                 params={'filter': '{"open": true}'})
+
+    def get_executions(self):
+        return self.ws.get_executions()
+
+    def send_request(self, request_type, url, params=None):
+        prepared_request = Request(
+            request_type,
+            self.base_url + url,
+            params=params or '').prepare()
+        request = self.generate_request_headers(
+            prepared_request, self.api_key, self.api_secret)
+        response = self.session.send(request)
+        response.raise_for_status()
+
+        return decode_response(response)
+
+    def set_order_callback(self, callback):
+        self.order_callback = callback
+        self.ws.order_callback = callback
+
+    def place_orders(self, orders):
+        payload = json.dumps({'orders': [self.format_order(i) for i in orders]})
         prepared_request = Request(
-            'GET',
-            self.BASE_URL_TESTNET + self.ORDERS_URL,
-            params='').prepare()
-        request = self.generate_request_headers(prepared_request, api_key,
-                                                api_secret)
-        response = s.send(request).json()
+            'POST',
+            self.base_url + self.BULK_ORDERS_URL,
+            data=payload,
+            headers={'Content-Type': 'application/json'}).prepare()
+        request = self.generate_request_headers(
+            prepared_request, self.api_key, self.api_secret)
+        response = self.session.send(request)
+        response.raise_for_status()
+
+        return decode_response(response)
+
+    def cancel_orders(self, order_ids):
+        payload = json.dumps({'clOrdID': order_ids})
+        prepared_request = Request(
+            'DELETE',
+            self.base_url + self.ORDERS_URL,
+            data=payload,
+            headers={'Content-Type': 'application/json'}).prepare()
+        request = self.generate_request_headers(
+            prepared_request, self.api_key, self.api_secret)
+        response = self.session.send(request)
+        response.raise_for_status()
+
+        return decode_response(response)
+
+    def format_order(self, order):
+        """
+        Convert an order dict to a BitMEX order request body.
+
+        Args:
+            order: order dict.
+        Returns:
+            BitMEX order dict, using order_id as client order ID.
+        Raises:
+            None.
+        """
 
-        return response
+        order_type = self.ORDER_TYPES[order['order_type'].upper()]
+        new_order = {
+            'symbol': order['symbol'],
+            'side': "Buy" if order['direction'].upper() == "LONG" else "Sell",
+            'orderQty': int(round(order['size'])),
+            'ordType': order_type,
+            'clOrdID': order['order_id']}
+
+        if order_type in ("Limit", "StopLimit"):
+            new_order['price'] = order['price']
+        if order_type in ("Stop", "StopLimit"):
+            new_order['stopPx'] = order['price']
+
+        exec_inst = []
+        if order['reduce_only']:
+            exec_inst.append("ReduceOnly")
+        if order['post_only']:
+            exec_inst.append("ParticipateDoNotInitiate")
+        if exec_inst:
+            new_order['execInst'] = ",".join(exec_inst)
+
+        return new_order
 
     def generate_request_signature(self, secret, request_type, url, nonce,
                                    data):
@@ -323,7 +517,7 @@ class Bitmex(Exchange):
         nonce = str(int(round(time.time()) + 5))
         request.headers['api-expires'] = nonce
         request.headers['api-key'] = api_key
-        request.headers['api-signature'] = generate_request_signature(
+        request.headers['api-signature'] = self.generate_request_signature(
             api_secret, request.method, request.url, nonce, request.body or '')
 
         return request
\ No newline at end of file
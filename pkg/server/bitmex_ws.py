@@ -23,19 +23,33 @@ The server is a multi-asset, multi-strategy, event-driven trade execution and
 backtesting platform for trading common markets.
 """
 
-from time import sleep
-from threading import Thread
-import websocket
+from stream import WebsocketStream
+from orderbook import OrderBook
+from decoder import loads
+import hashlib
+import hmac
 import json
+import queue
+import time
 import traceback
 
-class Bitmex_WS:
+class Bitmex_WS(WebsocketStream):
 
-    def __init__(self, logger, symbols, channels, URL, api_key, api_secret):
-        self.logger = logger
+    # Account channels subscribed once authenticated, not per symbol.
+    PRIVATE_CHANNELS = ["order", "position", "execution"]
+
+    # Seconds an authentication signature remains valid.
+    AUTH_EXPIRY = 60
+
+    # Longest outage (seconds) backfilled with ticks over REST. Bars for
+    # longer outages are left to the datahandler diagnostics.
+    MAX_BACKFILL = 900
+
+    def __init__(self, logger, symbols, channels, URL, api_key, api_secret,
+                 trade_callback=None, recorder=None, connect=True):
+        super().__init__(logger, URL, "BitMEX")
         self.symbols = symbols
         self.channels = channels
-        self.URL = URL
         if api_key is not None and api_secret is None:
             raise ValueError('Enter both public and secret keys')
         if api_key is None and api_secret is not None:
@@ -44,50 +58,72 @@ class Bitmex_WS:
         self.api_secret = api_secret
         self.data = {}
         self.keys = {}
+
+        # Invoked with (clOrdID, order) as new orders appear in order table.
+        self.order_callback = None
+
+        # Trade executions received on the private execution channel, not
+        # yet consumed by the broker.
+        self.executions = queue.Queue(0)
+        self.authenticated = False
+
+        # Called with (symbol, start, end) epoch timestamps after reconnecting,
+        # returns the symbol's ticks traded during the outage.
+        self.backfill = None
+
+        # Called with each list of new trade table rows, including backfill.
+        self.trade_callback = trade_callback
+
+        # Outage windows awaiting backfill.
+        self.pending_backfill = []
+
+        # Optional Recorder persisting every raw frame as it is received.
+        self.recorder = recorder
+
+        # Incremental L2 books, maintained instead of the generic data table
+        # when subscribed to orderBookL2.
+        self.books = {}
+        if "orderBookL2" in channels:
+            self.books = {i: OrderBook(i) for i in symbols}
         # websocket.enableTrace(True)
 
         # Data table size - approcimate tick/min capacity per symbol.
         self.MAX_SIZE = 15000 * len(symbols)
-        self.RECONNECT_TIMEOUT = 10
 
-        self.connect()
+        if connect:
+            self.connect()
 
-    def connect(self):
+    def monitored(self):
+        """
+        Only market data connections are expected to be continuously active.
         """
-        Args:
-            None
 
-        Returns:
-            Starts the websocket in a thread and connects to subscription
-            channels.
+        return bool(self.symbols and self.channels)
 
-        Raises:
-            None.
+    def close(self):
+        """
+        Stops the supervisor, closes the websocket and any recorder.
         """
 
-        self.ws = websocket.WebSocketApp(
-            self.URL,
-            on_message=lambda ws, msg: self.on_message(ws, msg),
-            on_error=lambda ws, msg: self.on_error(ws, msg),
-            on_close=lambda ws: self.on_close(ws),
-            on_open=lambda ws: self.on_open(ws))
-
-        thread = Thread(
-            target=lambda: self.ws.run_forever(),
-            daemon=True)
-        thread.start()
-        self.logger.debug("Started websocket daemon.")
-
-        timeout = self.RECONNECT_TIMEOUT
-        while not self.ws.sock or not self.ws.sock.connected and timeout:
-            sleep(1)
-            timeout -= 1
-        if not timeout:
-            self.logger.debug("Websocket connection timed out.")
-            # Attempt to reconnect
-            if not self.ws.sock.connected:
-                sleep(5)
-                self.connect()
+        super().close()
+        if self.recorder:
+            self.recorder.close()
+
+    def mark_disconnected(self):
+        """
+        Records the start of an outage, private channels need to
+        reauthenticate on reconnection.
+        """
+
+        self.authenticated = False
+        super().mark_disconnected()
+
+    def on_reconnect(self, outage):
+        """
+        Ticks are backfilled once the new trade table partial is received.
+        """
+
+        self.pending_backfill.append(outage)
 
     def on_message(self, ws, msg):
         """
@@ -104,27 +140,74 @@ class Bitmex_WS:
             Exception("Unknown")
         """
 
-        msg = json.loads(msg)
+        self.last_message = time.time()
+        if self.recorder:
+            self.recorder.write(self.last_message, msg)
+        msg = loads(msg)
         # self.logger.debug(json.dumps(msg))
         table = msg['table'] if 'table' in msg else None
         action = msg['action'] if 'action' in msg else None
         try:
 
+            if table == 'orderBookL2' and self.books:
+                self.update_books(action, msg['data'])
+                return
+
             if 'subscribe' in msg:
                 self.logger.debug(
                     "Subscribed to " + msg['subscribe'] + ".")
 
+            elif 'request' in msg and msg['request']['op'] == 'authKeyExpires':
+                if msg.get('success'):
+                    self.authenticated = True
+                    ws.send(self.get_private_subscription_string())
+                    self.logger.debug("BitMEX websocket authenticated.")
+                else:
+                    self.logger.debug(
+                        "BitMEX websocket authentication failed: " +
+                        str(msg.get('error')))
+
+            elif 'error' in msg:
+                self.logger.debug("BitMEX websocket error: " + msg['error'])
+
             elif action:
                 if table not in self.data:
                     self.data[table] = []
 
             if action == 'partial':
-                self.data[table] = msg['data']
+                # Resubscribing after an outage resends only recent trades,
+                # keep ticks already received earlier in the minute.
+                if table == 'trade' and self.data.get('trade'):
+                    missed = self.merge_trades(msg['data'])
+                    if missed and self.trade_callback:
+                        self.trade_callback(missed)
+
+                # Fills during the outage only arrive in the new partial.
+                elif table == 'execution' and table in self.keys:
+                    for execution in self.merge_executions(msg['data']):
+                        self.executions.put(execution)
+                else:
+                    self.data[table] = msg['data']
                 self.keys[table] = msg['keys']
 
+                if table == 'trade' and self.pending_backfill:
+                    self.backfill_trades()
+
             elif action == 'insert':
                 self.data[table] += msg['data']
 
+                if table == 'order' and self.order_callback:
+                    for order in msg['data']:
+                        self.order_callback(order.get('clOrdID'), order)
+
+                if table == 'trade' and self.trade_callback:
+                    self.trade_callback(msg['data'])
+
+                if table == 'execution':
+                    for execution in msg['data']:
+                        if execution.get('execType') == 'Trade':
+                            self.executions.put(execution)
+
                 # Trim data table size when it exceeds MAX_SIZE.
                 if(table not in ['order', 'orderBookL2'] and
                         len(self.data[table]) > self.MAX_SIZE):
@@ -172,47 +255,133 @@ class Bitmex_WS:
             None.
         """
 
-        ws.send(self.get_channel_subscription_string())
+        if self.symbols and self.channels:
+            ws.send(self.get_channel_subscription_string())
+
+        # Private channels are subscribed once authentication succeeds.
+        if self.api_key:
+            ws.send(self.get_auth_string())
+
+    def backfill_trades(self):
+        """
+        Merges ticks missed during recorded outages into the trade table.
+
+        Args:
+            None.
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
 
-    def on_error(self, ws, msg):
+        outages, self.pending_backfill = self.pending_backfill, []
+        if not self.backfill:
+            return
+
+        ticks = []
+        for start, end in outages:
+            start = max(start, end - self.MAX_BACKFILL)
+            for symbol in self.symbols:
+                try:
+                    ticks += self.backfill(symbol, start, end)
+                except Exception:
+                    self.logger.debug(traceback.format_exc())
+
+        missed = self.merge_trades(ticks)
+        if missed:
+            if self.trade_callback:
+                self.trade_callback(missed)
+            self.logger.debug(
+                "Backfilled " + str(len(missed)) + " ticks over REST.")
+
+    def merge_trades(self, ticks):
         """
-        Invoked when websocket encounters an error. Will attempt to
-        reconnect websocket after an error.
-    
+        Merges ticks into the trade table, skipping any already present.
+
         Args:
-            ws: WebSocketApp object
-            msg: message object
+            ticks: list of tick dicts in BitMEX trade table format.
 
         Returns:
+            missed: list of merged ticks not previously in the table, in
+            timestamp order.
+
+        Raises:
             None.
+        """
+
+        known = set(i.get('trdMatchID') for i in self.data.get('trade', []))
+        missed = []
+        for tick in ticks:
+            if tick.get('trdMatchID') not in known:
+                known.add(tick.get('trdMatchID'))
+                missed.append(tick)
+
+        # ISO 8601 timestamps of equal format sort chronologically.
+        missed.sort(key=lambda i: i['timestamp'])
+        if missed:
+            self.data['trade'] = sorted(
+                self.data.get('trade', []) + missed,
+                key=lambda i: i['timestamp'])
+
+        return missed
+
+    def merge_executions(self, executions):
+        """
+        Merges executions into the execution table, skipping any already
+        present.
+
+        Args:
+            executions: list of execution dicts in BitMEX execution table
+                format.
+
+        Returns:
+            missed: list of merged trade executions not previously in the
+            table, in timestamp order.
 
         Raises:
             None.
         """
 
-        self.logger.debug("BitMEX websocket error: " + str(msg))
+        known = set(i.get('execID') for i in self.data.get('execution', []))
+        merged = []
+        for execution in executions:
+            if execution.get('execID') not in known:
+                known.add(execution.get('execID'))
+                merged.append(execution)
+
+        merged.sort(key=lambda i: i['timestamp'])
+        self.data['execution'] = self.data.get('execution', []) + merged
 
-        # attempt to reconnect if  ws is not connected
-        self.ws = None
-        self.logger.debug("Attempting to reconnect.")
-        sleep(self.RECONNECT_TIMEOUT)
-        self.connect()
+        return [i for i in merged if i.get('execType') == 'Trade']
 
-    def on_close(self, ws):
+    def update_books(self, action, rows):
         """
-        Invoked when websocket closes.
-        
+        Applies an orderBookL2 message to each symbol's book.
+
         Args:
-            ws: WebSocketApp object
+            action: message action (string).
+            rows: message data rows (list).
 
         Returns:
-            Invoked when websocket closes.
+            None.
 
         Raises:
             None.
         """
 
-        ws.close()
+        if action is None:
+            return
+
+        by_symbol = {}
+        for row in rows:
+            by_symbol.setdefault(row['symbol'], []).append(row)
+
+        for symbol, symbol_rows in by_symbol.items():
+            book = self.books.get(symbol)
+            if book is not None:
+                book.apply(action, symbol_rows)
 
     def get_orderbook(self):
         """
@@ -222,12 +391,16 @@ class Bitmex_WS:
             None.
 
         Returns:
-            L2 Orderbook (list).
+            OrderBook objects by symbol (dict) if subscribed to orderBookL2,
+            otherwise the raw L2 table (list).
 
         Raises:
             None.
         """
 
+        if self.books:
+            return self.books
+
         return self.data['orderBookL2']
 
     def get_ticks(self):
@@ -246,6 +419,59 @@ class Bitmex_WS:
 
         return self.data['trade']
 
+    def get_positions(self):
+        """
+        Returns the live position mirror.
+
+        Args:
+            None.
+
+        Returns:
+            Positions (list), or None before the position table is received.
+
+        Raises:
+            None.
+        """
+
+        return self.data.get('position')
+
+    def get_orders(self):
+        """
+        Returns the live open order mirror.
+
+        Args:
+            None.
+
+        Returns:
+            Open orders (list), or None before the order table is received.
+
+        Raises:
+            None.
+        """
+
+        return self.data.get('order')
+
+    def get_executions(self):
+        """
+        Returns trade executions received since the last call.
+
+        Args:
+            None.
+
+        Returns:
+            Executions (list), oldest first.
+
+        Raises:
+            None.
+        """
+
+        executions = []
+        while True:
+            try:
+                executions.append(self.executions.get(False))
+            except queue.Empty:
+                return executions
+
     def find_item_by_keys(self, keys, table, match_data):
         """
         Finds an item in the data table using the provided key.
@@ -297,6 +523,46 @@ class Bitmex_WS:
                     string += ", "
         return prefix + string + suffix
 
+    def get_auth_string(self):
+        """
+        Returns websocket authentication payload.
+
+        Args:
+            None.
+
+        Returns:
+            authKeyExpires payload (string), signed with the API secret.
+
+        Raises:
+            None.
+        """
+
+        expires = int(time.time()) + self.AUTH_EXPIRY
+        signature = hmac.new(
+            bytes(self.api_secret, 'utf8'),
+            bytes('GET/realtime' + str(expires), 'utf8'),
+            digestmod=hashlib.sha256).hexdigest()
+
+        return json.dumps({
+            "op": "authKeyExpires",
+            "args": [self.api_key, expires, signature]})
+
+    def get_private_subscription_string(self):
+        """
+        Returns websocket subscription string for private account channels.
+
+        Args:
+            None.
+
+        Returns:
+            Subscription payload (string) for PRIVATE_CHANNELS.
+
+        Raises:
+            None.
+        """
+
+        return json.dumps({"op": "subscribe", "args": self.PRIVATE_CHANNELS})
+
     def match_leaves_quantity(self, o):
         """
         Args:
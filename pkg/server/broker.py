@@ -23,18 +23,56 @@ The server is a multi-asset, multi-strategy, event-driven trade execution and
 backtesting platform for trading common markets.
 """
 
+from simulator import MatchingEngine
+from gateway import OrderGateway
+from exchange import TradingExchange
+from event_types import FillEvent, RejectEvent
+from decoder import parse_timestamp
+import queue
+
 class Broker:
     """
     Broker consumes Order events, executes orders, then creates and places
     Fill events in the event queue post-transaction.
+
+    When not live trading, or when paper trading, orders are filled by a
+    local matching simulator against the incoming market data. Otherwise
+    orders are batched and placed with venues through the order gateway.
     """
 
-    def __init__(self, exchanges, logger, db_other, db_client, live_trading):
+    def __init__(self, exchanges, logger, db_other, db_client, live_trading,
+                 paper_trading=False):
         self.exchanges = exchanges
         self.logger = logger
         self.db_other = db_other
         self.db_client = db_client
         self.live_trading = live_trading
+        self.paper_trading = paper_trading
+
+        self.simulator = MatchingEngine(logger)
+
+        # Venues that accept orders, market data only venues are excluded.
+        self.routes = {
+            i.get_name(): i for i in exchanges
+            if isinstance(i, TradingExchange)}
+
+        # Dispatcher thread and venue workers only needed for live venues.
+        self.gateway = None if self.simulated() else OrderGateway(
+            self.routes.values(), logger, self.request_failed)
+
+        # Order dicts placed with live venues, {order_id: order dict}.
+        self.live_orders = {}
+
+        # (order dict, reason) of placements the venue did not accept,
+        # reported from gateway workers.
+        self.rejected = queue.Queue(0)
+
+    def simulated(self):
+        """
+        Return True if orders are to be filled by the local simulator.
+        """
+
+        return not self.live_trading or self.paper_trading
 
     def new_order(self, events, event):
         """
@@ -51,4 +89,136 @@ class Broker:
         Raises:
             None.
         """
-        pass
\ No newline at end of file
+
+        if self.simulated():
+            if event.status == "CANCELLED":
+                self.simulator.cancel(event.venue, event.symbol,
+                                      event.order_id)
+            else:
+                self.simulator.submit(event.get_order_dict())
+
+        elif event.venue not in self.routes:
+            self.logger.debug(
+                "Order " + str(event.order_id) + " dropped, " + event.venue +
+                " does not route orders.")
+
+        elif event.status == "CANCELLED":
+            self.live_orders.pop(event.order_id, None)
+            self.gateway.cancel(event.get_order_dict())
+        else:
+            self.live_orders[event.order_id] = event.get_order_dict()
+            self.gateway.submit(event.get_order_dict())
+
+    def update_price(self, events, market_event):
+        """
+        Match simulated resting orders against a new bar, or collect live
+        venue executions, and queue resulting Fill events.
+
+        Args:
+            events: event queue object.
+            market_event: new market event.
+
+        Returns:
+           None.
+
+        Raises:
+            None.
+        """
+
+        if self.simulated():
+            fills = self.simulator.match_bar(
+                market_event.get_exchange().get_name(),
+                market_event.get_bar())
+            for fill in fills:
+                events.put(fill)
+
+        else:
+            self.check_executions(events)
+            self.check_rejections(events)
+
+    def check_executions(self, events):
+        """
+        Queue Fill events for executions streamed by live venues.
+
+        Args:
+            events: event queue object.
+
+        Returns:
+           None.
+
+        Raises:
+            None.
+        """
+
+        for exchange in self.routes.values():
+            for execution in exchange.get_executions():
+                order = self.live_orders.get(execution.get('clOrdID'))
+                if order is None:
+                    self.logger.debug(
+                        "Execution for unknown order " +
+                        str(execution.get('clOrdID')) + ".")
+                    continue
+
+                if not execution.get('leavesQty'):
+                    del self.live_orders[order['order_id']]
+
+                # Orders are sized in contract notional, so the fill value is
+                # the filled size and fees a fraction of it, as simulated.
+                value = execution['lastQty']
+                events.put(FillEvent(
+                    int(parse_timestamp(execution['timestamp'])),
+                    order['symbol'], exchange.get_name(), value,
+                    order['direction'], value,
+                    value * self.fee_rate(execution), execution['lastPx'],
+                    order))
+
+    def request_failed(self, action, orders, reason):
+        """
+        Gateway failure callback, queues failed placements for the event
+        loop. Failed cancellations leave the order to the venue's own state.
+        """
+
+        if action == "place":
+            for order in orders:
+                self.rejected.put((order, reason))
+
+    def check_rejections(self, events):
+        """
+        Queue Reject events for placements the venue did not accept.
+
+        Args:
+            events: event queue object.
+
+        Returns:
+           None.
+
+        Raises:
+            None.
+        """
+
+        while True:
+            try:
+                order, reason = self.rejected.get(False)
+            except queue.Empty:
+                return
+
+            # Orders cancelled in the meantime are already closed out.
+            if self.live_orders.pop(order['order_id'], None) is not None:
+                events.put(RejectEvent(order, reason))
+
+    def fee_rate(self, execution):
+        """
+        Return the fee charged on an execution as a fraction of its value,
+        negative for maker rebates.
+
+        The fee actually charged (execComm over execCost, both in satoshis)
+        is used where the venue reports it, otherwise the quoted commission
+        rate. Being a ratio, it applies unchanged to the contract notional.
+        """
+
+        charged = execution.get('execComm')
+        cost = execution.get('execCost')
+        if charged is not None and cost:
+            return charged / abs(cost)
+
+        return execution.get('commission') or 0
@@ -0,0 +1,116 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from recorder import Replay_WS
+from bitmex import Bitmex
+from broker import Broker
+import unittest
+import logging
+import queue
+import json
+
+def make_order(order_id, direction="LONG"):
+    return {
+        'trade_id': 1, 'order_id': order_id, 'venue': "BitMEX",
+        'symbol': "XBTUSD", 'direction': direction, 'order_type': "LIMIT",
+        'price': 10000, 'size': 100, 'reduce_only': False,
+        'post_only': False}
+
+def make_execution(order_id, qty, leaves, price=10000, exec_type="Trade",
+                   comm=None, rate=0.00075):
+    # Inverse contract: cost in satoshis is contracts / price in XBT.
+    cost = round(qty / price * 1e8) if qty else 0
+    return {
+        'execID': order_id + "-" + str(leaves), 'clOrdID': order_id,
+        'symbol': "XBTUSD", 'execType': exec_type, 'lastQty': qty,
+        'lastPx': price, 'leavesQty': leaves, 'commission': rate,
+        'execCost': -cost, 'execComm': comm,
+        'timestamp': "2018-06-01T00:00:01.500Z"}
+
+class TestExecutions(unittest.TestCase):
+
+    def setUp(self):
+        logger = logging.getLogger(__name__)
+        self.ws = Replay_WS(logger, ["XBTUSD"], ["trade", "execution"])
+        self.exchange = Bitmex(logger, ws=self.ws)
+        self.broker = Broker([self.exchange], logger, None, None, True)
+        self.events = queue.Queue(0)
+
+        # Register orders without sending them through the gateway.
+        for order_id in ("a", "b"):
+            self.broker.live_orders[order_id] = make_order(order_id)
+
+    def stream(self, *executions):
+        self.ws.on_message(None, json.dumps({
+            'table': "execution", 'action': "insert",
+            'data': list(executions)}))
+        self.broker.check_executions(self.events)
+        fills = []
+        while not self.events.empty():
+            fills.append(self.events.get())
+        return fills
+
+    def test_fill_value_and_fee(self):
+        fill, = self.stream(make_execution("a", 100, 0, comm=750))
+        self.assertEqual(fill.quantity, 100)
+        self.assertEqual(fill.price, 10000)
+        self.assertEqual(fill.fill_cost, 100)
+        # Taker fee on 100 contracts, as the simulator charges it.
+        self.assertAlmostEqual(fill.commission, 0.075)
+        self.assertEqual(fill.direction, "LONG")
+        self.assertEqual(fill.exchange, "BitMEX")
+        self.assertEqual(fill.timestamp, 1527811201)
+        self.assertNotIn("a", self.broker.live_orders)
+
+    def test_partial_fills(self):
+        first, = self.stream(make_execution("a", 40, 60, comm=300))
+        self.assertIn("a", self.broker.live_orders)
+        second, = self.stream(make_execution("a", 60, 0, 10010, comm=450))
+        self.assertNotIn("a", self.broker.live_orders)
+        self.assertEqual([first.quantity, second.quantity], [40, 60])
+        self.assertEqual(second.fill_cost, 60)
+        self.assertAlmostEqual(second.commission, 0.045, 4)
+
+    def test_maker_rebate(self):
+        fill, = self.stream(make_execution("a", 100, 0, comm=-250))
+        self.assertAlmostEqual(fill.commission, -0.025)
+
+    def test_quoted_rate(self):
+        # Without the charged fee, the quoted commission rate is applied.
+        fill, = self.stream(make_execution("a", 100, 0, rate=-0.00025))
+        self.assertAlmostEqual(fill.commission, -0.025)
+
+    def test_ignored_executions(self):
+        fills = self.stream(
+            make_execution("a", 0, 100, exec_type="New"),
+            make_execution("unknown", 100, 0, comm=750),
+            make_execution("b", 100, 0, comm=750))
+        self.assertEqual([i.order_dict['order_id'] for i in fills], ["b"])
+        self.assertIn("a", self.broker.live_orders)
+        self.broker.check_executions(self.events)
+        self.assertTrue(self.events.empty())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from abc import ABC, abstractmethod
+import time
+
+class Clock(ABC):
+    """
+    Clock abstract class, source of the current time for all components.
+    """
+
+    @abstractmethod
+    def time(self):
+        """
+        Args:
+            None.
+
+        Returns:
+            Current epoch timestamp (float).
+
+        Raises:
+            None.
+        """
+
+    @abstractmethod
+    def sleep(self, seconds: float):
+        """
+        Args:
+            seconds: clock seconds to wait.
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+    def previous_minute(self):
+        """
+        Args:
+            None.
+
+        Returns:
+            Epoch timestamp of the start of the previous minute (int).
+
+        Raises:
+            None.
+        """
+
+        return int(self.time()) // 60 * 60 - 60
+
+    def seconds_til_next_minute(self):
+        """
+        Args:
+            None.
+
+        Returns:
+            Seconds until the next minute begins (float).
+
+        Raises:
+            None.
+        """
+
+        return 60 - self.time() % 60
+
+class RealTimeClock(Clock):
+    """
+    System wall clock, used for live trading.
+    """
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+class SimulatedClock(Clock):
+    """
+    Clock that only moves when told to. Sleeping advances the clock
+    instantly, so loops written against a clock run at full CPU speed.
+    """
+
+    def __init__(self, start=0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self.now += seconds
+
+    def set(self, timestamp: float):
+        """
+        Move the clock to timestamp, never backwards.
+        """
+
+        self.now = max(self.now, timestamp)
+
+class AcceleratedClock(Clock):
+    """
+    Clock running at a multiple of real time from a given start timestamp.
+    """
+
+    def __init__(self, start, factor):
+        self.start = start
+        self.factor = factor
+        self.real_start = time.time()
+
+    def time(self):
+        return self.start + (time.time() - self.real_start) * self.factor
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds / self.factor)
@@ -0,0 +1,115 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from clock import SimulatedClock, AcceleratedClock
+from unittest import mock
+import unittest
+
+class FakeTime:
+    """
+    Stands in for the time module, real time moves only on sleep.
+    """
+
+    def __init__(self, now):
+        self.now = now
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+class TestSimulatedClock(unittest.TestCase):
+
+    def test_minute_boundaries(self):
+        clock = SimulatedClock(1527811200)
+        self.assertEqual(clock.previous_minute(), 1527811140)
+        self.assertEqual(clock.seconds_til_next_minute(), 60)
+
+        clock.sleep(59.5)
+        self.assertEqual(clock.previous_minute(), 1527811140)
+        self.assertEqual(clock.seconds_til_next_minute(), 0.5)
+
+        clock.sleep(0.5)
+        self.assertEqual(clock.previous_minute(), 1527811200)
+        self.assertEqual(clock.seconds_til_next_minute(), 60)
+
+    def test_minute_loop(self):
+        # Sleeping until the next minute lands on each boundary in turn.
+        clock = SimulatedClock(1527811200 + 17.25)
+        minutes = []
+        for _ in range(5):
+            clock.sleep(clock.seconds_til_next_minute())
+            minutes.append(clock.previous_minute())
+        self.assertEqual(
+            minutes, [1527811200 + 60 * i for i in range(5)])
+        self.assertEqual(clock.time(), 1527811500)
+
+    def test_set(self):
+        clock = SimulatedClock(100)
+        clock.set(130)
+        self.assertEqual(clock.time(), 130)
+        clock.set(90)
+        self.assertEqual(clock.time(), 130)
+        clock.sleep(-5)
+        self.assertEqual(clock.time(), 130)
+        self.assertEqual(clock.previous_minute(), 60)
+
+class TestAcceleratedClock(unittest.TestCase):
+
+    def setUp(self):
+        self.real = FakeTime(1000)
+        patcher = mock.patch("clock.time", self.real)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.clock = AcceleratedClock(1527811200, 60)
+
+    def test_scaled_time(self):
+        self.assertEqual(self.clock.time(), 1527811200)
+        self.real.now += 0.5
+        self.assertEqual(self.clock.time(), 1527811230)
+        self.assertEqual(self.clock.seconds_til_next_minute(), 30)
+
+    def test_minute_boundaries(self):
+        self.real.now += 0.25
+        self.clock.sleep(self.clock.seconds_til_next_minute())
+        self.assertEqual(self.real.slept, [0.75])
+        self.assertEqual(self.clock.time(), 1527811260)
+        self.assertEqual(self.clock.previous_minute(), 1527811200)
+
+        # A minute of clock time is one real second at 60x.
+        self.clock.sleep(self.clock.seconds_til_next_minute())
+        self.assertEqual(self.real.slept, [0.75, 1])
+        self.assertEqual(self.clock.previous_minute(), 1527811260)
+
+    def test_no_negative_sleep(self):
+        self.clock.sleep(0)
+        self.clock.sleep(-1)
+        self.assertEqual(self.real.slept, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from datetime import datetime, timezone
+import heapq
+
+class Consolidator:
+    """
+    Merges the per-venue ticks of the just-elapsed minute into composite bars.
+
+    Each composite symbol maps venue names to that venue's ticker for the
+    same underlying. After every exchange has parsed its ticks, the venue
+    tick lists (each already time ordered) are k-way merged with a heap and
+    walked once, producing a volume-weighted composite bar together with
+    per-venue VWAP premiums and the widest cross-venue price spread seen
+    during the minute.
+
+    The consolidator stands in for an exchange in Market events, so
+    strategies subscribe to composite symbols under the venue name
+    "Composite" like any other instrument.
+
+    Composite bars extend the build_OHLCV schema with flat columns, so they
+    store and load as plain rows:
+        {'symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume',
+         'vwap': float, 'spread': float,
+         '<venue>_vwap': float, '<venue>_volume': float,
+         '<venue>_premium': float (bps vs composite vwap)}
+    with one set of venue columns per member venue, named in lower case.
+    Volume is in base currency units.
+    """
+
+    NAME = "Composite"
+
+    # (venue, symbol) pairs whose tick size is quote currency notional
+    # (inverse contracts), converted to base units as size / price.
+    INVERSE = {("BitMEX", "XBTUSD"), ("BitMEX", "ETHUSD")}
+
+    def __init__(self, logger, composites: dict):
+        self.logger = logger
+        self.composites = composites
+        self.bars = {}
+
+    def get_name(self):
+        return self.NAME
+
+    def get_symbols(self):
+        return list(self.composites)
+
+    def get_new_bars(self):
+        return self.bars
+
+    def consolidate(self, exchanges: list, now: int):
+        """
+        Build composite bars for the minute preceding now from the ticks
+        each exchange parsed for that minute.
+
+        Args:
+            exchanges: exchange objects, parse_ticks() already called.
+            now: epoch timestamp the exchanges parsed ticks at.
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+        end = int(now) // 60 * 60
+        window = (datetime.fromtimestamp(end - 60, timezone.utc),
+                  datetime.fromtimestamp(end, timezone.utc))
+        venues = {i.get_name(): i for i in exchanges}
+
+        self.bars = {}
+        for symbol, members in self.composites.items():
+            streams = []
+            for venue, ticker in members.items():
+                exchange = venues.get(venue)
+                if exchange is None:
+                    continue
+                ticks = exchange.ticks.get(ticker) or []
+                streams.append(self.venue_stream(
+                    venue, ticks, window, (venue, ticker) in self.INVERSE))
+
+            self.bars[symbol] = [self.build_composite_bar(
+                symbol, end, list(members), heapq.merge(*streams))]
+
+    def venue_stream(self, venue: str, ticks: list, window: tuple,
+                     inverse=False):
+        """
+        Yield (timestamp, venue, price, size) for a venue's ticks inside the
+        window, sizes in base units.
+        """
+
+        start, end = window
+        for tick in ticks:
+            ts = tick['timestamp']
+            if ts < start:
+                continue
+            if ts >= end:
+                return
+            price = tick['price']
+            size = tick['size'] / price if inverse else tick['size']
+            yield ts, venue, price, size
+
+    def build_composite_bar(self, symbol: str, timestamp: int, venues: list,
+                            merged):
+        """
+        Aggregate a time ordered merged tick stream in a single pass.
+
+        Args:
+            symbol: composite ticker code (string).
+            timestamp: bar close epoch timestamp (int).
+            venues: member venue names (list).
+            merged: iterable of (timestamp, venue, price, size) tuples in
+                time order.
+
+        Returns:
+            Composite 1 min bar (dict).
+
+        Raises:
+            None.
+        """
+
+        open_price = high = low = close = None
+        volume = notional = 0
+        spread = 0
+        last = {}
+        venue_volume = dict.fromkeys(venues, 0)
+        venue_notional = dict.fromkeys(venues, 0)
+
+        for ts, venue, price, size in merged:
+            if open_price is None:
+                open_price = high = low = price
+            elif price > high:
+                high = price
+            elif price < low:
+                low = price
+            close = price
+            volume += size
+            notional += price * size
+            venue_volume[venue] += size
+            venue_notional[venue] += price * size
+
+            # Widest gap between the latest traded prices across venues.
+            last[venue] = price
+            if len(last) > 1:
+                gap = max(last.values()) - min(last.values())
+                if gap > spread:
+                    spread = gap
+
+        vwap = notional / volume if volume else None
+        bar = {'symbol': symbol,
+               'timestamp': timestamp,
+               'open': open_price,
+               'high': high,
+               'low': low,
+               'close': close,
+               'volume': volume,
+               'vwap': vwap,
+               'spread': spread if len(last) > 1 else None}
+
+        for venue in venues:
+            v_vwap = (venue_notional[venue] / venue_volume[venue]
+                      if venue_volume[venue] else None)
+            prefix = venue.lower() + "_"
+            bar[prefix + 'vwap'] = v_vwap
+            bar[prefix + 'volume'] = venue_volume[venue]
+            bar[prefix + 'premium'] = (
+                (v_vwap - vwap) / vwap * 10000 if v_vwap is not None else None)
+
+        return bar
@@ -0,0 +1,120 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from consolidate import Consolidator
+from datetime import datetime, timezone
+import unittest
+import logging
+
+START = 1527811200     # Minute being consolidated.
+
+class StubExchange:
+    def __init__(self, name, ticks):
+        self.name = name
+        self.ticks = ticks
+
+    def get_name(self):
+        return self.name
+
+def tick(second, price, size):
+    return {'timestamp': datetime.fromtimestamp(START + second, timezone.utc),
+            'price': price, 'size': size}
+
+class TestConsolidator(unittest.TestCase):
+
+    def setUp(self):
+        self.consolidator = Consolidator(logging.getLogger(__name__), {
+            "BTCUSD": {"BitMEX": "XBTUSD", "Binance": "BTCUSDT"}})
+
+    def consolidate(self, bitmex, binance):
+        exchanges = [StubExchange("BitMEX", {"XBTUSD": bitmex}),
+                     StubExchange("Binance", {"BTCUSDT": binance})]
+        self.consolidator.consolidate(exchanges, START + 61)
+        bar, = self.consolidator.get_new_bars()["BTCUSD"]
+        return bar
+
+    def test_composite_bar(self):
+        # Inverse sizes are USD, converted to base units at the tick price.
+        bar = self.consolidate(
+            [tick(-1, 90, 1000), tick(1, 100, 1000), tick(30, 110, 2200),
+             tick(60, 120, 1200)],
+            [tick(10, 104, 2), tick(20, 96, 1)])
+
+        self.assertEqual(bar['timestamp'], START + 60)
+        self.assertEqual(
+            (bar['open'], bar['high'], bar['low'], bar['close']),
+            (100, 110, 96, 110))
+        self.assertAlmostEqual(bar['volume'], 33)
+        self.assertAlmostEqual(bar['vwap'], (1000 + 2200 + 208 + 96) / 33)
+
+        self.assertAlmostEqual(bar['bitmex_volume'], 30)
+        self.assertAlmostEqual(bar['bitmex_vwap'], 3200 / 30)
+        self.assertAlmostEqual(bar['binance_volume'], 3)
+        self.assertAlmostEqual(bar['binance_vwap'], 304 / 3)
+
+    def test_premium(self):
+        bar = self.consolidate(
+            [tick(1, 101, 1010)], [tick(2, 99, 10), tick(3, 99, 10)])
+        vwap = (1010 + 1980) / 30
+        self.assertAlmostEqual(
+            bar['bitmex_premium'], (101 - vwap) / vwap * 10000)
+        self.assertAlmostEqual(
+            bar['binance_premium'], (99 - vwap) / vwap * 10000)
+
+        # Premiums weighted by venue volume net to zero.
+        self.assertAlmostEqual(
+            bar['bitmex_premium'] * bar['bitmex_volume'] +
+            bar['binance_premium'] * bar['binance_volume'], 0)
+
+    def test_spread(self):
+        # Widest gap between the latest prices, not the minute's range.
+        bar = self.consolidate(
+            [tick(1, 100, 100), tick(5, 107, 107), tick(9, 101, 101)],
+            [tick(2, 102, 1), tick(6, 103, 1), tick(10, 99, 1)])
+        self.assertEqual(bar['spread'], 5)
+
+    def test_single_venue(self):
+        bar = self.consolidate([tick(1, 100, 100), tick(2, 105, 105)], [])
+        self.assertIsNone(bar['spread'])
+        self.assertAlmostEqual(bar['vwap'], 102.5)
+        self.assertEqual(bar['binance_volume'], 0)
+        self.assertIsNone(bar['binance_vwap'])
+        self.assertIsNone(bar['binance_premium'])
+        self.assertAlmostEqual(bar['bitmex_premium'], 0)
+
+    def test_empty_minute(self):
+        bar = self.consolidate([tick(-5, 100, 100)], [tick(70, 100, 1)])
+        self.assertIsNone(bar['open'])
+        self.assertIsNone(bar['vwap'])
+        self.assertEqual(bar['volume'], 0)
+
+    def test_flat_row(self):
+        # Bars are stored as database rows, so every value is a scalar.
+        bar = self.consolidate([tick(1, 100, 100)], [tick(2, 101, 1)])
+        for key, value in bar.items():
+            self.assertNotIsInstance(value, (dict, list), key)
+
+if __name__ == '__main__':
+    unittest.main()
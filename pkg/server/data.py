@@ -25,6 +25,7 @@ backtesting platform for trading common markets.
 
 from event_types import MarketEvent
 from itertools import groupby, count
+from clock import RealTimeClock
 from pymongo import MongoClient, errors
 from itertools import groupby, count
 from event_types import MarketEvent
@@ -43,15 +44,26 @@ class Datahandler:
     Strategy object to consume.
     """
 
-    def __init__(self, exchanges, logger, db, db_client):
+    def __init__(self, exchanges, logger, db, db_client, clock=None,
+                 consolidator=None):
         self.exchanges = exchanges
         self.logger = logger
         self.db = db
         self.db_client = db_client
         self.db_collections = {
             i.get_name(): db[i.get_name()] for i in self.exchanges}
+
+        # Optional cross-venue composite feed, built after venue bars.
+        self.consolidator = consolidator
+        if consolidator:
+            self.db_collections[consolidator.get_name()] = db[
+                consolidator.get_name()]
         self.live_trading = False
         self.ready = False
+
+        # Time source for bar boundaries. Sleeps pacing venue requests are
+        # rate limits and stay in real time.
+        self.clock = clock or RealTimeClock()
         self.total_instruments = self.get_total_instruments()
         self.bars_save_to_db = queue.Queue(0)
 
@@ -104,8 +116,9 @@ class Datahandler:
         # Record tick parse performance.
         self.logger.debug("Started parsing new ticks.")
         start_parse = time.time()
+        now = self.clock.time()
         for exchange in self.exchanges:
-            exchange.parse_ticks()
+            exchange.parse_ticks(now=now)
         end_parse = time.time()
         duration = round(end_parse - start_parse, 5)
 
@@ -129,6 +142,16 @@ class Datahandler:
                     # TODO: store bars concurrently in a separate process.
                     self.bars_save_to_db.put(event)
 
+        # Composite bars from the same minute's ticks across venues.
+        if self.consolidator:
+            self.consolidator.consolidate(self.exchanges, now)
+            bars = self.consolidator.get_new_bars()
+            for symbol in self.consolidator.get_symbols():
+                for bar in bars[symbol]:
+                    event = MarketEvent(self.consolidator, bar)
+                    new_market_events.append(event)
+                    self.bars_save_to_db.put(event)
+
         return new_market_events
 
     def track_tick_processing_performance(self, duration):
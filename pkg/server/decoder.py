@@ -0,0 +1,97 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from datetime import datetime, timezone
+import json
+
+# Use the fastest installed JSON library, falling back to the stdlib.
+try:
+    import orjson
+    BACKEND = "orjson"
+    loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+        BACKEND = "ujson"
+        loads = ujson.loads
+    except ImportError:
+        BACKEND = "json"
+        loads = json.loads
+
+# Cumulative days before each month in a non-leap year.
+MONTH_DAYS = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+
+def decode_response(response):
+    """
+    Decode a requests Response body with the selected JSON backend.
+    """
+
+    return loads(response.content)
+
+def parse_timestamp(ts: str):
+    """
+    Convert a UTC ISO 8601 timestamp to epoch seconds (float).
+
+    Fixed-format timestamps as sent by BitMEX ("2020-01-01T00:00:00.000Z",
+    with or without fractional seconds) are decoded by slicing. Anything
+    else is handed to datetime.fromisoformat.
+
+    Args:
+        ts: ISO 8601 timestamp string.
+
+    Returns:
+        Epoch timestamp (float).
+
+    Raises:
+        ValueError if the timestamp cannot be parsed.
+    """
+
+    if len(ts) >= 20 and ts[-1] == 'Z' and ts[10] == 'T':
+        year = int(ts[0:4])
+        month = int(ts[5:7])
+        day = int(ts[8:10])
+
+        # Days since epoch, counting leap days before this date.
+        y = year - 1 if month <= 2 else year
+        days = (365 * (year - 1970) + (y // 4 - y // 100 + y // 400) - 477 +
+                MONTH_DAYS[month - 1] + day - 1)
+
+        seconds = (days * 86400 + int(ts[11:13]) * 3600 +
+                   int(ts[14:16]) * 60 + int(ts[17:19]))
+        if len(ts) > 21:
+            seconds += float(ts[19:-1])
+        return float(seconds)
+
+    dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def parse_datetime(ts: str):
+    """
+    Convert a UTC ISO 8601 timestamp to a timezone aware datetime.
+    """
+
+    return datetime.fromtimestamp(parse_timestamp(ts), timezone.utc)
@@ -0,0 +1,103 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from recorder import read_recording
+from dateutil import parser
+import decoder
+import random
+import json
+import time
+import sys
+
+def load_messages(path=None, count=20000):
+    """
+    Load captured websocket frames from a Recorder file (.gz) or a text
+    file with one raw JSON message per line, or generate BitMEX-like trade
+    messages if no capture is given.
+    """
+
+    if path and path.endswith(".gz"):
+        return [msg for received, msg in read_recording(path)]
+
+    if path:
+        with open(path) as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+
+    messages = []
+    ts = 1577836800
+    for i in range(count):
+        trades = []
+        for j in range(random.randint(1, 5)):
+            ts += random.random()
+            trades.append({
+                "timestamp": time.strftime(
+                    "%Y-%m-%dT%H:%M:%S", time.gmtime(ts)) +
+                ".%03dZ" % int(ts % 1 * 1000),
+                "symbol": "XBTUSD",
+                "side": random.choice(["Buy", "Sell"]),
+                "size": random.randint(1, 10000),
+                "price": round(7000 + random.random() * 100, 1),
+                "tickDirection": "PlusTick",
+                "trdMatchID": "%032x" % random.getrandbits(128),
+                "grossValue": random.randint(1, 10 ** 8),
+                "homeNotional": random.random(),
+                "foreignNotional": random.randint(1, 10000)})
+        messages.append(json.dumps(
+            {"table": "trade", "action": "insert", "data": trades}))
+
+    return messages
+
+def decode_baseline(messages):
+    for msg in messages:
+        for tick in json.loads(msg)['data']:
+            parser.parse(tick['timestamp']).timestamp()
+
+def decode_fast(messages):
+    for msg in messages:
+        for tick in decoder.loads(msg)['data']:
+            decoder.parse_timestamp(tick['timestamp'])
+
+def bench(fn, messages, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = time.process_time()
+        fn(messages)
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == '__main__':
+    messages = load_messages(sys.argv[1] if len(sys.argv) > 1 else None)
+    messages = [m for m in messages if '"data"' in m and '"timestamp"' in m]
+
+    baseline = bench(decode_baseline, messages)
+    fast = bench(decode_fast, messages)
+
+    print("Messages: " + str(len(messages)) + ", JSON backend: " +
+          decoder.BACKEND)
+    print("json + dateutil: %.2f us/msg" % (baseline / len(messages) * 1e6))
+    print("decoder:         %.2f us/msg" % (fast / len(messages) * 1e6))
+    print("CPU saved:       %.2f us/msg (%.1fx)" % (
+        (baseline - fast) / len(messages) * 1e6, baseline / fast))
@@ -0,0 +1,102 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+from datetime import datetime, timezone, timedelta
+from decoder_bench import load_messages
+from dateutil import parser
+import decoder
+import unittest
+import random
+import json
+
+def random_timestamps(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    timestamps = []
+    for i in range(count):
+        dt = start + timedelta(seconds=rng.randint(0, 130 * 365 * 86400))
+        timestamps.append(dt.strftime("%Y-%m-%dT%H:%M:%S") + rng.choice([
+            "Z", ".%03dZ" % rng.randint(0, 999),
+            ".%06dZ" % rng.randint(0, 999999)]))
+    return timestamps
+
+class TestParseTimestamp(unittest.TestCase):
+
+    def assert_matches_dateutil(self, ts):
+        self.assertAlmostEqual(
+            decoder.parse_timestamp(ts), parser.parse(ts).timestamp(),
+            places=6, msg=ts)
+
+    def test_random(self):
+        for ts in random_timestamps(20000):
+            self.assert_matches_dateutil(ts)
+
+    def test_calendar_edges(self):
+        for ts in ["1970-01-01T00:00:00.000Z", "1999-12-31T23:59:59.999Z",
+                   "2000-02-29T12:00:00.000Z", "2000-03-01T00:00:00.000Z",
+                   "2019-02-28T23:59:59Z", "2019-03-01T00:00:00Z",
+                   "2020-02-29T00:00:00.500Z", "2020-12-31T23:59:59.999Z",
+                   "2100-02-28T00:00:00.000Z", "2100-03-01T00:00:00.000Z"]:
+            self.assert_matches_dateutil(ts)
+
+    def test_fallback_formats(self):
+        for ts in ["2020-01-01T00:00:00+00:00", "2020-01-01T05:30:00+05:30",
+                   "2020-01-01T00:00:00.250000-04:00", "2020-01-01T00:00:00",
+                   "2020-01-01"]:
+            expected = parser.parse(ts)
+            if expected.tzinfo is None:
+                expected = expected.replace(tzinfo=timezone.utc)
+            self.assertAlmostEqual(
+                decoder.parse_timestamp(ts), expected.timestamp(), msg=ts)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, decoder.parse_timestamp, "yesterday")
+
+    def test_parse_datetime(self):
+        ts = "2020-02-29T10:20:30.123Z"
+        dt = decoder.parse_datetime(ts)
+        self.assertEqual(dt.tzinfo, timezone.utc)
+        self.assertEqual(dt, parser.parse(ts))
+
+class TestLoads(unittest.TestCase):
+
+    def test_matches_json(self):
+        random.seed(0)
+        for msg in load_messages(count=500):
+            self.assertEqual(decoder.loads(msg), json.loads(msg))
+
+    def test_unicode_and_numbers(self):
+        msg = json.dumps({'a': [1, -2.5, 1e-8, 12345678901234], 'b': "é",
+                          'c': None, 'd': True, 'e': {}})
+        self.assertEqual(decoder.loads(msg), json.loads(msg))
+
+    def test_decode_response(self):
+        class Response:
+            content = b'[{"price": 7000.5, "size": 10}]'
+
+        self.assertEqual(decoder.decode_response(Response()),
+                         [{'price': 7000.5, 'size': 10}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -142,6 +142,8 @@ class OrderEvent(Event):
         self.reduce_only = order_dict['reduce_only']
         self.post_only = order_dict['post_only']
         self.status = order_dict['status']
+        self.venue = order_dict.get('venue')
+        self.symbol = order_dict.get('symbol')
 
     def __str__(self):
         return str(" ")
@@ -159,13 +161,17 @@ class FillEvent(Event):
     """
 
     def __init__(self, timestamp, symbol, exchange, quantity,
-                 direction, fill_cost, commission=None):
+                 direction, fill_cost, commission=None, price=None,
+                 order_dict=None):
         self.type = 'FILL'
         self.timestamp = timestamp     # Fill timestamp
         self.symbol = symbol           # Instrument ticker
         self.exchange = exchange       # Source exchange
         self.quantity = quantity       # Position size.
-        self.fill_cost = fill_cost     # USD value of fees.
+        self.direction = direction     # LONG or SHORT.
+        self.fill_cost = fill_cost     # Value of filled size at fill price.
+        self.price = price             # Fill price, including slippage.
+        self.order_dict = order_dict   # Filled order dict.
 
         # use BitMEX taker fees as placeholder
         if commission is None:
@@ -173,6 +179,32 @@ class FillEvent(Event):
         else:
             self.commission = commission
 
-    def calculate_commission(self):
-        """
-        """
\ No newline at end of file
+    def __str__(self):
+        return str("Fill Event: " + str(self.direction) + " " +
+                   str(self.quantity) + " " + str(self.symbol) + " at " +
+                   str(self.price) + " Fees: " + str(self.commission))
+
+    def get_order_dict(self):
+        return self.order_dict
+
+class RejectEvent(Event):
+    """
+    Reports an order the venue did not accept, so the portfolio can update
+    the parent trade.
+    """
+
+    def __init__(self, order_dict, reason=None):
+        self.type = 'REJECT'
+        self.order_dict = order_dict
+        self.trade_id = order_dict['trade_id']
+        self.order_id = order_dict['order_id']
+        self.venue = order_dict.get('venue')
+        self.symbol = order_dict.get('symbol')
+        self.reason = reason
+
+    def __str__(self):
+        return str("Reject Event: " + str(self.order_id) + " at " +
+                   str(self.venue) + ": " + str(self.reason))
+
+    def get_order_dict(self):
+        return self.order_dict
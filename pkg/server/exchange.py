@@ -25,6 +25,8 @@ backtesting platform for trading common markets.
 
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
+from clock import RealTimeClock
+from decoder import parse_datetime
 import os
 
 class Exchange(ABC):
@@ -32,6 +34,9 @@ class Exchange(ABC):
     Exchange abstract class, concrete brokers/exchange classes to inherit this.
     """
 
+    # Time source, replaced via set_clock() for backtests and replays.
+    clock = RealTimeClock()
+
     def __init__(self):
         pass
 
@@ -91,32 +96,35 @@ class Exchange(ABC):
 
         return self.name
 
-    def previous_minute(self):
+    def set_clock(self, clock):
         """
         Args:
-            None.
+            clock: Clock object to read the current time from.
 
         Returns:
-            Previous minute epoch timestamp (int).
+            None.
 
         Raises:
             None.
         """
 
-        d1 = datetime.now().second
-        d2 = datetime.now().microsecond
-        timestamp = datetime.now() - timedelta(
-            minutes=1, seconds=d1, microseconds=d2)
+        self.clock = clock
+
+    def previous_minute(self, now=None):
+        """
+        Args:
+            now: epoch timestamp to use as the current time, defaults to the
+                exchange clock.
 
-        # convert to epoch
-        timestamp = int(timestamp.timestamp())
+        Returns:
+            Previous minute epoch timestamp (int).
 
-        # # replace final digit with zero, can be 1 or more during a slow cycle
-        timestamp_str = list(str(timestamp))
-        timestamp_str[len(timestamp_str) - 1] = "0"
-        timestamp = int(''.join(timestamp_str))
+        Raises:
+            None.
+        """
 
-        return timestamp
+        now = self.clock.time() if now is None else now
+        return int(now) // 60 * 60 - 60
 
     def seconds_til_next_minute(self):
         """
@@ -130,12 +138,11 @@ class Exchange(ABC):
             None.
         """
 
-        now = datetime.datetime.utcnow().second
-        delay = 60 - now - 1
-        return delay
+        return self.clock.seconds_til_next_minute()
 
     def build_OHLCV(
-            self, ticks: list, symbol: str, close_as_open=True, offset=60):
+            self, ticks: list, symbol: str, close_as_open=True, offset=60,
+            now=None):
 
         """
         Args:
@@ -150,6 +157,8 @@ class Exchange(ABC):
             offset: number of second to advance timestamps by. Some venues
                 timestamp their bars differently. Tradingview bars are
                 timestamped 1 minute behind bitmex, for example.
+            now: epoch timestamp to use as the current time, defaults to the
+                exchange clock.
 
         Returns:
             A 1 min OHLCV bar (dict).
@@ -165,9 +174,9 @@ class Exchange(ABC):
 
                 # Convert incoming timestamp format if required.
                 if type(ticks[0]['timestamp']) is not datetime:
-                    median = parser.parse(
+                    median = parse_datetime(
                         ticks[int((len(ticks) / 2))]['timestamp'])
-                    first = parser.parse(ticks[0]['timestamp'])
+                    first = parse_datetime(ticks[0]['timestamp'])
                 else:
                     median = ticks[int((len(ticks) / 2))]['timestamp']
                     first = ticks[0]['timestamp']
@@ -202,7 +211,7 @@ class Exchange(ABC):
             close_price = ticks[-1]['price'] if len(prices) >= 1 else None
 
             bar = {'symbol': symbol,
-                   'timestamp': self.previous_minute() + offset,
+                   'timestamp': self.previous_minute(now) + offset,
                    'open': open_price,
                    'high': high_price,
                    'low': low_price,
@@ -212,7 +221,7 @@ class Exchange(ABC):
 
         elif ticks is None or not ticks:
             bar = {'symbol': symbol,
-                   'timestamp': self.previous_minute() + offset,
+                   'timestamp': self.previous_minute(now) + offset,
                    'open': None,
                    'high': None,
                    'low': None,
@@ -235,16 +244,16 @@ class Exchange(ABC):
             None.
 
         Returns:
-            key: api key matching exchange name.
-            secret: api secret key matching venue name.
+            key: api key matching exchange name, None if unset.
+            secret: api secret key matching venue name, None if unset.
 
         Raises:
             None.
         """
 
         venue_name = self.get_name().upper()
-        key = os.environ[venue_name + '_API_KEY']
-        secret = os.environ[venue_name + '_API_SECRET']
+        key = os.environ.get(venue_name + '_API_KEY')
+        secret = os.environ.get(venue_name + '_API_SECRET')
 
         return key, secret
 
@@ -307,10 +316,11 @@ class Exchange(ABC):
         """
 
     @abstractmethod
-    def parse_ticks(self):
+    def parse_ticks(self, now=None):
         """
         Args:
-            None.
+            now: epoch timestamp to use as the current time, defaults to the
+                exchange clock.
 
         Returns:
             Converts streamed websocket tick data into a 1-min OHLCV bars, then
@@ -320,6 +330,27 @@ class Exchange(ABC):
             None.
         """
 
+class TradingExchange(Exchange):
+    """
+    Exchange that also routes orders and reports account state. Venues
+    providing market data only subclass Exchange directly.
+    """
+
+    def set_order_callback(self, callback):
+        """
+        Args:
+            callback: function(order_id, order) invoked when the venue
+                acknowledges a new order.
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+        self.order_callback = callback
+
     @abstractmethod
     def get_positions(self):
         """
@@ -340,8 +371,50 @@ class Exchange(ABC):
             None.
 
         Returns:
-            List containing all orders, both active and inactive.
+            List containing open orders.
+
+        Raises:
+            None.
+        """
+
+    def get_executions(self):
+        """
+        Args:
+            None.
+
+        Returns:
+            List of trade executions received since the last call. Venues
+            without a streaming execution feed return an empty list.
 
         Raises:
             None.
+        """
+
+        return []
+
+    @abstractmethod
+    def place_orders(self, orders: list):
+        """
+        Args:
+            orders: list of order dicts, placed in as few requests as the
+                venue allows.
+
+        Returns:
+            Venue response.
+
+        Raises:
+            Request errors.
+        """
+
+    @abstractmethod
+    def cancel_orders(self, order_ids: list):
+        """
+        Args:
+            order_ids: list of order ID strings, as set on the order dicts.
+
+        Returns:
+            Venue response.
+
+        Raises:
+            Request errors.
         """
\ No newline at end of file
@@ -29,47 +29,82 @@ import talib as ta
 import pandas as pd
 import numpy as np
 
+# JIT compile the fractal scan if numba is installed.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def fractal_scan(high, low, half):
+    """
+    Single pass fractal classification, one bar at a time. Compiled with
+    numba when available, used for windows wider than the vectorised
+    comparisons handle efficiently.
+    """
+
+    n = len(high)
+    frac = np.zeros(n)
+    for i in range(half, n - half):
+        top = True
+        bottom = True
+        for k in range(1, half + 1):
+            if not (high[i] > high[i - k] and high[i] > high[i + k]):
+                top = False
+            if not (low[i] < low[i - k] and low[i] < low[i + k]):
+                bottom = False
+            if not top and not bottom:
+                break
+        if top:
+            frac[i] = 1
+        elif bottom:
+            frac[i] = -1
+
+    return frac
+
+if njit is not None:
+    fractal_scan = njit(cache=True)(fractal_scan)
+
 class Features:
     """
     Model feature library.
     """
 
-    def trending(self, lookback_period: int, bars):
+    # Widest half window classified with vectorised comparisons, wider
+    # windows use the JIT compiled scan.
+    VECTOR_HALF_WINDOW = 10
+
+    def trending(self, lookback_period: int, bars, window: int = 5):
         """
         Return True if price action (bars) forming successive higher or
         lower swings. Return direction = -1 for downtrend, 0 for no trend,
         1 for uptrend.
 
+        Swings are the last three top and bottom fractals within the final
+        lookback_period bars. Fewer than three of either is no trend.
+
         Returns:
-            trending
+            trending, direction
         """
 
         self.check_bars_type(bars)
 
-        fractals = self.fractals(bars[lookback_period:], window=window)
-        highs = np.multiply(bars.high.values, fractals)
-        highs = highs[highs > 0]
-        lows = np.multiply(bars.low.values, fractals)
-        lows = lows[lows < 0]*(-1)
+        bars = bars.iloc[-lookback_period:]
+        fractals = self.fractals(bars, window=window)
+        highs = bars['high'].values[fractals == 1]
+        lows = bars['low'].values[fractals == -1]
 
-        trending = False
-        direction = 0
+        if len(highs) < 3 or len(lows) < 3:
+            return False, 0
 
         if (highs[-1] > highs[-2] and highs[-2] > highs[-3]
                 and lows[-1] > lows[-2] and lows[-2] > lows[-3]):
-            trending = True
-            direction = 1
+            return True, 1
 
         elif (highs[-1] < highs[-2] and highs[-2] < highs[-3]
                 and lows[-1] < lows[-2] and lows[-2] < lows[-3]):
-            trending = True
-            direction = -1
-
-        else:
-            trending = False
-            direction = 0
+            return True, -1
 
-        return trending, direction
+        return False, 0
 
     def new_trend(self, bars: list):
         """
@@ -108,7 +143,7 @@ class Features:
         convergent = False
         return convergent
 
-    def sr_levels(bars, n=8, t=0.02, s=3, f=3):
+    def sr_levels(self, bars, n=8, t=0.02, s=3, f=3):
         """
         Find support and resistance levels using smoothed close price.
 
@@ -120,8 +155,7 @@ class Features:
             f: number of filter passes.
 
         Returns:
-            support: list of support levels
-            resistance: list of resistance levels
+            Sorted list of support and resistance levels.
 
         Raises:
             None.
@@ -131,118 +165,93 @@ class Features:
         # Convert n to next even number.
         if n % 2 != 0:
             n += 1
+        half = n // 2
 
         # Find number of bars.
-        n_ltp = bars.close.values.shape[0]
+        close = bars.close.values
+        n_ltp = close.shape[0]
+        if n_ltp <= n:
+            return []
 
         # Smooth close data.
-        ltp_smoothed = smooth(bars.close.values, (n + 1), s)
+        ltp_smoothed = smooth(close, (n + 1), s)
 
         # Find delta (difference in adjacent prices).
         ltp_delta = np.zeros(n_ltp)
         ltp_delta[1:] = np.subtract(ltp_smoothed[1:], ltp_smoothed[:-1])
 
-        resistance = []
-        support = []
-
-        # Identify initial levels.
-        for i in range(n_ltp - n):
-
-            # Get window for current bar.
-            window = ltp_delta[i:(i + n)]
-
-            # Split window in half.
-            first = window[:int((n / 2))]  # first half
-            last = window[int((n / 2)):]  # second half
-
-            # Find highs and lows for both halves of window.
-            # First/last being higher or lower indicates asc/desc price.
-            r_1 = np.sum(first > 0)
-            r_2 = np.sum(last < 0)
-            s_1 = np.sum(first < 0)
-            s_2 = np.sum(last > 0)
-
-            # Detect local maxima. If two points match, its a level.
-            if r_1 == (n / 2) and r_2 == (n / 2):
-                try:
-                    resistance.append(bars.close.values[i + (int((n / 2)) - 1)])
-                # Catch empty list error if no levels are present.
-                except Exception as ex:
-                    pass
-
-            # Detect local minima. If two points match, its a level.
-            if s_1 == (n / 2) and s_2 == (n / 2):
-                try:
-                    support.append(bars.close.values[i + (int((n / 2)) - 1)])
-                # Catch empty list error if no levels are present.
-                except Exception as ex:
-                    pass
+        # Running counts of rising and falling deltas, so the counts in any
+        # window half are a difference of two cumulative sums.
+        rising = np.concatenate(([0], np.cumsum(ltp_delta > 0)))
+        falling = np.concatenate(([0], np.cumsum(ltp_delta < 0)))
+
+        # Window i covers deltas i to i + n - 1, split in half.
+        start = np.arange(n_ltp - n)
+        mid = start + half
+        end = start + n
+        r_1 = rising[mid] - rising[start]       # first half rising
+        r_2 = falling[end] - falling[mid]       # last half falling
+        s_1 = falling[mid] - falling[start]     # first half falling
+        s_2 = rising[end] - rising[mid]         # last half rising
+
+        # Local maxima are resistance, local minima support.
+        resistance = close[mid[(r_1 == half) & (r_2 == half)] - 1]
+        support = close[mid[(s_1 == half) & (s_2 == half)] - 1]
 
         # Filter levels f times.
         levels = np.sort(np.append(support, resistance))
-        filtered_levels = cluster_filter(levels, t, multipass=True)
+        filtered_levels = self.cluster_filter(levels, t, multipass=True)
         for i in range(f - 1):
-            filtered_levels = cluster_filter(filtered_levels, t, multipass=True)
+            filtered_levels = self.cluster_filter(
+                filtered_levels, t, multipass=True)
 
         return filtered_levels
 
-    def cluster_filter(levels: list, t: float, multipass: bool):
+    def cluster_filter(self, levels: list, t: float, multipass: bool):
         """
         Given a list of prices, identify groups of levels within t% of each other.
 
+        Two levels a <= b are within tolerance if b - a <= b * t, the union
+        of the pairwise checks a * (1 - t) <= b <= a * (1 + t) from either
+        side. Levels are swept in ascending order, each cluster starting at
+        the lowest unclustered level and taking every level within
+        tolerance of it, so all members of a cluster are within tolerance
+        of each other. Each cluster is replaced by its mean.
+
+        The output is a sorted partition: every input level contributes to
+        exactly one output level, and levels without a neighbour within
+        tolerance are returned unchanged. The earlier pairwise filter
+        returned the isolated levels followed by the mean of every
+        overlapping pair, so a level could appear in several means and the
+        output was unsorted.
+
         Args:
             levels: list of price levels.
-            t: tolerance, % variance between min/maxima to be considered a level.
-            multipass: if True, run the filter for cluster sizes=3 or more. If
-                       False, filter only once (will pick up clusters size=2).
+            t: tolerance, fractional variance between min/maxima to be
+               considered a level, e.g. 0.02 for 2%.
+            multipass: if True, clusters take all levels within tolerance
+                       (sizes 3 or more). If False, levels are only paired
+                       (cluster size 2).
         Returns:
-            None.
+            Sorted list of filtered levels, no longer than levels.
         Raises:
             None.
         """
 
-        # Identify initial level clusters (single pass).
-        temp_levels = []
-        for lvl_1 in levels:
-            for lvl_2 in levels:
-                range_max = lvl_1 + lvl_1 * t
-                range_min = lvl_1 - lvl_1 * t
-                if lvl_2 >= range_min and lvl_2 <= range_max:
-                    cluster = sorted([lvl_1, lvl_2])
-                    if lvl_2 != lvl_1:
-                        if cluster not in temp_levels:
-                            temp_levels.append(cluster)
-
-        # Identify strong clusters of 3 or more levels (multipass).
-        if multipass:
-            flattened = [item for sublist in temp_levels for item in sublist]
-            c_count = 0
-            to_append = []
-            for cluster in temp_levels:
-                for lvl_1 in cluster:
-                    range_max = lvl_1 + lvl_1 * t
-                    range_min = lvl_1 - lvl_1 * t
-                    for lvl_2 in flattened:
-                        if lvl_2 >= range_min and lvl_2 <= range_max:
-                            to_append.append([c_count, lvl_2])
-                c_count += 1
-
-            # Add levels to their respective clusters and remove duplicates.
-            for pair in to_append:
-                temp_levels[pair[0]].append(pair[1])
-                temp_levels[pair[0]] = sorted(list(set(temp_levels[pair[0]])))
-
-        # Aggregate similar levels and remove temp levels.
-        agg_levels = [(sum(i) / len(i)) for i in temp_levels]
-        to_remove = [i for cluster in temp_levels for i in cluster]
-
-        # Catch second-pass np.array > list conversion error.
-        if type(levels) != list:
-            final_levels = [i for i in levels.tolist() if i not in to_remove]
-        else:
-            final_levels = [i for i in levels if i not in to_remove]
-
-        return final_levels + agg_levels
+        levels = np.sort(np.asarray(levels, dtype=np.float64))
+        size = 2 if not multipass else len(levels)
+        scale = 1 / (1 - t) if t < 1 else np.inf
+
+        filtered = []
+        i = 0
+        while i < len(levels):
+            # b - a <= b * t  <=>  b <= a / (1 - t).
+            j = int(np.searchsorted(levels, levels[i] * scale, side='right'))
+            j = min(j, i + size)
+            filtered.append(float(levels[i:j].mean()))
+            i = j
+
+        return filtered
 
     def SMA(self, period: int, bars: int):
         """
@@ -339,55 +348,127 @@ class Features:
 
         return upperband, middleband, lowerband
 
-    def fractals(self, bars, window: int = 5):
+    def book_imbalance(self, bars, period: int = 5):
+        """
+        Return the rolling mean top of book imbalance over n bars, from -1
+        (all resting size on the ask) to 1 (all on the bid). Requires bars
+        from a venue streaming its L2 book.
+        """
+
+        self.check_bars_type(bars)
+
+        return bars['book_imbalance'].rolling(period).mean()
+
+    def microprice_skew(self, bars):
+        """
+        Return the size weighted microprice's deviation from close, as a
+        fraction of close. Positive when book pressure points higher.
         """
-        Returns a list of size len(bars) containing a value for each bar.
+
+        self.check_bars_type(bars)
+
+        return (bars['book_microprice'] - bars['close']) / bars['close']
+
+    def book_depth_ratio(self, bars):
+        """
+        Return bid depth / ask depth within the book's depth band.
+        """
+
+        self.check_bars_type(bars)
+
+        return bars['book_bid_depth'] / bars['book_ask_depth']
+
+    def fractals(self, bars, window: int = 5, previous=None):
+        """
+        Returns an array of size len(bars) containing a value for each bar.
         The value will state whether its corresponding bar is a top
         fractal or a bottom fractal. Returns 1 for top fractals, 0 for
         non-fractals, -1 for bottom fractals.
 
         The Formulas for Fractals Are:
-            Bearish Fractal (-1)=
+            Top Fractal (1) =
             High(N)>High(N−2) and
             High(N)>High(N−1) and
             High(N)>High(N+1) and
             High(N)>High(N+2)
 
-            ﻿Bullish Fractal (1) =
+            Bottom Fractal (-1) =
             Low(N)<Low(N−2) and
             Low(N)<Low(N−1) and
             Low(N)<Low(N+1) and
             Low(N)<Low(N+2)
 
         where N is center bar in window and (N+-1) (N+-2) are bars on either
-        side of the center bar.
-​
+        side of the center bar, for the default window of 5. Wider windows
+        compare (window - 1) / 2 bars either side. A bar that is both is a
+        top fractal. The final (window - 1) / 2 bars are unconfirmed (0).
+
+        Small windows are classified with shifted array comparisons, wider
+        ones with a single pass scan, JIT compiled if numba is installed.
+
+        If previous is the result for bars less its newest bar, only the
+        newly confirmed bar is classified and appended to it.
         """
+
         self.check_bars_type(bars)
         if (window % 2 != 1):
             window += 1
+        half = (window - 1) // 2
+
+        if previous is not None and len(previous) == len(bars.index) - 1:
+            frac = np.append(previous, 0)
+            if len(frac) >= window:
+                frac[-half - 1] = self.new_fractal(bars, window)
+            return frac
+
+        high = np.asarray(bars['high'].values, dtype=np.float64)
+        low = np.asarray(bars['low'].values, dtype=np.float64)
+
+        if half > self.VECTOR_HALF_WINDOW and njit is not None:
+            return fractal_scan(high, low, half)
+
+        n = len(high)
+        frac = np.zeros(n)
+        if n < window:
+            return frac
+
+        centre = slice(half, n - half)
+        top = np.ones(n - 2 * half, dtype=bool)
+        bottom = np.ones(n - 2 * half, dtype=bool)
+        for k in range(1, half + 1):
+            before = slice(half - k, n - half - k)
+            after = slice(half + k, n - half + k)
+            top &= high[centre] > high[before]
+            top &= high[centre] > high[after]
+            bottom &= low[centre] < low[before]
+            bottom &= low[centre] < low[after]
+
+        frac[centre][bottom] = -1
+        frac[centre][top] = 1
 
-        # df.shape[0] is more logical but has a slower runtime, so I went with
-        # len(df.index) instead:
-        bars_length = len(bars.index)
-        frac = np.zeros(bars_length).flatten()
-
-        for bar in range((window-1)/2, bars_length-(window-1)/2):
-            if (bars['high'][bar] > bars['high'][bar-2]
-                    and bars['high'][bar] > bars['high'][bar-1]
-                    and bars['high'][bar] > bars['high'][bar+1]
-                    and bars['high'][bar] > bars['high'][bar+2]):
-
-                frac[bar] = 1
-
-            elif (bars['low'][bar] < bars['low'][bar-2]
-                    and bars['low'][bar] < bars['low'][bar-1]
-                    and bars['low'][bar] < bars['low'][bar+1]
-                    and bars['low'][bar] < bars['low'][bar+2]):
+        return frac
 
-                frac[bar] = -1
+    def new_fractal(self, bars, window: int = 5):
+        """
+        Classify only the most recently confirmed bar, (window - 1) / 2 bars
+        before the newest. Returns 1, 0 or -1 as per fractals().
+        """
 
-        return frac
+        if (window % 2 != 1):
+            window += 1
+        if len(bars.index) < window:
+            return 0
+
+        high = bars['high'].values[-window:]
+        low = bars['low'].values[-window:]
+        centre = (window - 1) // 2
+        others = np.arange(window) != centre
+
+        if (high[centre] > high[others]).all():
+            return 1
+        elif (low[centre] < low[others]).all():
+            return -1
+        return 0
 
     def check_bars_type(self, bars):
 
@@ -0,0 +1,64 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+from fractals_test import loop_fractals, random_bars
+from features import Features
+import features
+import numpy as np
+import time
+import sys
+
+def bench(count):
+    bars = random_bars(count)
+    high, low = bars.high.values, bars.low.values
+    feat = Features()
+
+    # Compile outside the timed run.
+    feat.fractals(bars.iloc[:100], 41)
+
+    start = time.perf_counter()
+    expected = loop_fractals(high, low, 5)
+    loop = time.perf_counter() - start
+
+    print("Fractals, " + str(count) + " bars (jit: " +
+          str(features.njit is not None) + ")")
+    print("loop reference, window 5: " + str(round(loop, 3)) + " s")
+
+    for window in (5, 21, 41):
+        start = time.perf_counter()
+        frac = feat.fractals(bars, window)
+        elapsed = time.perf_counter() - start
+        print("window " + str(window) + ": " +
+              str(round(elapsed, 3)) + " s")
+        if window == 5:
+            np.testing.assert_array_equal(frac, expected)
+
+    start = time.perf_counter()
+    for i in range(1000):
+        feat.new_fractal(bars.iloc[:-i or None], 5)
+    print("incremental update: " + str(round(
+        (time.perf_counter() - start) * 1e3, 3)) + " us")
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,104 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from features import Features
+import unittest
+import pandas as pd
+import numpy as np
+
+def loop_fractals(high, low, window):
+    """
+    Reference implementation, one bar and one comparison at a time.
+    """
+
+    half = (window - 1) // 2
+    frac = np.zeros(len(high))
+    for bar in range(half, len(high) - half):
+        if all(high[bar] > high[bar - k] and high[bar] > high[bar + k]
+               for k in range(1, half + 1)):
+            frac[bar] = 1
+        elif all(low[bar] < low[bar - k] and low[bar] < low[bar + k]
+                 for k in range(1, half + 1)):
+            frac[bar] = -1
+    return frac
+
+def random_bars(n, seed=0, ticks=False):
+    rng = np.random.default_rng(seed)
+    close = np.cumsum(rng.normal(size=n)) + 1000
+    high = close + rng.random(n)
+    low = close - rng.random(n)
+
+    # Rounding to a tick size produces equal highs and lows.
+    if ticks:
+        high, low = np.round(high), np.round(low)
+    return pd.DataFrame({'high': high, 'low': low})
+
+class TestFractals(unittest.TestCase):
+
+    def setUp(self):
+        self.features = Features()
+
+    def test_matches_loop(self):
+        for ticks in (False, True):
+            bars = random_bars(5000, ticks=ticks)
+            for window in (3, 5, 7, 11, 21, 23, 41):
+                np.testing.assert_array_equal(
+                    self.features.fractals(bars, window),
+                    loop_fractals(bars.high.values, bars.low.values, window),
+                    err_msg="window " + str(window))
+
+    def test_even_window_rounds_up(self):
+        bars = random_bars(1000)
+        np.testing.assert_array_equal(
+            self.features.fractals(bars, 4), self.features.fractals(bars, 5))
+
+    def test_short_bars(self):
+        bars = random_bars(3)
+        np.testing.assert_array_equal(
+            self.features.fractals(bars, 5), np.zeros(3))
+
+    def test_incremental(self):
+        bars = random_bars(400, ticks=True)
+        for window in (5, 9):
+            frac = self.features.fractals(bars.iloc[:1], window)
+            for i in range(2, len(bars.index) + 1):
+                frac = self.features.fractals(
+                    bars.iloc[:i], window, previous=frac)
+            np.testing.assert_array_equal(
+                frac, self.features.fractals(bars, window))
+
+    def test_trending(self):
+        # Zig-zag with rising swing highs and lows.
+        swing = [0, 2, 4, 2, 0]
+        close = np.concatenate([np.array(swing) + i for i in range(0, 8)])
+        bars = pd.DataFrame({'high': close + 0.5, 'low': close - 0.5})
+
+        self.assertEqual(self.features.trending(40, bars), (True, 1))
+        self.assertEqual(self.features.trending(40, -bars.rename(
+            columns={'high': 'low', 'low': 'high'})), (True, -1))
+        self.assertEqual(self.features.trending(5, bars), (False, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from decoder import parse_timestamp, parse_datetime
+from adapter import Adapter
+import json
+
+class FTX(Adapter):
+    """
+    FTX exchange model.
+    """
+
+    NAME = "FTX"
+    BASE_URL = "https://ftx.com/api"
+    WS_URL = "wss://ftx.com/ws/"
+    CANDLES_URL = "/markets/{}/candles"
+    TRADES_URL = "/markets/{}/trades"
+    SYMBOLS = ["BTC-PERP"]
+    MAX_BARS_PER_REQUEST = 1500
+    MAX_TICKS_PER_REQUEST = 5000
+
+    RATE_LIMIT = 6
+    RATE_BURST = 6
+
+    HEARTBEAT = json.dumps({'op': "ping"})
+
+    def bars_request(self, symbol, start_time, total):
+        return self.CANDLES_URL.format(symbol), {
+            'resolution': 60,
+            'start_time': start_time - 60,
+            'end_time': start_time - 60 + (total - 1) * 60}
+
+    def get_origin_timestamp(self, symbol):
+        # Candle requests spanning more than MAX_BARS_PER_REQUEST return the
+        # most recent candles, so page back through daily candles to the
+        # first day, then take that day's first 1 min bar.
+        if self.origin_tss.get(symbol) is None:
+            path = self.CANDLES_URL.format(symbol)
+            first_day = None
+            end = self.previous_minute()
+            while True:
+                days = self.bar_rows(self.request(path, {
+                    'resolution': 86400, 'start_time': 0, 'end_time': end}))
+                if days:
+                    first_day = int(parse_timestamp(days[0]['startTime']))
+                if len(days) < self.MAX_BARS_PER_REQUEST:
+                    break
+                end = first_day - 86400
+
+            # A market without candles yet has no history to start from.
+            if first_day is None:
+                self.logger.debug(
+                    self.name + " " + symbol + " has no candle history.")
+                return self.previous_minute()
+
+            minutes = self.bar_rows(self.request(path, {
+                'resolution': 60, 'start_time': first_day,
+                'end_time': first_day + 86400 - 60}))
+            self.origin_tss[symbol] = self.parse_bar(
+                symbol, minutes[0])['timestamp']
+            self.logger.debug(
+                self.name + " " + symbol + " origin timestamp: " +
+                str(self.origin_tss[symbol]))
+
+        return self.origin_tss[symbol]
+
+    def bar_rows(self, response):
+        return response['result']
+
+    def parse_bar(self, symbol, raw):
+        return {
+            'symbol': symbol,
+            'timestamp': int(parse_timestamp(raw['startTime'])) + 60,
+            'open': raw['open'],
+            'high': raw['high'],
+            'low': raw['low'],
+            'close': raw['close'],
+            'volume': raw['volume']}
+
+    def subscription_messages(self):
+        return [json.dumps({
+            'op': "subscribe",
+            'channel': "trades",
+            'market': i}) for i in self.symbols]
+
+    def parse_stream_message(self, msg):
+        if msg.get('channel') != "trades" or msg.get('type') != "update":
+            return []
+
+        return [self.parse_trade(msg['market'], i) for i in msg['data']]
+
+    def get_ticks_in_period(self, symbol, start_time, end_time):
+        # Trades are returned newest first, so page back from end_time. Pages
+        # overlap at their boundary timestamp, trades are kept once by ID.
+        path = self.TRADES_URL.format(symbol)
+        ticks = {}
+        end = end_time
+        while True:
+            rows = self.request(path, {
+                'start_time': start_time,
+                'end_time': end,
+                'limit': self.MAX_TICKS_PER_REQUEST})['result']
+            new = [i for i in rows if i['id'] not in ticks]
+            for row in new:
+                ticks[row['id']] = self.parse_trade(symbol, row)
+            if not new or len(rows) < self.MAX_TICKS_PER_REQUEST:
+                break
+            end = min(parse_timestamp(i['time']) for i in rows)
+
+        return sorted(
+            ticks.values(), key=lambda i: (i['timestamp'], i['trade_id']))
+
+    def parse_trade(self, symbol, raw):
+        return {
+            'timestamp': parse_datetime(raw['time']),
+            'symbol': symbol,
+            'side': "Buy" if raw['side'] == "buy" else "Sell",
+            'price': raw['price'],
+            'size': raw['size'],
+            'trade_id': raw['id']}
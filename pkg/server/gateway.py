@@ -0,0 +1,282 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Lock, Timer
+import bisect
+import queue
+import time
+
+class LatencyHistogram:
+    """
+    Fixed-bucket histogram of latencies in milliseconds.
+    """
+
+    # Bucket upper bounds (ms). Samples above the last bound are overflow.
+    BOUNDS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+        self.lock = Lock()
+
+    def record(self, ms: float):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.BOUNDS, ms)] += 1
+            self.total += 1
+            self.sum += ms
+            self.max = max(self.max, ms)
+
+    def percentile(self, p: float):
+        """
+        Return the bucket upper bound containing the p'th percentile.
+        """
+
+        with self.lock:
+            if not self.total:
+                return None
+            target = self.total * p / 100
+            running = 0
+            for bound, count in zip(self.BOUNDS + [self.max], self.counts):
+                running += count
+                if running >= target:
+                    return bound
+
+    def get_histogram(self):
+        """
+        Return histogram as a dict of {"<=bound ms": count}, plus summary.
+        """
+
+        with self.lock:
+            labels = ["<=" + str(b) for b in self.BOUNDS] + [
+                ">" + str(self.BOUNDS[-1])]
+            return {
+                'buckets': dict(zip(labels, self.counts)),
+                'count': self.total,
+                'mean': self.sum / self.total if self.total else None,
+                'max': self.max}
+
+class OrderGateway:
+    """
+    Asynchronous, batching order gateway for live venues.
+
+    Orders and cancellations are queued without blocking the event loop. A
+    dispatcher thread collects everything submitted within BATCH_WINDOW
+    seconds and groups consecutive requests of the same action per venue
+    into bulk requests. Each venue has its own worker sending its requests
+    one at a time in submission order, so a cancellation never overtakes
+    the placement it cancels, while different venues are served at once.
+    Acknowledgements arrive through the venue's order callback (e.g. the
+    websocket order table) and are timed against submission to build
+    per-venue latency histograms. Requests the venue rejects are reported
+    through the on_failure callback.
+    """
+
+    BATCH_WINDOW = 0.05     # Seconds to wait for further orders per batch.
+    MAX_BATCH = 10          # Maximum orders per bulk request.
+
+    def __init__(self, exchanges, logger, on_failure=None):
+        self.exchanges = {i.get_name(): i for i in exchanges}
+        self.logger = logger
+
+        # Called with (action, orders, reason) when a request fails.
+        self.on_failure = on_failure
+
+        self.queue = queue.Queue(0)
+        self.workers = {
+            name: ThreadPoolExecutor(max_workers=1) for name in self.exchanges}
+
+        # Submission times of unacknowledged orders, {order_id: epoch}.
+        self.pending = {}
+        self.pending_lock = Lock()
+
+        self.histograms = {name: LatencyHistogram() for name in self.exchanges}
+
+        for exchange in self.exchanges.values():
+            exchange.set_order_callback(
+                lambda order_id, order, v=exchange.get_name():
+                    self.acknowledge(v, order_id))
+
+        thread = Thread(target=self.dispatch, daemon=True)
+        thread.start()
+
+    def submit(self, order: dict):
+        """
+        Queue a new order dict for placement.
+        """
+
+        self.queue.put(("place", order))
+
+    def cancel(self, order: dict):
+        """
+        Queue an order dict for cancellation.
+        """
+
+        self.queue.put(("cancel", order))
+
+    def dispatch(self):
+        """
+        Collect queued requests into per-venue batches and send them.
+        """
+
+        while True:
+            batches = {}
+            action, order = self.queue.get()
+            self.add_to_batch(batches, action, order)
+
+            deadline = time.time() + self.BATCH_WINDOW
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    action, order = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                self.add_to_batch(batches, action, order)
+
+            for venue, runs in batches.items():
+                for action, orders in runs:
+                    if venue in self.workers:
+                        self.workers[venue].submit(
+                            self.send, venue, action, orders)
+                    else:
+                        self.failed(venue, action, orders, "unknown venue")
+
+    def add_to_batch(self, batches, action, order):
+        """
+        Append a request to its venue's batches, {venue: [(action, orders)]},
+        starting a new batch when the action changes or the batch is full.
+        """
+
+        runs = batches.setdefault(order['venue'], [])
+        if runs and runs[-1][0] == action and len(runs[-1][1]) < self.MAX_BATCH:
+            runs[-1][1].append(order)
+        else:
+            runs.append((action, [order]))
+
+    def send(self, venue: str, action: str, orders: list):
+        """
+        Send one bulk placement or cancellation request to venue.
+        """
+
+        exchange = self.exchanges[venue]
+
+        try:
+            if action == "place":
+                now = time.time()
+                with self.pending_lock:
+                    for order in orders:
+                        self.pending[order['order_id']] = now
+                exchange.place_orders(orders)
+            else:
+                exchange.cancel_orders([o['order_id'] for o in orders])
+
+            self.logger.debug(
+                "Sent " + str(len(orders)) + " " + action + " request(s) to " +
+                venue + ".")
+
+        except Exception as e:
+            if action == "place":
+                with self.pending_lock:
+                    for order in orders:
+                        self.pending.pop(order['order_id'], None)
+            self.failed(venue, action, orders, str(e))
+
+    def failed(self, venue: str, action: str, orders: list, reason: str):
+        """
+        Log a failed request and report it through the failure callback.
+        """
+
+        self.logger.debug(
+            "Failed to " + action + " " + str(len(orders)) + " orders at " +
+            venue + ": " + reason)
+        if self.on_failure:
+            self.on_failure(action, orders, reason)
+
+    def acknowledge(self, venue: str, order_id: str):
+        """
+        Record submit to acknowledgement latency for a pending order.
+        """
+
+        with self.pending_lock:
+            submitted = self.pending.pop(order_id, None)
+
+        if submitted is not None:
+            self.histograms[venue].record((time.time() - submitted) * 1000)
+
+    def get_latency_histograms(self):
+        """
+        Return {venue: histogram dict} of submit to ack latencies.
+        """
+
+        return {k: v.get_histogram() for k, v in self.histograms.items()}
+
+class MockExchange:
+    """
+    Local stand-in venue for exercising the order gateway without network
+    access. Bulk requests are recorded and each order is acknowledged
+    through the order callback after a fixed latency.
+    """
+
+    def __init__(self, name="Mock", latency=0.01, fail=False, delay=0):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.delay = delay      # Seconds each bulk request takes.
+        self.symbols = []
+        self.order_callback = None
+
+        # Received bulk requests, [(action, [orders or order IDs])].
+        self.requests = []
+        self.orders = {}
+
+    def get_name(self):
+        return self.name
+
+    def get_symbols(self):
+        return self.symbols
+
+    def set_order_callback(self, callback):
+        self.order_callback = callback
+
+    def place_orders(self, orders: list):
+        time.sleep(self.delay)
+        if self.fail:
+            raise Exception("Mock venue rejected request.")
+        self.requests.append(("place", orders))
+        for order in orders:
+            self.orders[order['order_id']] = order
+            if self.order_callback:
+                Timer(self.latency, self.order_callback,
+                      (order['order_id'], order)).start()
+
+    def cancel_orders(self, order_ids: list):
+        time.sleep(self.delay)
+        self.requests.append(("cancel", order_ids))
+        for order_id in order_ids:
+            self.orders.pop(order_id, None)
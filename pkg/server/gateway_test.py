@@ -0,0 +1,225 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+from gateway import OrderGateway, MockExchange, LatencyHistogram
+from recorder import Replay_WS
+from bitmex import Bitmex
+from broker import Broker
+import unittest
+import logging
+import queue
+import time
+
+def make_order(order_id, venue="Mock"):
+    return {
+        'order_id': order_id, 'venue': venue, 'symbol': "XBTUSD",
+        'direction': "LONG", 'order_type': "LIMIT", 'price': 100,
+        'size': 10, 'reduce_only': False, 'post_only': False}
+
+def wait_for(condition, timeout=2):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+class StubSession:
+    """
+    Records prepared requests instead of sending them.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def send(self, request):
+        self.requests.append(request)
+        return StubResponse()
+
+class StubResponse:
+    content = b"[]"
+
+    def raise_for_status(self):
+        pass
+
+class FailingSession:
+    """
+    Fails every request, as an unreachable venue would.
+    """
+
+    def send(self, request):
+        raise Exception("Connection refused.")
+
+class TestOrderGateway(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.mock = MockExchange(latency=0.01)
+        self.other = MockExchange(name="Other", latency=0.01)
+        self.gateway = OrderGateway([self.mock, self.other], self.logger)
+
+    def test_dispatch_batches(self):
+        orders = [make_order(str(i)) for i in range(25)] + [
+            make_order("x", "Other")]
+        for order in orders:
+            self.gateway.submit(order)
+
+        self.assertTrue(wait_for(lambda: len(self.mock.orders) == 25))
+        self.assertTrue(wait_for(lambda: len(self.other.orders) == 1))
+
+        # Orders submitted together are grouped per venue in bulk requests.
+        sizes = sorted(len(r[1]) for r in self.mock.requests)
+        self.assertEqual(sizes, [5, 10, 10])
+        self.assertTrue(all(a == "place" for a, o in self.mock.requests))
+
+    def test_cancel(self):
+        self.gateway.submit(make_order("a"))
+        self.assertTrue(wait_for(lambda: "a" in self.mock.orders))
+        self.gateway.cancel(make_order("a"))
+        self.assertTrue(wait_for(lambda: "a" not in self.mock.orders))
+        self.assertEqual(self.mock.requests[-1], ("cancel", ["a"]))
+
+    def test_submission_order(self):
+        slow = MockExchange(name="Slow", latency=0.01, delay=0.1)
+        gateway = OrderGateway([slow, self.mock], self.logger)
+
+        # Within one batch window, and across windows while the placement
+        # is still in flight.
+        gateway.submit(make_order("a", "Slow"))
+        gateway.cancel(make_order("a", "Slow"))
+        gateway.submit(make_order("b", "Slow"))
+        time.sleep(gateway.BATCH_WINDOW * 2)
+        gateway.cancel(make_order("b", "Slow"))
+
+        # Other venues are not held up by the slow one.
+        gateway.submit(make_order("c"))
+        self.assertTrue(wait_for(lambda: "c" in self.mock.orders, 0.15))
+
+        self.assertTrue(wait_for(lambda: len(slow.requests) == 4))
+        self.assertEqual(
+            [(a, [i if isinstance(i, str) else i['order_id'] for i in o])
+             for a, o in slow.requests],
+            [("place", ["a"]), ("cancel", ["a"]), ("place", ["b"]),
+             ("cancel", ["b"])])
+        self.assertEqual(slow.orders, {})
+
+    def test_latency(self):
+        for i in range(5):
+            self.gateway.submit(make_order(str(i)))
+
+        histograms = self.gateway.get_latency_histograms
+        self.assertTrue(wait_for(lambda: histograms()['Mock']['count'] == 5))
+        self.assertGreaterEqual(histograms()['Mock']['mean'], 10)
+        self.assertEqual(histograms()['Other']['count'], 0)
+        self.assertEqual(self.gateway.pending, {})
+
+    def test_failed_request(self):
+        failures = []
+        failing = MockExchange(name="Failing", fail=True)
+        gateway = OrderGateway(
+            [failing], self.logger,
+            lambda action, orders, reason: failures.append((action, orders)))
+        gateway.submit(make_order("a", "Failing"))
+        gateway.submit(make_order("b", "Unknown"))
+
+        # Failed requests are reported, not left pending, and record no
+        # latency.
+        self.assertTrue(wait_for(lambda: len(failures) == 2))
+        self.assertEqual(
+            sorted((a, [i['order_id'] for i in o]) for a, o in failures),
+            [("place", ["a"]), ("place", ["b"])])
+        self.assertEqual(gateway.pending, {})
+        self.assertEqual(
+            gateway.get_latency_histograms()['Failing']['count'], 0)
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentile(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        for ms in [0.5, 3, 3, 40, 20000]:
+            histogram.record(ms)
+        self.assertEqual(histogram.percentile(50), 5)
+        self.assertEqual(histogram.percentile(100), 20000)
+        self.assertEqual(histogram.get_histogram()['buckets']['<=5'], 2)
+
+class TestEnvironment(unittest.TestCase):
+
+    def make_bitmex(self, testnet):
+        ws = Replay_WS(logging.getLogger(__name__), ["XBTUSD"], ["trade"])
+        exchange = Bitmex(logging.getLogger(__name__), ws=ws, testnet=testnet)
+        exchange.api_key, exchange.api_secret = "key", "secret"
+        exchange.session = StubSession()
+        return exchange
+
+    def test_production(self):
+        exchange = self.make_bitmex(False)
+        exchange.place_orders([make_order("a", "BitMEX")])
+        exchange.cancel_orders(["a"])
+        for request in exchange.session.requests:
+            self.assertTrue(request.url.startswith(Bitmex.BASE_URL))
+        self.assertEqual(exchange.ws_url, Bitmex.WS_URL)
+
+    def test_testnet(self):
+        exchange = self.make_bitmex(True)
+        exchange.place_orders([make_order("a", "BitMEX")])
+        exchange.cancel_orders(["a"])
+        for request in exchange.session.requests:
+            self.assertTrue(request.url.startswith(Bitmex.BASE_URL_TESTNET))
+        self.assertEqual(exchange.ws_url, Bitmex.WS_URL_TESTNET)
+
+class TestBrokerGateway(unittest.TestCase):
+
+    def test_backtest_without_gateway(self):
+        logger = logging.getLogger(__name__)
+        self.assertIsNone(Broker([], logger, None, None, False).gateway)
+        self.assertIsNone(Broker([], logger, None, None, True, True).gateway)
+        broker = Broker([MockExchange()], logger, None, None, True)
+        self.assertIsInstance(broker.gateway, OrderGateway)
+
+    def test_rejected_placement(self):
+        ws = Replay_WS(logging.getLogger(__name__), ["XBTUSD"], ["trade"])
+        exchange = Bitmex(logging.getLogger(__name__), ws=ws)
+        exchange.api_key, exchange.api_secret = "key", "secret"
+        exchange.session = FailingSession()
+        broker = Broker([exchange], logging.getLogger(__name__), None, None,
+                        True)
+        events = queue.Queue(0)
+        orders = [dict(make_order(i, "BitMEX"), trade_id=1) for i in "ab"]
+        for order in orders:
+            broker.live_orders[order['order_id']] = order
+            broker.gateway.submit(order)
+
+        # Cancelled before the failure is seen, so not reported.
+        broker.live_orders.pop("b")
+
+        self.assertTrue(wait_for(lambda: broker.rejected.qsize() == 2))
+        broker.check_rejections(events)
+        event = events.get(False)
+        self.assertEqual(event.type, "REJECT")
+        self.assertEqual(event.order_id, "a")
+        self.assertEqual(event.reason, "Connection refused.")
+        self.assertTrue(events.empty())
+        self.assertEqual(broker.live_orders, {})
+
+if __name__ == '__main__':
+    unittest.main()
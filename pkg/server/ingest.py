@@ -0,0 +1,273 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from multiprocessing import Process, shared_memory
+from datetime import datetime, timezone
+from functools import partial
+from decoder import parse_timestamp
+from threading import Lock
+import numpy as np
+import requests
+import logging
+import heapq
+import time
+
+# Record layout of a decoded tick in shared memory.
+TICK_DTYPE = np.dtype([
+    ('timestamp', 'f8'),    # Epoch seconds.
+    ('symbol', 'i4'),       # Index into the ingestor symbol list.
+    ('side', 'i1'),         # 1 for buyer-initiated, -1 for seller.
+    ('price', 'f8'),
+    ('size', 'f8')])
+
+class TickRing:
+    """
+    Single-writer, single-reader ring buffer of decoded ticks held in shared
+    memory.
+
+    The header stores the total number of records ever written and a
+    connection flag. The writer fills slots then advances the write count;
+    the reader copies everything between its own read count and the write
+    count, discarding any records overwritten before or during the copy.
+    """
+
+    HEADER = np.dtype([('written', 'i8'), ('connected', 'i8')])
+
+    def __init__(self, capacity, name=None):
+        size = self.HEADER.itemsize + capacity * TICK_DTYPE.itemsize
+        self.capacity = capacity
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=self.owner, size=size)
+        self.name = self.shm.name
+
+        self.header = np.ndarray(1, self.HEADER, self.shm.buf)
+        self.records = np.ndarray(
+            capacity, TICK_DTYPE, self.shm.buf, self.HEADER.itemsize)
+        if self.owner:
+            self.header[0] = (0, 0)
+
+        self.read = 0
+        self.lost = 0
+
+    def write(self, ticks: np.ndarray):
+        """
+        Append an array of TICK_DTYPE records.
+        """
+
+        written = int(self.header['written'][0])
+        ticks = ticks[-self.capacity:]
+        slots = (written + np.arange(len(ticks))) % self.capacity
+        self.records[slots] = ticks
+        self.header['written'] = written + len(ticks)
+
+    def read_new(self):
+        """
+        Return an array of records written since the previous call.
+        """
+
+        written = int(self.header['written'][0])
+        start = max(self.read, written - self.capacity)
+        self.lost += start - self.read
+
+        slots = np.arange(start, written) % self.capacity
+        ticks = self.records[slots]
+
+        # Records the writer lapped while we were copying are unreliable.
+        lapped = int(self.header['written'][0]) - self.capacity - start
+        if lapped > 0:
+            ticks = ticks[lapped:]
+            self.lost += lapped
+
+        self.read = written
+        return ticks
+
+    def set_connected(self, connected: bool):
+        self.header['connected'] = int(connected)
+
+    def is_connected(self):
+        return bool(self.header['connected'][0])
+
+    def close(self):
+        del self.header, self.records
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def run_shard(ring_name, capacity, symbols, symbol_ids, channels, URL,
+              backfill=None):
+    """
+    Worker process entry point. Connects a websocket for the shard's symbols,
+    decodes trade messages and writes them to the shard's tick ring.
+    """
+
+    from bitmex_ws import Bitmex_WS
+
+    logger = logging.getLogger("ingest." + ",".join(symbols))
+    ring = TickRing(capacity, ring_name)
+
+    def write_ticks(ticks):
+        records = np.empty(len(ticks), TICK_DTYPE)
+        for i, tick in enumerate(ticks):
+            records[i] = (
+                parse_timestamp(tick['timestamp']),
+                symbol_ids[tick['symbol']],
+                1 if tick.get('side') == "Buy" else -1,
+                tick['price'],
+                tick['size'])
+        ring.write(records)
+
+    ws = Bitmex_WS(logger, symbols, channels, URL, None, None, write_ticks)
+    if backfill:
+        ws.backfill = partial(backfill, requests.Session())
+
+    while True:
+        ring.set_connected(ws.connected())
+        time.sleep(1)
+
+class ShardedIngestor:
+    """
+    Spreads market data subscriptions across several websocket connections,
+    each decoded in its own worker process.
+
+    Symbols are assigned round robin to shards. Every shard writes decoded
+    ticks into its own shared memory ring, which the main process drains and
+    merges into one chronological tick list with the same interface as the
+    websocket trade table.
+
+    A symbol's trade subscription is the unit of sharding, since splitting
+    one subscription across connections would only deliver duplicate ticks.
+    The shard count is therefore capped at the number of symbols, and a
+    single symbol configuration runs one worker: decoding moves off the main
+    process, but ingestion only scales with cores as symbols are added.
+    """
+
+    RING_CAPACITY = 2 ** 16     # Ticks buffered per shard between reads.
+    MAX_SIZE = 15000            # Approximate tick capacity per symbol.
+
+    def __init__(self, logger, symbols, channels, URL, shards,
+                 backfill=None):
+        self.logger = logger
+        self.symbols = list(symbols)
+        self.symbol_ids = {s: i for i, s in enumerate(self.symbols)}
+        self.shards = min(shards, len(self.symbols))
+        if self.shards < shards:
+            self.logger.debug(
+                "Ingestion limited to " + str(self.shards) +
+                " shards, one per symbol.")
+
+        self.ticks = []
+        self.max_size = self.MAX_SIZE * len(self.symbols)
+        self.lock = Lock()
+
+        self.rings = []
+        self.processes = []
+        for shard in range(self.shards):
+            shard_symbols = self.symbols[shard::self.shards]
+            ring = TickRing(self.RING_CAPACITY)
+            process = Process(
+                target=run_shard,
+                args=(ring.name, self.RING_CAPACITY, shard_symbols,
+                      self.symbol_ids, channels, URL, backfill),
+                daemon=True)
+            process.start()
+            self.rings.append(ring)
+            self.processes.append(process)
+
+        self.logger.debug(
+            "Started " + str(self.shards) + " ingestion worker processes.")
+
+    def connected(self):
+        """
+        Returns True if every shard worker is alive and connected.
+        """
+
+        return all(p.is_alive() for p in self.processes) and all(
+            r.is_connected() for r in self.rings)
+
+    def collect(self):
+        """
+        Drain all shard rings into the merged tick list, keeping it in
+        timestamp order when ticks arrive late or out of order.
+        """
+
+        batches = []
+        for ring in self.rings:
+            lost = ring.lost
+            records = ring.read_new()
+            if ring.lost > lost:
+                self.logger.debug(
+                    "Tick ring overrun, " + str(ring.lost - lost) +
+                    " ticks lost.")
+            if len(records):
+                batches.append(sorted(
+                    self.to_ticks(records), key=lambda i: i['timestamp']))
+        if not batches:
+            return
+        merged = list(heapq.merge(*batches, key=lambda i: i['timestamp']))
+
+        with self.lock:
+            # Late ticks, such as backfill after a reconnect, are merged into
+            # the tail of ticks they overlap rather than appended.
+            start = len(self.ticks)
+            while start and (
+                    self.ticks[start - 1]['timestamp'] >
+                    merged[0]['timestamp']):
+                start -= 1
+            self.ticks[start:] = heapq.merge(
+                self.ticks[start:], merged, key=lambda i: i['timestamp'])
+            if len(self.ticks) > self.max_size:
+                self.ticks = self.ticks[self.max_size // 2:]
+
+    def to_ticks(self, records):
+        """
+        Convert an array of TICK_DTYPE records to tick dicts.
+        """
+
+        return [{
+            'timestamp': datetime.fromtimestamp(ts, timezone.utc),
+            'symbol': self.symbols[symbol],
+            'side': "Buy" if side > 0 else "Sell",
+            'price': price,
+            'size': size} for ts, symbol, side, price, size in records.tolist()]
+
+    def get_ticks(self):
+        """
+        Returns received ticks, oldest first.
+        """
+
+        self.collect()
+        return self.ticks
+
+    def close(self):
+        """
+        Stop worker processes and release shared memory.
+        """
+
+        for process in self.processes:
+            process.terminate()
+            process.join()
+        for ring in self.rings:
+            ring.close()
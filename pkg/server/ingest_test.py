@@ -0,0 +1,164 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from ingest import TickRing, ShardedIngestor, TICK_DTYPE
+from unittest import mock
+import unittest
+import logging
+import numpy as np
+
+def make_ticks(start, n, symbol=0):
+    ticks = np.zeros(n, TICK_DTYPE)
+    ticks['timestamp'] = start + np.arange(n)
+    ticks['symbol'] = symbol
+    ticks['side'] = np.where(np.arange(n) % 2, -1, 1)
+    ticks['price'] = 100 + np.arange(n)
+    ticks['size'] = 1
+    return ticks
+
+class StubProcess:
+    def __init__(self, target, args, daemon):
+        self.symbols = args[2]
+
+    def start(self):
+        pass
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+class TestTickRing(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = TickRing(8)
+
+    def tearDown(self):
+        self.ring.close()
+
+    def test_read_new(self):
+        self.ring.write(make_ticks(0, 3))
+        self.ring.write(make_ticks(3, 2))
+        np.testing.assert_array_equal(
+            self.ring.read_new()['timestamp'], np.arange(5))
+        self.assertEqual(len(self.ring.read_new()), 0)
+
+    def test_wraps(self):
+        for start in range(0, 40, 5):
+            self.ring.write(make_ticks(start, 5))
+            np.testing.assert_array_equal(
+                self.ring.read_new()['timestamp'], start + np.arange(5))
+        self.assertEqual(self.ring.lost, 0)
+
+    def test_overrun(self):
+        # Records overwritten before the read are counted as lost.
+        self.ring.write(make_ticks(0, 6))
+        self.ring.write(make_ticks(6, 6))
+        np.testing.assert_array_equal(
+            self.ring.read_new()['timestamp'], np.arange(4, 12))
+        self.assertEqual(self.ring.lost, 4)
+
+        # Only the newest capacity records of a single write are kept.
+        self.ring.write(make_ticks(12, 20))
+        np.testing.assert_array_equal(
+            self.ring.read_new()['timestamp'], np.arange(24, 32))
+        self.assertEqual(self.ring.lost, 4)
+
+    def test_attach(self):
+        # A second handle by name sees the same memory, as a worker does.
+        writer = TickRing(8, self.ring.name)
+        writer.write(make_ticks(0, 3, symbol=2))
+        writer.set_connected(True)
+        self.assertTrue(self.ring.is_connected())
+        ticks = self.ring.read_new()
+        np.testing.assert_array_equal(ticks['symbol'], [2, 2, 2])
+        np.testing.assert_array_equal(ticks['price'], [100, 101, 102])
+        writer.close()
+        self.assertTrue(self.ring.is_connected())
+
+class TestShardedIngestor(unittest.TestCase):
+
+    def make_ingestor(self, symbols, shards):
+        with mock.patch("ingest.Process", StubProcess):
+            return ShardedIngestor(
+                logging.getLogger(__name__), symbols, ["trade"], None,
+                shards)
+
+    def test_assignment(self):
+        ingestor = self.make_ingestor(["A", "B", "C"], 2)
+        self.assertEqual(
+            [p.symbols for p in ingestor.processes], [["A", "C"], ["B"]])
+        ingestor.close()
+
+    def test_single_symbol(self):
+        ingestor = self.make_ingestor(["XBTUSD"], 4)
+        self.assertEqual(ingestor.shards, 1)
+        self.assertEqual(
+            [p.symbols for p in ingestor.processes], [["XBTUSD"]])
+        ingestor.close()
+
+    def test_merge(self):
+        ingestor = self.make_ingestor(["A", "B"], 2)
+        first, second = ingestor.rings
+        first.write(make_ticks(0, 3))
+        second.write(make_ticks(0.5, 3, symbol=1))
+
+        ticks = ingestor.get_ticks()
+        self.assertEqual(
+            [(i['timestamp'].timestamp(), i['symbol']) for i in ticks],
+            [(0, "A"), (0.5, "B"), (1, "A"), (1.5, "B"), (2, "A"),
+             (2.5, "B")])
+        self.assertEqual(ticks[0]['side'], "Buy")
+        self.assertEqual(ticks[1]['side'], "Buy")
+        self.assertEqual(ticks[2]['side'], "Sell")
+        self.assertEqual(ticks[3]['price'], 101)
+
+        # Later batches are appended after earlier ones.
+        first.write(make_ticks(3, 1))
+        self.assertEqual(len(ingestor.get_ticks()), 7)
+        ingestor.close()
+
+    def test_late_ticks(self):
+        ingestor = self.make_ingestor(["A", "B"], 2)
+        first, second = ingestor.rings
+        first.write(make_ticks(0, 5))
+        ingestor.get_ticks()
+
+        # A later batch reaching back before the newest merged tick, out of
+        # order within itself, is merged into place.
+        late = make_ticks(1.5, 3, symbol=1)[::-1]
+        second.write(np.ascontiguousarray(late))
+        first.write(make_ticks(5, 1))
+
+        ticks = ingestor.get_ticks()
+        self.assertEqual(
+            [(i['timestamp'].timestamp(), i['symbol']) for i in ticks],
+            [(0, "A"), (1, "A"), (1.5, "B"), (2, "A"), (2.5, "B"), (3, "A"),
+             (3.5, "B"), (4, "A"), (5, "A")])
+        ingestor.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+from features import Features, smooth
+import unittest
+import pandas as pd
+import numpy as np
+
+def loop_levels(close, n, s):
+    """
+    Reference raw level detection, slicing every window.
+    """
+
+    if n % 2 != 0:
+        n += 1
+    half = n // 2
+    smoothed = smooth(close, n + 1, s)
+    delta = np.zeros(len(close))
+    delta[1:] = smoothed[1:] - smoothed[:-1]
+
+    levels = []
+    for i in range(len(close) - n):
+        first, last = delta[i:i + half], delta[i + half:i + n]
+        if np.sum(first > 0) == half and np.sum(last < 0) == half:
+            levels.append(close[i + half - 1])
+        if np.sum(first < 0) == half and np.sum(last > 0) == half:
+            levels.append(close[i + half - 1])
+    return sorted(levels)
+
+def loop_cluster(levels, t, size):
+    """
+    Reference clustering, growing each cluster one level at a time.
+    """
+
+    levels = sorted(levels)
+    filtered = []
+    while levels:
+        cluster = [levels.pop(0)]
+        while (levels and len(cluster) < size and
+               levels[0] - cluster[0] <= levels[0] * t):
+            cluster.append(levels.pop(0))
+        filtered.append(sum(cluster) / len(cluster))
+    return filtered
+
+class TestClusterFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.features = Features()
+
+    def test_clusters(self):
+        cluster = self.features.cluster_filter
+        self.assertEqual(cluster([100, 101, 110], 0.02, True), [100.5, 110])
+        self.assertEqual(cluster([110, 100, 101], 0.02, True), [100.5, 110])
+        self.assertEqual(cluster([], 0.02, True), [])
+        self.assertEqual(cluster([100], 0.02, True), [100])
+
+    def test_chain(self):
+        # Clusters are anchored at their lowest level, so a chain of levels
+        # each within tolerance of the next is split rather than merged.
+        self.assertEqual(
+            self.features.cluster_filter([100, 101.5, 103], 0.02, True),
+            [100.75, 103])
+
+    def test_multipass(self):
+        levels = [100, 100.5, 101]
+        self.assertEqual(
+            self.features.cluster_filter(levels, 0.02, False), [100.25, 101])
+        self.assertEqual(
+            self.features.cluster_filter(levels, 0.02, True), [100.5])
+
+    def test_tolerance(self):
+        # Within tolerance if b - a <= b * t, inclusive.
+        cluster = self.features.cluster_filter
+        self.assertEqual(cluster([1, 2], 0.5, True), [1.5])
+        self.assertEqual(cluster([1, 2.001], 0.5, True), [1, 2.001])
+        self.assertEqual(cluster([1, 2, 3], 1, True), [2])
+
+    def test_partition(self):
+        rng = np.random.default_rng(0)
+        for i in range(50):
+            levels = list(rng.uniform(90, 110, rng.integers(0, 40)))
+            for t in [0.001, 0.01, 0.05]:
+                for multipass in [True, False]:
+                    result = self.features.cluster_filter(levels, t, multipass)
+                    expected = loop_cluster(
+                        levels, t, len(levels) if multipass else 2)
+                    np.testing.assert_allclose(result, expected)
+                    self.assertEqual(result, sorted(result))
+
+class TestSRLevels(unittest.TestCase):
+
+    def setUp(self):
+        self.features = Features()
+        rng = np.random.default_rng(1)
+        self.bars = pd.DataFrame({
+            'close': 1000 + np.cumsum(rng.normal(size=2000))})
+
+    def test_levels(self):
+        close = self.bars.close.values
+        for n, t, s, f in [(8, 0.02, 3, 3), (7, 0.005, 2, 1),
+                           (12, 0.001, 3, 2)]:
+            expected = loop_levels(close, n, s)
+            for i in range(f):
+                expected = loop_cluster(expected, t, len(expected))
+            result = self.features.sr_levels(self.bars, n, t, s, f)
+            np.testing.assert_allclose(result, expected)
+            self.assertTrue(len(result))
+
+    def test_short(self):
+        self.assertEqual(self.features.sr_levels(self.bars[:8], 8), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -130,6 +130,10 @@ class EMACrossTestingOnly(Model):
 
         "FTX": {
 
+            },
+
+        "Composite": {
+
             }}
 
     # Timeframes the strategy runs on.
@@ -0,0 +1,220 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from decoder import parse_timestamp
+import bisect
+import time
+
+class OrderBook:
+    """
+    Incrementally maintained L2 book for one symbol, fed by BitMEX
+    orderBookL2 partial/insert/update/delete messages.
+
+    Each side keeps a dict of price -> size and a bisect-sorted price list,
+    so applying a level change is a dict update plus at most one sorted
+    insert or removal. Microstructure features are computed once per
+    message from the top of book and the levels within depth_bps of mid:
+
+        book_imbalance: (bid size - ask size) / total size at the touch.
+        book_microprice: touch prices weighted by the opposite side's size.
+        book_spread: best ask - best bid.
+        book_bid_depth, book_ask_depth: resting size within depth_bps of mid.
+
+    Features are aggregated per minute (means, microprice last) and
+    collected by the exchange when it builds that minute's bar.
+    """
+
+    # Default depth band either side of mid, in basis points.
+    DEPTH_BPS = 25
+
+    # Per-minute aggregation of each feature, mirrors Strategy.RESAMPLE_KEY.
+    AGGREGATES = {
+        'book_imbalance': 'mean',
+        'book_microprice': 'last',
+        'book_spread': 'mean',
+        'book_bid_depth': 'mean',
+        'book_ask_depth': 'mean'}
+
+    # Completed minutes retained until collected.
+    MAX_MINUTES = 10
+
+    def __init__(self, symbol: str, depth_bps=DEPTH_BPS):
+        self.symbol = symbol
+        self.depth_bps = depth_bps
+
+        # Level id -> (side, price). Updates and deletes carry only the id.
+        self.ids = {}
+        self.sizes = {"Buy": {}, "Sell": {}}
+        self.prices = {"Buy": [], "Sell": []}
+
+        # Latest features, the minute being aggregated and its running sums.
+        self.features = None
+        self.minute = None
+        self.sums = None
+        self.count = 0
+        self.completed = {}
+
+    def apply(self, action: str, rows: list, received=None):
+        """
+        Apply one orderBookL2 message and update features.
+
+        Args:
+            action: "partial", "insert", "update" or "delete".
+            rows: message data rows for this symbol.
+            received: epoch timestamp of the message, defaults to the row
+                timestamp or the current time.
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+        if action == "partial":
+            self.ids.clear()
+            for side in self.sizes:
+                self.sizes[side].clear()
+                self.prices[side].clear()
+            for row in rows:
+                self.insert(row)
+            for side in self.prices:
+                self.prices[side].sort()
+
+        elif action == "insert":
+            for row in rows:
+                self.insert(row, True)
+
+        elif action == "update":
+            for row in rows:
+                level = self.ids.get(row['id'])
+                if level is not None:
+                    self.sizes[level[0]][level[1]] = row['size']
+
+        elif action == "delete":
+            for row in rows:
+                level = self.ids.pop(row['id'], None)
+                if level is not None:
+                    self.remove(*level)
+
+        if received is None:
+            ts = rows[0].get('timestamp') if rows else None
+            received = parse_timestamp(ts) if ts else time.time()
+
+        self.features = self.compute_features()
+        if self.features is not None:
+            self.aggregate(received, self.features)
+
+    def insert(self, row: dict, ordered=False):
+        side, price = row['side'], row['price']
+        self.ids[row['id']] = (side, price)
+        if price not in self.sizes[side]:
+            if ordered:
+                bisect.insort(self.prices[side], price)
+            else:
+                self.prices[side].append(price)
+        self.sizes[side][price] = row['size']
+
+    def remove(self, side: str, price: float):
+        if self.sizes[side].pop(price, None) is not None:
+            prices = self.prices[side]
+            i = bisect.bisect_left(prices, price)
+            if i < len(prices) and prices[i] == price:
+                del prices[i]
+
+    def best_bid(self):
+        bids = self.prices["Buy"]
+        return bids[-1] if bids else None
+
+    def best_ask(self):
+        asks = self.prices["Sell"]
+        return asks[0] if asks else None
+
+    def compute_features(self):
+        """
+        Returns the current feature dict, or None if either side is empty.
+        """
+
+        bids, asks = self.prices["Buy"], self.prices["Sell"]
+        if not bids or not asks:
+            return None
+
+        bid, ask = bids[-1], asks[0]
+        bid_size = self.sizes["Buy"][bid]
+        ask_size = self.sizes["Sell"][ask]
+        touch = bid_size + ask_size
+        mid = (bid + ask) / 2
+        band = mid * self.depth_bps / 10000
+
+        # Levels inside the band are contiguous at the inner end of each list.
+        bid_sizes, ask_sizes = self.sizes["Buy"], self.sizes["Sell"]
+        lower = bisect.bisect_left(bids, mid - band)
+        upper = bisect.bisect_right(asks, mid + band)
+
+        return {
+            'book_imbalance': (bid_size - ask_size) / touch if touch else 0,
+            'book_microprice': ((bid * ask_size + ask * bid_size) / touch
+                                if touch else mid),
+            'book_spread': ask - bid,
+            'book_bid_depth': sum(bid_sizes[i] for i in bids[lower:]),
+            'book_ask_depth': sum(ask_sizes[i] for i in asks[:upper])}
+
+    def aggregate(self, received: float, features: dict):
+        minute = int(received) // 60 * 60
+        if minute != self.minute:
+            self.close_minute()
+            self.minute = minute
+            self.sums = dict.fromkeys(features, 0)
+            self.count = 0
+
+        self.count += 1
+        for key, value in features.items():
+            if self.AGGREGATES[key] == 'mean':
+                self.sums[key] += value
+            else:
+                self.sums[key] = value
+
+    def close_minute(self):
+        if self.minute is None or not self.count:
+            return
+        self.completed[self.minute] = {
+            key: value / self.count if self.AGGREGATES[key] == 'mean'
+            else value for key, value in self.sums.items()}
+        self.minute = None
+        self.count = 0
+
+        while len(self.completed) > self.MAX_MINUTES:
+            del self.completed[min(self.completed)]
+
+    def collect(self, minute: int):
+        """
+        Returns the aggregated features for the minute starting at the
+        given epoch timestamp, or None if the book saw no updates.
+        """
+
+        if self.minute is not None and self.minute <= minute:
+            self.close_minute()
+
+        return self.completed.pop(minute, None)
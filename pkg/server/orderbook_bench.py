@@ -0,0 +1,61 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+from orderbook_test import random_messages, naive_features
+from orderbook import OrderBook
+import time
+import sys
+
+def bench(count):
+    stream = [(action, rows) for action, rows, levels in random_messages(
+        count)]
+
+    book = OrderBook("XBTUSD")
+    start = time.process_time()
+    for n, (action, rows) in enumerate(stream):
+        book.apply(action, rows, received=n)
+    elapsed = time.process_time() - start
+
+    # Brute force recomputation of every message's features for comparison.
+    levels = {}
+    start = time.process_time()
+    for action, rows in stream:
+        if action == "partial":
+            levels.clear()
+        for row in rows:
+            if action == "delete":
+                del levels[row['id']]
+            else:
+                levels[row['id']] = {**levels.get(row['id'], {}), **row}
+        naive_features(levels)
+    naive = time.process_time() - start
+
+    return len(stream), elapsed, naive
+
+if __name__ == '__main__':
+    count, elapsed, naive = bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 37000)
+    print("Messages:    " + str(count))
+    print("OrderBook:   %.0f msg/s" % (count / elapsed))
+    print("Brute force: %.0f msg/s" % (count / naive))
@@ -0,0 +1,195 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+from orderbook import OrderBook
+from features import Features
+import unittest
+import random
+import pandas as pd
+import numpy as np
+
+def naive_features(levels, depth_bps=OrderBook.DEPTH_BPS):
+    """
+    Reference features from an unordered {id: row} book, scanning every
+    level.
+    """
+
+    bids = [r for r in levels.values() if r['side'] == "Buy"]
+    asks = [r for r in levels.values() if r['side'] == "Sell"]
+    if not bids or not asks:
+        return None
+
+    best_bid = max(bids, key=lambda r: r['price'])
+    best_ask = min(asks, key=lambda r: r['price'])
+    bid, ask = best_bid['price'], best_ask['price']
+    touch = best_bid['size'] + best_ask['size']
+    mid = (bid + ask) / 2
+    band = mid * depth_bps / 10000
+
+    return {
+        'book_imbalance': (best_bid['size'] - best_ask['size']) / touch,
+        'book_microprice': (bid * best_ask['size'] +
+                            ask * best_bid['size']) / touch,
+        'book_spread': ask - bid,
+        'book_bid_depth': sum(
+            r['size'] for r in bids if r['price'] >= mid - band),
+        'book_ask_depth': sum(
+            r['size'] for r in asks if r['price'] <= mid + band)}
+
+def random_messages(count, seed=0):
+    """
+    Generate a random orderBookL2 stream, returns [(action, rows)] and the
+    expected {id: row} book after each message.
+    """
+
+    rng = random.Random(seed)
+    levels = {}
+    next_id = 0
+
+    def new_row(side):
+        nonlocal next_id
+        offset = rng.randint(1, 60) * 0.5
+        price = 7000 - offset if side == "Buy" else 7000.5 + offset - 0.5
+        if any(r['price'] == price and r['side'] == side
+               for r in levels.values()):
+            return None
+        next_id += 1
+        levels[next_id] = {'id': next_id, 'side': side, 'price': price,
+                           'size': rng.randint(1, 5000), 'symbol': "XBTUSD"}
+        return levels[next_id]
+
+    rows = [r for r in (new_row(s) for s in ["Buy", "Sell"] * 30) if r]
+    stream = [("partial", [dict(r) for r in rows], dict(levels))]
+
+    for i in range(count):
+        action = rng.choice(["insert", "update", "update", "delete"])
+        if action == "insert" or len(levels) < 10:
+            action = "insert"
+            rows = [r for r in (new_row(rng.choice(["Buy", "Sell"]))
+                                for j in range(rng.randint(1, 3))) if r]
+        elif action == "update":
+            rows = [{'id': k, 'size': rng.randint(1, 5000)}
+                    for k in rng.sample(sorted(levels), 3)]
+            for row in rows:
+                levels[row['id']] = {**levels[row['id']], **row}
+        else:
+            rows = [{'id': k} for k in rng.sample(sorted(levels), 2)]
+            for row in rows:
+                del levels[row['id']]
+        stream.append((action, [dict(r) for r in rows], dict(levels)))
+
+    return stream
+
+class TestOrderBook(unittest.TestCase):
+
+    def assert_features(self, features, expected):
+        self.assertEqual(features.keys(), expected.keys())
+        for key in expected:
+            self.assertAlmostEqual(features[key], expected[key], msg=key)
+
+    def test_random_stream(self):
+        book = OrderBook("XBTUSD")
+        for n, (action, rows, levels) in enumerate(random_messages(3000)):
+            book.apply(action, rows, received=n)
+
+            # Sorted price lists match the unordered reference book.
+            for side in ["Buy", "Sell"]:
+                prices = sorted(
+                    r['price'] for r in levels.values() if r['side'] == side)
+                self.assertEqual(book.prices[side], prices)
+
+            expected = naive_features(levels)
+            if expected is None:
+                self.assertIsNone(book.features)
+            else:
+                self.assert_features(book.features, expected)
+
+    def test_empty_side(self):
+        book = OrderBook("XBTUSD")
+        book.apply("partial", [{'id': 1, 'side': "Buy", 'price': 100,
+                                'size': 10}], received=0)
+        self.assertIsNone(book.features)
+        self.assertEqual(book.best_bid(), 100)
+        self.assertIsNone(book.best_ask())
+
+    def test_minute_aggregation(self):
+        book = OrderBook("XBTUSD")
+        stream = random_messages(300, seed=1)
+        expected = []
+        for n, (action, rows, levels) in enumerate(stream):
+            book.apply(action, rows, received=n)
+            expected.append(naive_features(levels))
+
+        for minute in range(0, 240, 60):
+            features = book.collect(minute)
+            rows = expected[minute:minute + 60]
+            self.assert_features(features, {
+                key: rows[-1][key] if how == 'last' else
+                np.mean([r[key] for r in rows])
+                for key, how in OrderBook.AGGREGATES.items()})
+
+        # Only MAX_MINUTES completed minutes are retained.
+        self.assertIsNone(book.collect(0))
+
+class TestBookFeatures(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 50
+        close = 7000 + np.cumsum(rng.normal(size=n))
+        self.bars = pd.DataFrame({
+            'close': close,
+            'book_imbalance': rng.uniform(-1, 1, n),
+            'book_microprice': close + rng.normal(size=n),
+            'book_bid_depth': rng.uniform(1, 1000, n),
+            'book_ask_depth': rng.uniform(1, 1000, n)})
+        self.features = Features()
+
+    def test_book_imbalance(self):
+        period = 5
+        result = self.features.book_imbalance(self.bars, period)
+        imbalance = self.bars['book_imbalance'].values
+        for i in range(len(imbalance)):
+            if i < period - 1:
+                self.assertTrue(np.isnan(result.iloc[i]))
+            else:
+                self.assertAlmostEqual(
+                    result.iloc[i],
+                    sum(imbalance[i - period + 1:i + 1]) / period)
+
+    def test_microprice_skew(self):
+        result = self.features.microprice_skew(self.bars)
+        for i, row in self.bars.iterrows():
+            self.assertAlmostEqual(
+                result.iloc[i],
+                (row['book_microprice'] - row['close']) / row['close'])
+
+    def test_book_depth_ratio(self):
+        result = self.features.book_depth_ratio(self.bars)
+        for i, row in self.bars.iterrows():
+            self.assertAlmostEqual(
+                result.iloc[i], row['book_bid_depth'] / row['book_ask_depth'])
+
+if __name__ == '__main__':
+    unittest.main()
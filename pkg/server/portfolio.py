@@ -25,6 +25,8 @@ backtesting platform for trading common markets.
 
 from trade_types import SingleInstrumentTrade, Order, Position, TradeID
 from event_types import OrderEvent, FillEvent
+from risk import RiskEngine
+from exchange import TradingExchange
 from pymongo import MongoClient, errors
 import pymongo
 import time
@@ -42,20 +44,43 @@ class Portfolio:
     MAX_SIMULTANEOUS_POSITIONS = 20
     MAX_CORRELATED_TRADES = 1
     MAX_ACCEPTED_DRAWDOWN = 15          # Percentage as integer.
+    MAX_TOTAL_EXPOSURE = 10             # % of value at risk across trades.
     RISK_PER_TRADE = 1                  # Percentage as integer OR 'KELLY'
     DEFAULT_STOP = 3                    # % stop distance if none provided.
 
-    def __init__(self, exchanges, logger, db_other, db_client, models):
+    def __init__(self, exchanges, logger, db_other, db_client, models,
+                 data=None, initial_funds=None):
         self.exchanges = {i.get_name(): i for i in exchanges}
         self.logger = logger
         self.db_other = db_other
         self.db_client = db_client
         self.models = models
 
+        # Account value in order size units, the base for drawdown.
+        self.initial_funds = initial_funds
+
+        # Strategy dataframe tree, data[exchange][symbol][timeframe].
+        self.data = data
+
+        # Rolling return statistics for pre-trade checks and sizing.
+        self.risk = RiskEngine(exchanges, logger)
+
         self.id_gen = TradeID(db_other)
         self.pf = self.load_portfolio()
+        if not self.pf['initial_funds']:
+            self.logger.debug(
+                "Portfolio has no initial funds, drawdown limit inactive.")
         self.trades_save_to_db = queue.Queue(0)
 
+        # Open trade dicts indexed by instrument: {(venue, symbol): {id: t}}.
+        self.trade_index = {}
+        for trade in self.open_trades():
+            self.index_trade(trade)
+
+        # Running valuation totals, kept in step with trade_index.
+        self.u_pnl_total = sum(t['u_pnl'] for t in self.pf['trades'])
+        self.r_pnl_total = sum(t['r_pnl'] for t in self.pf['trades'])
+
     def new_signal(self, events, event):
         """
         Interpret incoming signal events to produce Order Events.
@@ -80,8 +105,9 @@ class Portfolio:
             if signal['instrument_count'] == 1:
 
                 stop = self.calculate_stop_price(signal),
-                size = self.calculate_position_size(stop[0],
-                                                    signal['entry_price'])
+                size = self.calculate_position_size(
+                    stop[0], signal['entry_price'],
+                    (signal['venue'], signal['symbol']), signal['direction'])
 
                 # Generate sequential trade ID for order and trade objects.
                 trade_id = self.id_gen.new_id()
@@ -91,7 +117,7 @@ class Portfolio:
                     self.logger,
                     trade_id,               # Parent trade ID.
                     None,                   # Related position ID.
-                    None,                   # Order ID as used by venue.
+                    str(trade_id) + "-1",   # Order ID, sent as client ID.
                     signal['direction'],    # LONG or SHORT.
                     size,                   # Size in native denomination.
                     signal['entry_price'],  # Order price.
@@ -100,14 +126,16 @@ class Portfolio:
                     stop[0],                # Order invalidation price.
                     False,                  # Trail.
                     False,                  # Reduce-only order.
-                    False))                 # Post-only order.
+                    False,                  # Post-only order.
+                    venue=signal['venue'],
+                    symbol=signal['symbol']))
 
                 # Stop order.
                 orders.append(Order(
                     self.logger,
                     trade_id,
                     None,
-                    None,
+                    str(trade_id) + "-2",
                     event.inverse_direction(),
                     size,
                     stop[0],
@@ -116,17 +144,19 @@ class Portfolio:
                     None,
                     signal['trail'],
                     True,
-                    False))
+                    False,
+                    venue=signal['venue'],
+                    symbol=signal['symbol']))
 
                 # Take profit order(s).
                 if signal['targets']:
-                    for target in signal['targets']:
+                    for count, target in enumerate(signal['targets'], 3):
                         tp_size = (size / 100) * target[1]
                         orders.append(Order(
                             self.logger,
                             trade_id,
                             None,
-                            None,
+                            str(trade_id) + "-" + str(count),
                             event.inverse_direction(),
                             tp_size,
                             target[0],
@@ -135,7 +165,9 @@ class Portfolio:
                             stop[0],
                             False,
                             True,
-                            False))
+                            False,
+                            venue=signal['venue'],
+                            symbol=signal['symbol']))
 
                 # Parent trade object:
                 trade = SingleInstrumentTrade(
@@ -143,7 +175,7 @@ class Portfolio:
                     signal['venue'],        # Exchange or broker traded with.
                     signal['symbol'],       # Instrument ticker code.
                     signal['strategy'],     # Model name.
-                    None,                   # Position object.
+                    None,                   # Position dict.
                     [i.get_order_dict() for i in orders],  # Open orders dicts.
                     None)                   # Filled order dicts.
 
@@ -152,7 +184,9 @@ class Portfolio:
 
                 # Queue the trade for storage and update portfolio state.
                 self.trades_save_to_db.put(trade.get_trade_dict())
-                self.pf['trades'].append(trade.get_trade_dict())
+                trade_dict = trade.get_trade_dict()
+                self.pf['trades'].append(trade_dict)
+                self.index_trade(trade_dict)
                 self.save_porfolio(self.pf)
 
             # TODO: Other trade types (multi-instrument, multi-venue etc).
@@ -177,7 +211,109 @@ class Portfolio:
         Raises:
             None.
         """
-        pass
+
+        filled = event.get_order_dict()
+        trade = self.trade_index.get(
+            (event.exchange, event.symbol), {}).get(filled['trade_id'])
+        if trade is None:
+            self.logger.debug(
+                "Fill for unknown trade " + str(filled['trade_id']) + ".")
+            return
+
+        # Move the order from open to filled.
+        for order in trade['open_orders']:
+            if order['order_id'] == filled['order_id']:
+                trade['open_orders'].remove(order)
+                break
+        filled = dict(filled, status="FILLED", size=event.quantity,
+                      fill_price=event.price)
+        trade['filled_orders'] = (trade['filled_orders'] or []) + [filled]
+
+        # Fees reduce realised P&L as they are paid.
+        trade['fees'] += event.commission
+        trade['r_pnl'] -= event.commission
+        self.r_pnl_total -= event.commission
+
+        self.update_position(trade, event.direction, event.quantity,
+                             event.price)
+
+        # Cancel remaining orders once the position is closed out.
+        if not trade['position'] and filled['metatype'] != "ENTRY":
+            self.cancel_trade(events, trade, "position closed")
+
+        self.update_equity()
+        self.logger.debug(str(event))
+
+    def order_rejected(self, events, event):
+        """
+        Remove an order the venue did not accept from its trade. A trade left
+        without a position and an entry is cancelled, a positioned trade keeps
+        its position and any remaining orders.
+
+        Args:
+            events: event queue object.
+            event: reject event.
+
+        Returns:
+           None.
+
+        Raises:
+            None.
+        """
+
+        rejected = event.get_order_dict()
+        trade = self.trade_index.get(
+            (event.venue, event.symbol), {}).get(rejected['trade_id'])
+        if trade is None:
+            return
+
+        trade['open_orders'] = [
+            o for o in trade['open_orders']
+            if o['order_id'] != rejected['order_id']]
+        self.logger.debug(str(event))
+
+        if not trade['position']:
+            if not any(o['metatype'] == "ENTRY" for o in trade['open_orders']):
+                self.cancel_trade(events, trade, "entry rejected")
+        elif rejected['metatype'] != "ENTRY":
+            self.logger.debug(
+                "Trade " + str(trade['trade_id']) + " " +
+                rejected['metatype'] + " order rejected, position unprotected.")
+
+    def update_position(self, trade, direction, size, price):
+        """
+        Open, increase or reduce the trade's position with a filled size,
+        realising P&L on any reduction.
+        """
+
+        position = trade.get('position')
+
+        if not position:
+            trade['position'] = Position(
+                self.logger, trade['trade_id'], direction, 1, None, size,
+                price).get_position_dict()
+            trade['active'] = True
+
+        elif position['direction'] == direction:
+            total = position['size'] + size
+            position['entry_price'] = (
+                position['entry_price'] * position['size'] +
+                price * size) / total
+            position['size'] = total
+
+        else:
+            closed = min(size, position['size'])
+            sign = 1 if position['direction'].upper() == "LONG" else -1
+            r_pnl = sign * closed * (
+                price - position['entry_price']) / position['entry_price']
+            trade['r_pnl'] += r_pnl
+            self.r_pnl_total += r_pnl
+            position['size'] -= closed
+
+            if position['size'] <= 0:
+                self.u_pnl_total -= trade['u_pnl']
+                trade['u_pnl'] = 0
+                trade['position'] = None
 
     def update_price(self, events, market_event):
         """
@@ -193,7 +329,171 @@ class Portfolio:
         Raises:
             None.
         """
-        pass
+
+        bar = market_event.get_bar()
+        venue = market_event.get_exchange().get_name()
+
+        # Load return history from strategy datasets once they're populated.
+        if not self.risk.seeded and self.data:
+            self.risk.seed(self.data)
+
+        self.risk.update(venue, bar['symbol'], bar['timestamp'], bar['close'])
+
+        # Revalue and check only the trades open on this instrument.
+        trades = self.trade_index.get((venue, bar['symbol']))
+        if not trades or bar['close'] is None:
+            return
+
+        for trade in list(trades.values()):
+            self.revalue_trade(trade, bar['close'])
+            self.check_order_triggers(events, trade, bar)
+
+        self.update_equity()
+
+    def index_trade(self, trade):
+        """
+        Add trade dict to the instrument trade index.
+        """
+
+        key = (trade['venue'], trade['symbol'])
+        self.trade_index.setdefault(key, {})[trade['trade_id']] = trade
+
+    def unindex_trade(self, trade):
+        """
+        Remove trade dict from the instrument trade index.
+        """
+
+        key = (trade['venue'], trade['symbol'])
+        trades = self.trade_index.get(key, {})
+        trades.pop(trade['trade_id'], None)
+        if not trades:
+            self.trade_index.pop(key, None)
+
+    def revalue_trade(self, trade, price):
+        """
+        Update the unrealised P&L of a trade at the given price, keeping the
+        portfolio-wide unrealised P&L total in step.
+
+        Args:
+            trade: trade dict.
+            price: current instrument price.
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+        position = trade.get('position')
+        if position and position['size']:
+            sign = 1 if position['direction'].upper() == "LONG" else -1
+            u_pnl = sign * position['size'] * (
+                price - position['entry_price']) / position['entry_price']
+        else:
+            u_pnl = 0
+
+        self.u_pnl_total += u_pnl - trade['u_pnl']
+        trade['u_pnl'] = u_pnl
+
+    def check_order_triggers(self, events, trade, bar):
+        """
+        Check the trade's resting orders against the bar's price range.
+
+        Unfilled entries whose void price has been reached are cancelled.
+        Other unfilled orders are marked as triggered when the bar reaches
+        their price, entries while the trade is unpositioned and exits once
+        it holds a position.
+
+        Args:
+            events: event queue object.
+            trade: trade dict.
+            bar: latest OHLCV bar dict.
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+        high = bar['high'] if bar['high'] is not None else bar['close']
+        low = bar['low'] if bar['low'] is not None else bar['close']
+
+        for order in trade['open_orders'] or []:
+            entry = order['metatype'] == "ENTRY"
+
+            if entry and not trade['active']:
+                long = order['direction'].upper() == "LONG"
+                void = order['void_price']
+                if void is not None and (
+                        (long and low <= void) or (not long and high >= void)):
+                    self.cancel_trade(
+                        events, trade, "void price " + str(void))
+                    return
+
+            if (order['status'] == "UNFILLED" and
+                    entry != trade['active'] and
+                    self.order_reached(order, high, low)):
+                order['status'] = "TRIGGERED"
+                self.logger.debug(
+                    "Trade " + str(trade['trade_id']) + " " +
+                    order['metatype'] + " triggered at " +
+                    str(order['price']) + ".")
+
+    def order_reached(self, order, high, low):
+        """
+        Return true if a bar with the given high and low reaches the order.
+
+        Market orders are always reached. Buy stops trigger at or above their
+        price and sell stops at or below, buy limits fill at or below their
+        price and sell limits at or above.
+        """
+
+        order_type = order['order_type'].upper()
+        if order_type == "MARKET" or order['price'] is None:
+            return True
+
+        long = order['direction'].upper() == "LONG"
+        if order_type.startswith("STOP"):
+            return high >= order['price'] if long else low <= order['price']
+        return low <= order['price'] if long else high >= order['price']
+
+    def cancel_trade(self, events, trade, reason):
+        """
+        Cancel all open orders of an unpositioned trade, queue the
+        cancellations for the broker and remove the trade from the
+        instrument index.
+        """
+
+        for order in trade['open_orders']:
+            order['status'] = "CANCELLED"
+            events.put(OrderEvent(dict(order)))
+        trade['open_orders'] = []
+        trade['active'] = False
+        self.unindex_trade(trade)
+
+        self.logger.debug(
+            "Trade " + str(trade['trade_id']) + " cancelled: " + reason + ".")
+
+    def update_equity(self):
+        """
+        Update portfolio value, peak value and drawdown from running totals.
+        """
+
+        funds = self.pf['initial_funds']
+        value = funds + self.r_pnl_total + self.u_pnl_total
+        peak = max(self.pf.get('peak_value', value), value)
+
+        self.pf['current_value'] = value
+        self.pf['peak_value'] = peak
+
+        # Without funds the value is P&L alone, so a percentage drawdown
+        # from its peak would be meaningless.
+        if funds > 0:
+            self.pf['current_drawdown'] = (peak - value) / peak * 100
+        else:
+            self.pf['current_drawdown'] = 0
 
     def load_portfolio(self, ID=1):
         """
@@ -203,6 +503,10 @@ class Portfolio:
         portfolio = self.db_other['portfolio'].find_one({"id": ID}, {"_id": 0})
 
         if portfolio:
+            if self.initial_funds and not portfolio['initial_funds']:
+                portfolio['initial_funds'] = self.initial_funds
+                portfolio['peak_value'] = max(
+                    portfolio['peak_value'], self.initial_funds)
             self.verify_portfolio_state(portfolio)
             return portfolio
 
@@ -210,8 +514,9 @@ class Portfolio:
             empty_portfolio = {
                 'id': ID,
                 'start_date': int(time.time()),
-                'initial_funds': 0,
-                'current_value': 0,
+                'initial_funds': self.initial_funds or 0,
+                'current_value': self.initial_funds or 0,
+                'peak_value': self.initial_funds or 0,
                 'current_drawdown': 0,
                 'trades': [],
                 'model_allocations': {  # Equal allocation by default.
@@ -220,6 +525,7 @@ class Portfolio:
                 'max_correlated_trades': self.MAX_CORRELATED_TRADES,
                 'max_accepted_drawdown': self.MAX_ACCEPTED_DRAWDOWN,
                 'max_simultaneous_positions': self.MAX_SIMULTANEOUS_POSITIONS,
+                'max_total_exposure': self.MAX_TOTAL_EXPOSURE,
                 'default_stop': self.DEFAULT_STOP}
 
             self.save_porfolio(empty_portfolio)
@@ -228,21 +534,58 @@ class Portfolio:
     def verify_portfolio_state(self, portfolio):
         """
         Check stored portfolio data matches actual positions and orders.
+
+        Venue positions and open orders are read from each exchange once,
+        from the private websocket mirror where available. Stored open orders
+        no longer live at the venue are dropped, and net positions that do
+        not match the stored trades are logged.
         """
 
-        trades = self.db_other['trades'].find({"active": "True"}, {"_id": 0})
+        trades = [
+            t for t in portfolio['trades'] if t['active'] or t['open_orders']]
 
-        # If trades marked active exist (in DB), check their orders and
-        # positions match actual trade state, update portfoilio if disparate.
         if trades:
             self.logger.debug("Verifying trade records match trade state.")
-            for venue in [trade['venue'] for trade in trades]:
-
-                print("Fetched positions and orders.")
-                positions = self.exchanges[venue].get_positions()
-                orders = self.exchanges[venue].get_orders()
 
-                # TODO: state checking.
+            for venue in set(t['venue'] for t in trades):
+                if not isinstance(
+                        self.exchanges.get(venue), TradingExchange):
+                    continue
+                try:
+                    positions = self.exchanges[venue].get_positions() or []
+                    orders = self.exchanges[venue].get_orders() or []
+                except Exception as e:
+                    self.logger.debug(
+                        "Could not fetch " + venue + " account state: " +
+                        str(e))
+                    continue
+
+                live_ids = set(o.get('clOrdID') for o in orders)
+                net = {}
+
+                for trade in [t for t in trades if t['venue'] == venue]:
+                    for order in list(trade['open_orders']):
+                        if order['order_id'] not in live_ids:
+                            self.logger.debug(
+                                "Order " + order['order_id'] +
+                                " not open at " + venue + ", removed.")
+                            trade['open_orders'].remove(order)
+
+                    position = trade.get('position')
+                    if position:
+                        sign = 1 if position['direction'] == "LONG" else -1
+                        net[trade['symbol']] = net.get(
+                            trade['symbol'], 0) + sign * position['size']
+
+                actual = {
+                    p['symbol']: p.get('currentQty') or 0 for p in positions}
+                for symbol in set(net) | set(actual):
+                    if round(net.get(symbol, 0)) != actual.get(symbol, 0):
+                        self.logger.debug(
+                            venue + " " + symbol + " position " +
+                            str(actual.get(symbol, 0)) +
+                            " does not match stored trades " +
+                            str(net.get(symbol, 0)) + ".")
 
         self.save_porfolio(portfolio)
         self.logger.debug("Portfolio verification complete.")
@@ -267,21 +610,102 @@ class Portfolio:
         Return true if the new signal would be within risk limits if traded.
         """
 
-        # TODO: Finish after signal > order > fill logic is done.
+        open_count = sum(len(t) for t in self.trade_index.values())
+
+        max_positions = self.pf.get(
+            'max_simultaneous_positions', self.MAX_SIMULTANEOUS_POSITIONS)
+        if open_count >= max_positions:
+            self.logger.debug(
+                "Signal rejected: " + str(open_count) +
+                " trades already open.")
+            return False
+
+        max_drawdown = self.pf.get(
+            'max_accepted_drawdown', self.MAX_ACCEPTED_DRAWDOWN)
+        if self.pf['current_drawdown'] >= max_drawdown:
+            self.logger.debug(
+                "Signal rejected: drawdown " +
+                str(self.pf['current_drawdown']) + "% exceeds limit.")
+            return False
+
+        max_exposure = self.pf.get(
+            'max_total_exposure', self.MAX_TOTAL_EXPOSURE)
+        exposure = sum(
+            self.calculate_exposure(trade)
+            for trades in self.trade_index.values()
+            for trade in trades.values())
+        if exposure >= max_exposure:
+            self.logger.debug(
+                "Signal rejected: " + str(round(exposure, 2)) +
+                "% of portfolio value already at risk.")
+            return False
+
+        if self.correlated((signal['venue'], signal['symbol'])):
+            self.logger.debug(
+                "Signal rejected: " + signal['symbol'] +
+                " correlated with open trades.")
+            return False
 
         return True
 
+    def open_trades(self):
+        """
+        Return trade dicts that are positioned or have unfilled orders.
+        """
+
+        return [
+            t for t in self.pf['trades'] if t['active'] or t['open_orders']]
+
     def calculate_exposure(self, trade):
         """
-        Calculate the currect capital at risk for the given trade.
+        Calculate the current capital at risk for the given trade, from its
+        position if it has one, otherwise from its pending entry.
+
+        Args:
+            trade: trade dict.
+
+        Returns:
+            exposure: percentage of current portfolio value lost if the
+            trade is stopped out (float).
+
+        Raises:
+            None.
         """
-        pass
+
+        if not self.pf['current_value']:
+            return 0
+
+        orders = trade['open_orders'] or []
+        stops = [o for o in orders if o['metatype'] == "STOP"]
+        if not stops:
+            return 0
+
+        position = trade.get('position')
+        if position and position['size']:
+            size, entry = position['size'], position['entry_price']
+        else:
+            entries = [o for o in orders if o['metatype'] == "ENTRY"]
+            if not entries:
+                return 0
+            size, entry = entries[0]['size'], entries[0]['price']
+
+        at_risk = size * abs(stops[0]['price'] - entry) / entry
+
+        return at_risk / self.pf['current_value'] * 100
 
     def correlated(self, instrument):
         """
-        Return true if any active trades are correlated with 'instrument'.
+        Return true if the number of open trades correlated with 'instrument'
+        (a (venue, symbol) tuple) has reached the correlated trade limit.
         """
-        pass
+
+        max_correlated = self.pf.get(
+            'max_correlated_trades', self.MAX_CORRELATED_TRADES)
+        others = [
+            key for key, trades in self.trade_index.items()
+            for _ in trades]
+
+        return self.risk.count_correlated(instrument, others) >= max_correlated
 
     def calculate_stop_price(self, signal):
         """
@@ -295,7 +719,8 @@ class Portfolio:
 
         return stop
 
-    def calculate_position_size(self, stop, entry):
+    def calculate_position_size(self, stop, entry, instrument=None,
+                                direction="LONG"):
         """
         Find appropriate position size for the given parameters.
         """
@@ -309,9 +734,13 @@ class Portfolio:
 
             return abs(position_size)
 
-        # TOOD: Kelly criteron risk management.
+        # Kelly criterion, using the risk engine's cached return statistics.
         elif self.RISK_PER_TRADE.upper() == "KELLY":
-            pass
+
+            account_size = self.pf['current_value']
+            fraction = self.risk.kelly_fraction(instrument, direction)
+
+            return abs(account_size * fraction)
 
     def fees(self, trade):
         """
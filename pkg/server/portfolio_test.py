@@ -0,0 +1,288 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from portfolio import Portfolio
+from trade_types import SingleInstrumentTrade, Order
+from event_types import MarketEvent, FillEvent, RejectEvent
+import unittest
+import logging
+import queue
+
+class StubCursor(list):
+    def sort(self, key):
+        return self
+
+class StubCollection:
+    def __init__(self):
+        self.rows = []
+
+    def find(self, query):
+        return StubCursor(self.rows)
+
+    def find_one(self, query, projection=None):
+        return None
+
+    def replace_one(self, query, row, upsert=False):
+        return type("Result", (), {"acknowledged": True})
+
+class StubDB(dict):
+    def __missing__(self, name):
+        self[name] = StubCollection()
+        return self[name]
+
+class StubExchange:
+    def __init__(self, name, symbols):
+        self.name = name
+        self.symbols = symbols
+
+    def get_name(self):
+        return self.name
+
+    def get_symbols(self):
+        return self.symbols
+
+class StubModel:
+    def get_name(self):
+        return "model"
+
+def make_order(trade_id, n, direction, price, order_type, metatype,
+               void_price=None, symbol="XBTUSD"):
+    return Order(
+        logging.getLogger(__name__), trade_id, None,
+        str(trade_id) + "-" + str(n), direction, 100, price, order_type,
+        metatype, void_price, False, metatype != "ENTRY", False,
+        venue="BitMEX", symbol=symbol).get_order_dict()
+
+def bar(symbol, high, low, close, timestamp=0):
+    return {'symbol': symbol, 'timestamp': timestamp, 'open': close,
+            'high': high, 'low': low, 'close': close, 'volume': 1}
+
+class TestPortfolio(unittest.TestCase):
+
+    def setUp(self):
+        self.exchange = StubExchange("BitMEX", ["XBTUSD", "ETHUSD"])
+        self.portfolio = self.make_portfolio(1000)
+        self.events = queue.Queue(0)
+
+    def make_portfolio(self, funds=None):
+        return Portfolio(
+            [self.exchange], logging.getLogger(__name__), StubDB(), None,
+            [StubModel()], initial_funds=funds)
+
+    def add_trade(self, trade_id, orders, symbol="XBTUSD", position=None):
+        trade = SingleInstrumentTrade(
+            logging.getLogger(__name__), "BitMEX", symbol, "model",
+            position, orders, None)
+        trade.trade_id = trade_id
+        trade_dict = trade.get_trade_dict()
+        trade_dict['active'] = position is not None
+        self.portfolio.pf['trades'].append(trade_dict)
+        self.portfolio.index_trade(trade_dict)
+        return trade_dict
+
+    def position(self, trade_id, direction, size, price):
+        return {'trade_id': trade_id, 'direction': direction,
+                'leverage': 1, 'liquidation': None, 'size': size,
+                'entry_price': price}
+
+    def price(self, symbol, high, low, close):
+        self.portfolio.update_price(self.events, MarketEvent(
+            self.exchange, bar(symbol, high, low, close)))
+
+    def test_revalue_trade(self):
+        long = self.add_trade(1, [], position=self.position(
+            1, "LONG", 100, 1000))
+        short = self.add_trade(2, [], position=self.position(
+            2, "SHORT", 50, 1000))
+
+        self.portfolio.revalue_trade(long, 1100)
+        self.portfolio.revalue_trade(short, 1100)
+        self.assertAlmostEqual(long['u_pnl'], 10)
+        self.assertAlmostEqual(short['u_pnl'], -5)
+        self.assertAlmostEqual(self.portfolio.u_pnl_total, 5)
+
+        # Revaluing replaces, rather than adds to, the previous value.
+        self.portfolio.revalue_trade(long, 900)
+        self.assertAlmostEqual(long['u_pnl'], -10)
+        self.assertAlmostEqual(self.portfolio.u_pnl_total, -15)
+
+    def test_update_price_by_instrument(self):
+        xbt = self.add_trade(1, [], position=self.position(
+            1, "LONG", 100, 1000))
+        eth = self.add_trade(2, [], "ETHUSD", self.position(
+            2, "LONG", 100, 100))
+
+        self.price("ETHUSD", 110, 110, 110)
+        self.assertEqual(xbt['u_pnl'], 0)
+        self.assertAlmostEqual(eth['u_pnl'], 10)
+        self.assertAlmostEqual(self.portfolio.pf['current_value'], 1010)
+
+    def test_equity_and_drawdown(self):
+        self.add_trade(1, [], position=self.position(1, "LONG", 1000, 100))
+
+        self.price("XBTUSD", 110, 110, 110)
+        self.assertAlmostEqual(self.portfolio.pf['current_value'], 1100)
+        self.assertAlmostEqual(self.portfolio.pf['peak_value'], 1100)
+        self.assertEqual(self.portfolio.pf['current_drawdown'], 0)
+
+        self.price("XBTUSD", 99, 99, 99)
+        self.assertAlmostEqual(self.portfolio.pf['current_value'], 990)
+        self.assertAlmostEqual(self.portfolio.pf['peak_value'], 1100)
+        self.assertAlmostEqual(self.portfolio.pf['current_drawdown'], 10)
+
+    def test_drawdown_without_funds(self):
+        self.portfolio = self.make_portfolio()
+        self.add_trade(1, [], position=self.position(1, "LONG", 1000, 100))
+
+        self.price("XBTUSD", 110, 110, 110)
+        self.price("XBTUSD", 105, 105, 105)
+        self.assertAlmostEqual(self.portfolio.pf['current_value'], 50)
+        self.assertEqual(self.portfolio.pf['current_drawdown'], 0)
+
+    def test_fill_realises_pnl(self):
+        stop = make_order(1, 2, "SHORT", 900, "STOP_MARKET", "STOP")
+        trade = self.add_trade(1, [stop], position=self.position(
+            1, "LONG", 100, 1000))
+
+        self.portfolio.new_fill(self.events, FillEvent(
+            0, "XBTUSD", "BitMEX", 100, "SHORT", 100, 0, 1100, stop))
+        self.assertIsNone(trade['position'])
+        self.assertAlmostEqual(trade['r_pnl'], 10)
+        self.assertAlmostEqual(self.portfolio.pf['current_value'], 1010)
+
+    def test_exit_triggers(self):
+        orders = [
+            make_order(1, 2, "SHORT", 900, "STOP_MARKET", "STOP"),
+            make_order(1, 3, "SHORT", 1100, "LIMIT", "TAKE_PROFIT"),
+            make_order(1, 4, "SHORT", 1200, "LIMIT", "TAKE_PROFIT")]
+        self.add_trade(1, orders, position=self.position(
+            1, "LONG", 100, 1000))
+
+        self.price("XBTUSD", 1050, 950, 1000)
+        self.assertEqual([o['status'] for o in orders], ["UNFILLED"] * 3)
+
+        self.price("XBTUSD", 1150, 890, 1000)
+        self.assertEqual(
+            [o['status'] for o in orders],
+            ["TRIGGERED", "TRIGGERED", "UNFILLED"])
+
+    def test_short_exit_triggers(self):
+        orders = [
+            make_order(1, 2, "LONG", 1100, "STOP_LIMIT", "STOP"),
+            make_order(1, 3, "LONG", 900, "LIMIT", "TAKE_PROFIT")]
+        self.add_trade(1, orders, position=self.position(
+            1, "SHORT", 100, 1000))
+
+        self.price("XBTUSD", 1100, 1000, 1050)
+        self.assertEqual(
+            [o['status'] for o in orders], ["TRIGGERED", "UNFILLED"])
+
+    def test_entry_triggers(self):
+        limit = [make_order(1, 1, "LONG", 950, "LIMIT", "ENTRY"),
+                 make_order(1, 2, "SHORT", 900, "STOP_MARKET", "STOP")]
+        stop = [make_order(2, 1, "LONG", 1050, "STOP_MARKET", "ENTRY"),
+                make_order(2, 2, "SHORT", 1000, "STOP_MARKET", "STOP")]
+        market = [make_order(3, 1, "SHORT", None, "MARKET", "ENTRY")]
+        for trade_id, orders in enumerate((limit, stop, market), 1):
+            self.add_trade(trade_id, orders)
+
+        self.price("XBTUSD", 1060, 990, 1000)
+
+        # Exits wait for the position, so only entries are triggered.
+        self.assertEqual([o['status'] for o in limit],
+                         ["UNFILLED", "UNFILLED"])
+        self.assertEqual([o['status'] for o in stop],
+                         ["TRIGGERED", "UNFILLED"])
+        self.assertEqual(market[0]['status'], "TRIGGERED")
+
+    def test_void_price_cancels(self):
+        orders = [make_order(1, 1, "LONG", 1050, "STOP_MARKET", "ENTRY", 900),
+                  make_order(1, 2, "SHORT", 900, "STOP_MARKET", "STOP")]
+        trade = self.add_trade(1, orders)
+
+        self.price("XBTUSD", 1000, 890, 950)
+        self.assertEqual(trade['open_orders'], [])
+        self.assertFalse(trade['active'])
+        self.assertNotIn(("BitMEX", "XBTUSD"), self.portfolio.trade_index)
+        cancelled = [self.events.get().order_id for _ in range(2)]
+        self.assertEqual(cancelled, ["1-1", "1-2"])
+
+    def test_rejected_entry(self):
+        orders = [make_order(1, 1, "LONG", 1050, "STOP_MARKET", "ENTRY"),
+                  make_order(1, 2, "SHORT", 900, "STOP_MARKET", "STOP")]
+        trade = self.add_trade(1, orders)
+
+        self.portfolio.order_rejected(
+            self.events, RejectEvent(dict(orders[0]), "rejected"))
+        self.assertEqual(trade['open_orders'], [])
+        self.assertNotIn(("BitMEX", "XBTUSD"), self.portfolio.trade_index)
+        self.assertEqual(self.events.get().order_id, "1-2")
+
+    def test_rejected_exit(self):
+        orders = [make_order(1, 2, "SHORT", 900, "STOP_MARKET", "STOP"),
+                  make_order(1, 3, "SHORT", 1100, "LIMIT", "TAKE_PROFIT")]
+        trade = self.add_trade(1, orders, position=self.position(
+            1, "LONG", 100, 1000))
+
+        # The position stays open with its remaining orders.
+        self.portfolio.order_rejected(
+            self.events, RejectEvent(dict(orders[0]), "rejected"))
+        self.assertEqual(
+            [o['order_id'] for o in trade['open_orders']], ["1-3"])
+        self.assertIn(1, self.portfolio.trade_index[("BitMEX", "XBTUSD")])
+        self.assertTrue(self.events.empty())
+
+    def test_position_limit_from_index(self):
+        self.portfolio.pf['max_simultaneous_positions'] = 1
+        signal = {'venue': "BitMEX", 'symbol': "XBTUSD"}
+
+        # Trades outside the index, such as closed ones, are not counted.
+        stale = self.add_trade(1, [])
+        self.portfolio.unindex_trade(stale)
+        self.assertTrue(self.portfolio.within_risk_limits(signal))
+
+        self.add_trade(2, [make_order(2, 1, "LONG", 950, "LIMIT", "ENTRY")])
+        self.assertFalse(self.portfolio.within_risk_limits(signal))
+
+    def test_exposure_limit(self):
+        self.portfolio.pf['max_total_exposure'] = 2
+        signal = {'venue': "BitMEX", 'symbol': "XBTUSD"}
+
+        pending = self.add_trade(1, [
+            make_order(1, 1, "LONG", 1000, "LIMIT", "ENTRY"),
+            make_order(1, 2, "SHORT", 900, "STOP_MARKET", "STOP")])
+        self.assertAlmostEqual(self.portfolio.calculate_exposure(pending), 1)
+        self.assertTrue(self.portfolio.within_risk_limits(signal))
+
+        # A positioned trade is at risk from its entry price to its stop.
+        positioned = self.add_trade(2, [
+            make_order(2, 2, "SHORT", 800, "STOP_MARKET", "STOP")],
+            position=self.position(2, "LONG", 100, 1000))
+        self.assertAlmostEqual(
+            self.portfolio.calculate_exposure(positioned), 2)
+        self.assertFalse(self.portfolio.within_risk_limits(signal))
+
+if __name__ == '__main__':
+    unittest.main()
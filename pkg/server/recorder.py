@@ -0,0 +1,267 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from clock import SimulatedClock
+from bitmex_ws import Bitmex_WS
+from threading import Lock
+import struct
+import gzip
+import mmap
+import zlib
+import time
+import os
+
+# Frame header: receive epoch timestamp (float64), payload length (uint32).
+FRAME = struct.Struct('<dI')
+
+# Leading bytes of a gzip member: magic number and deflate method.
+MEMBER_START = b'\x1f\x8b\x08'
+
+# Compressed bytes decompressed at a time when reading.
+CHUNK_SIZE = 2 ** 20
+
+class Recorder:
+    """
+    Appends raw websocket frames with their receive timestamps to a gzip
+    file. Each session appends a new gzip member, so recordings can be
+    extended, and a session is readable up to its last flush after a crash.
+    """
+
+    FLUSH_INTERVAL = 1      # Seconds between flushes to disk.
+
+    def __init__(self, path):
+        self.path = path
+        self.file = gzip.open(path, 'ab')
+        self.lock = Lock()
+        self.last_flush = time.time()
+
+    def write(self, received: float, msg):
+        """
+        Append one frame.
+
+        Args:
+            received: receive epoch timestamp (float).
+            msg: raw frame (string or bytes).
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+        data = msg.encode('utf8') if isinstance(msg, str) else msg
+        with self.lock:
+            self.file.write(FRAME.pack(received, len(data)) + data)
+            if received - self.last_flush >= self.FLUSH_INTERVAL:
+                self.file.flush()
+                self.last_flush = received
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+def read_recording(path):
+    """
+    Yield (receive timestamp, raw frame string) tuples from a recording.
+
+    Each session's gzip member is decompressed separately. A member cut
+    short by a crash yields its complete frames, then reading resumes at the
+    next member, so sessions appended after the crash are still read.
+    """
+
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            start = 0
+            while start < len(raw):
+                end = yield from read_member(raw, start)
+                if end is None:
+                    end = raw.find(MEMBER_START, start + 1)
+                    if end < 0:
+                        return
+                start = end
+
+def read_member(raw, start):
+    """
+    Yield the frames of the gzip member at offset start of raw.
+
+    Returns:
+        Offset of the next member, or None if the member is truncated or
+        corrupt.
+    """
+
+    member = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    buffer = b''
+    pos = start
+    while not member.eof:
+        if pos >= len(raw):
+            return None
+        chunk_start = pos
+        chunk = raw[pos:pos + CHUNK_SIZE]
+        pos += len(chunk)
+        state = member.copy()
+        try:
+            buffer += member.decompress(chunk)
+        except zlib.error:
+            # A member cut short runs into the next one, keep what
+            # decompresses up to the next member's header.
+            boundary = raw.find(MEMBER_START, chunk_start + 1, pos)
+            if boundary > 0:
+                try:
+                    buffer += state.decompress(raw[chunk_start:boundary])
+                except zlib.error:
+                    pass
+            yield from read_frames(buffer)
+            return None
+        buffer = yield from read_frames(buffer)
+
+    return pos - len(member.unused_data)
+
+def read_frames(buffer):
+    """
+    Yield the complete frames in buffer.
+
+    Returns:
+        The trailing partial frame (bytes).
+    """
+
+    offset = 0
+    while len(buffer) - offset >= FRAME.size:
+        received, length = FRAME.unpack_from(buffer, offset)
+        end = offset + FRAME.size + length
+        if end > len(buffer):
+            break
+        yield received, buffer[offset + FRAME.size:end].decode('utf8')
+        offset = end
+
+    return buffer[offset:]
+
+class ReplaySocket:
+    """
+    Stands in for the WebSocketApp during replay, discarding sends.
+    """
+
+    sock = None
+
+    def send(self, msg):
+        pass
+
+    def close(self):
+        pass
+
+class Replay_WS(Bitmex_WS):
+    """
+    Bitmex_WS fed from a recording rather than a live connection.
+    """
+
+    def __init__(self, logger, symbols, channels):
+        super().__init__(logger, symbols, channels, None, None, None,
+                         connect=False)
+        self.ws = ReplaySocket()
+
+    def connected(self):
+        return True
+
+class Replayer:
+    """
+    Feeds a recording through Bitmex_WS.on_message and Bitmex.parse_ticks
+    using a simulated clock set from the frame receive timestamps.
+
+    At speed=None frames are replayed as fast as possible; otherwise the
+    replay sleeps to keep pace with the recording, scaled by speed (1 is real
+    time). At each minute boundary parse_ticks is run for the minute just
+    completed, exactly as the live server does one second into the minute,
+    once for every minute elapsed when frames are minutes apart.
+    """
+
+    def __init__(self, logger, path, speed=None):
+        self.logger = logger
+        self.path = path
+        self.speed = speed
+
+    def run(self, exchange, on_bars=None):
+        """
+        Replay the recording into exchange, whose ws must be a Replay_WS.
+
+        Args:
+            exchange: Bitmex exchange object constructed with ws=Replay_WS.
+            on_bars: optional function(timestamp, bars) called with the
+                exchange's new bars after each minute is parsed.
+
+        Returns:
+            Replay statistics (dict).
+
+        Raises:
+            None.
+        """
+
+        ws = exchange.ws
+        clock = SimulatedClock()
+        exchange.set_clock(clock)
+        frames = 0
+        minutes = 0
+        minute = None
+        first = None
+        start = time.time()
+        cpu_start = time.process_time()
+
+        for received, msg in read_recording(self.path):
+            if first is None:
+                first = received
+
+            if self.speed:
+                delay = (received - first) / self.speed - (time.time() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            # Close each minute elapsed before handling this frame, null bars
+            # included for minutes without frames.
+            current = int(received) // 60
+            if minute is not None:
+                for elapsed in range(minute + 1, current + 1):
+                    clock.set(elapsed * 60 + 1)
+                    exchange.parse_ticks()
+                    minutes += 1
+                    if on_bars:
+                        on_bars(clock.time(), exchange.get_new_bars())
+            minute = current
+            clock.set(received)
+
+            ws.on_message(ws.ws, msg)
+            frames += 1
+
+        elapsed = time.time() - start
+        cpu = time.process_time() - cpu_start
+        stats = {
+            'frames': frames,
+            'minutes': minutes,
+            'elapsed': elapsed,
+            'cpu': cpu,
+            'us_per_frame': cpu / frames * 1e6 if frames else None}
+        self.logger.debug("Replay complete: " + str(stats))
+
+        return stats
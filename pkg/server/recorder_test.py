@@ -0,0 +1,161 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from recorder import Recorder, Replayer, Replay_WS, read_recording
+from bitmex import Bitmex
+import unittest
+import tempfile
+import logging
+import shutil
+import json
+import os
+
+START = 1527811200
+
+def trade_message(action, ticks):
+    return json.dumps({
+        'table': "trade", 'action': action, 'keys': [], 'data': ticks})
+
+def make_tick(n, timestamp, price):
+    second = timestamp - START
+    return {
+        'timestamp': "2018-06-01T00:%02d:%02d.000Z" % (
+            second // 60, second % 60),
+        'symbol': "XBTUSD", 'side': "Buy", 'size': 1, 'price': price,
+        'trdMatchID': str(n)}
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "recording.gz")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def record(self, path, frames):
+        recorder = Recorder(path)
+        for received, msg in frames:
+            recorder.write(received, msg)
+        recorder.close()
+
+    def frames(self, start, n):
+        return [(start + i, '{"n": ' + str(i) + '}') for i in range(n)]
+
+    def test_round_trip(self):
+        frames = self.frames(START, 50) + [(START + 50, b'{"bytes": 1}')]
+        self.record(self.path, frames)
+        self.assertEqual(
+            list(read_recording(self.path)),
+            frames[:-1] + [(START + 50, '{"bytes": 1}')])
+
+    def test_appended_sessions(self):
+        first, second = self.frames(START, 5), self.frames(START + 100, 5)
+        self.record(self.path, first)
+        self.record(self.path, second)
+        self.assertEqual(list(read_recording(self.path)), first + second)
+
+    def test_empty(self):
+        open(self.path, 'wb').close()
+        self.assertEqual(list(read_recording(self.path)), [])
+
+    def test_crashed_session(self):
+        # A session killed without closing is readable to its last flush,
+        # once a second, and sessions appended after it are still read.
+        crashed = os.path.join(self.folder, "crashed.gz")
+        frames = [(START + i / 4, '{"n": ' + str(i) + '}') for i in range(20)]
+        recorder = Recorder(crashed)
+        recorder.last_flush = START
+        for received, msg in frames:
+            recorder.write(received, msg)
+        with open(crashed, 'rb') as f:
+            truncated = f.read()
+        recorder.close()
+
+        later = os.path.join(self.folder, "later.gz")
+        self.record(later, self.frames(START + 100, 3))
+        with open(later, 'rb') as f:
+            complete = f.read()
+
+        with open(self.path, 'wb') as f:
+            f.write(truncated + complete)
+        self.assertEqual(
+            list(read_recording(self.path)),
+            frames[:17] + self.frames(START + 100, 3))
+
+    def test_truncated_frame(self):
+        frames = self.frames(START, 200)
+        self.record(self.path, frames)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for cut in (len(data) // 3, len(data) - 10):
+            with open(self.path, 'wb') as f:
+                f.write(data[:cut])
+            read = list(read_recording(self.path))
+            self.assertEqual(read, frames[:len(read)])
+
+class TestReplayer(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "recording.gz")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_replay_to_bars(self):
+        # Trades in minutes 0 and 1, then nothing until minute 4.
+        recorder = Recorder(self.path)
+        recorder.write(START + 1, trade_message(
+            "partial", [make_tick(0, START, 100)]))
+        ticks = [(1, START + 10, 101), (2, START + 30, 103),
+                 (3, START + 70, 99), (4, START + 245, 104)]
+        for n, timestamp, price in ticks:
+            recorder.write(timestamp + 0.5, trade_message(
+                "insert", [make_tick(n, timestamp, price)]))
+        recorder.close()
+
+        logger = logging.getLogger(__name__)
+        exchange = Bitmex(
+            logger, ws=Replay_WS(logger, ["XBTUSD"], ["trade"]))
+        bars = []
+        stats = Replayer(logger, self.path).run(
+            exchange, lambda now, new: bars.append(new["XBTUSD"][0]))
+
+        # One parse per elapsed minute, the gap minutes as null bars.
+        self.assertEqual(stats['frames'], 5)
+        self.assertEqual(stats['minutes'], 4)
+        self.assertEqual(
+            [b['timestamp'] for b in bars],
+            [START + 60 * (i + 1) for i in range(4)])
+        self.assertEqual(
+            [(b['open'], b['high'], b['low'], b['close']) for b in bars[:2]],
+            [(100, 103, 100, 103), (103, 99, 99, 99)])
+        # The first gap minute carries the last trade, as built live.
+        self.assertEqual([b['volume'] for b in bars], [3, 1, 1, 0])
+        self.assertEqual([b['close'] for b in bars[2:]], [99, None])
+
+if __name__ == '__main__':
+    unittest.main()
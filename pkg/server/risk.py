@@ -0,0 +1,280 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+import numpy as np
+
+class RiskEngine:
+    """
+    Maintains rolling 1 min return statistics for every tracked instrument.
+
+    Returns are held in a fixed-size ring buffer (one row per bar, one column
+    per instrument). Running sums of returns and of their outer products are
+    updated as each bar is committed, so the covariance and correlation
+    matrices are available without rescanning the window. Pre-trade checks
+    read from the cached matrices only.
+    """
+
+    # Number of 1 min bars of returns kept per instrument.
+    WINDOW = 150
+
+    # Absolute correlation at or above which two instruments are correlated.
+    CORRELATION_THRESHOLD = 0.7
+
+    # Upper bound for Kelly position sizing, as a fraction of account value.
+    MAX_KELLY_FRACTION = 1
+
+    # Fraction of the full Kelly bet to take.
+    KELLY_MULTIPLIER = 0.25
+
+    # Standard errors subtracted from the mean return before sizing.
+    KELLY_CONFIDENCE = 2
+
+    def __init__(self, exchanges, logger, window=WINDOW):
+        self.logger = logger
+        self.window = window
+
+        # Column index for each instrument, keyed by (venue, symbol).
+        self.index = {}
+        for exchange in exchanges:
+            for symbol in exchange.get_symbols():
+                self.index[(exchange.get_name(), symbol)] = len(self.index)
+
+        n = len(self.index)
+
+        # Return ring buffer and write position.
+        self.returns = np.zeros((window, n))
+        self.row = 0
+        self.count = 0
+
+        # Running sums over the rows currently in the ring buffer.
+        self.sum = np.zeros(n)
+        self.sum_sq = np.zeros((n, n))
+
+        # Returns for the bar currently being received.
+        self.pending = np.zeros(n)
+        self.pending_ts = None
+        self.last_close = np.full(n, np.nan)
+
+        # Cached statistics, rebuilt lazily after each committed bar.
+        self.mean = np.zeros(n)
+        self.cov = np.zeros((n, n))
+        self.corr = np.identity(n)
+        self.dirty = False
+
+        self.seeded = False
+
+    def update(self, venue: str, symbol: str, timestamp: int, close: float):
+        """
+        Record a new close price for the given instrument.
+
+        Bars for all instruments sharing a timestamp are collected into one
+        pending row, which is committed to the window when the first bar of
+        the next timestamp arrives.
+
+        Args:
+            venue: exchange name (string).
+            symbol: instrument ticker code (string).
+            timestamp: bar epoch timestamp (int).
+            close: bar close price (float), or None for a null bar.
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+        col = self.index.get((venue, symbol))
+        if col is None:
+            return
+
+        if self.pending_ts is not None and timestamp != self.pending_ts:
+            self.commit()
+        self.pending_ts = timestamp
+
+        if close is None:
+            return
+
+        previous = self.last_close[col]
+        if previous == previous and previous != 0:
+            self.pending[col] = close / previous - 1
+        self.last_close[col] = close
+
+    def commit(self):
+        """
+        Move the pending row into the ring buffer and update running sums.
+        """
+
+        old = self.returns[self.row]
+        if self.count == self.window:
+            self.sum -= old
+            self.sum_sq -= np.outer(old, old)
+
+        new = self.pending
+        self.returns[self.row] = new
+        self.sum += new
+        self.sum_sq += np.outer(new, new)
+
+        self.row = (self.row + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        self.pending = np.zeros(len(self.index))
+        self.dirty = True
+
+        # Rebuild sums once per full window to stop float error accumulating.
+        if self.row == 0:
+            self.recalculate_sums()
+
+    def recalculate_sums(self):
+        """
+        Recompute running sums directly from the ring buffer contents.
+        """
+
+        rows = self.returns if self.count == self.window else (
+            self.returns[:self.count])
+        self.sum = rows.sum(axis=0)
+        self.sum_sq = rows.T @ rows
+
+    def seed(self, data: dict):
+        """
+        Populate the return window from existing 1 min bar dataframes.
+
+        Args:
+            data: Strategy dataframe tree, data[venue][symbol][timeframe].
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+        closes = {}
+        for (venue, symbol), col in self.index.items():
+            try:
+                df = data[venue][symbol]["1Min"]
+            except KeyError:
+                continue
+            if df is None or len(df.index) < 2:
+                continue
+            closes[col] = df['close'].values[-(self.window + 1):].astype(float)
+
+        if not closes:
+            return
+
+        # Align the latest return of every instrument on the last loaded row,
+        # instruments with shorter history are zero padded at the start.
+        loaded = max(len(c) - 1 for c in closes.values())
+        rows = np.zeros((self.window, len(self.index)))
+        for col, c in closes.items():
+            rets = np.nan_to_num(c[1:] / c[:-1] - 1)
+            rows[loaded - len(rets):loaded, col] = rets
+            self.last_close[col] = c[-1]
+
+        self.returns = rows
+        self.row = loaded % self.window
+        self.count = loaded
+        self.recalculate_sums()
+        self.dirty = True
+        self.seeded = True
+        self.logger.debug(
+            "Seeded risk engine with " + str(loaded) + " bars.")
+
+    def statistics(self):
+        """
+        Return cached mean vector, covariance and correlation matrices,
+        rebuilding them from the running sums if a bar has been committed
+        since the last call.
+        """
+
+        if self.dirty and self.count > 1:
+            n = self.count
+            self.mean = self.sum / n
+            self.cov = (self.sum_sq - n * np.outer(self.mean, self.mean)) / (
+                n - 1)
+            std = np.sqrt(np.clip(np.diag(self.cov), 0, None))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr = self.cov / np.outer(std, std)
+            corr = np.nan_to_num(corr)
+            np.fill_diagonal(corr, 1)
+            self.corr = corr
+            self.dirty = False
+
+        return self.mean, self.cov, self.corr
+
+    def correlation(self, a: tuple, b: tuple):
+        """
+        Return the rolling return correlation between instruments a and b,
+        where each is a (venue, symbol) tuple. Unknown instruments are only
+        considered correlated with themselves.
+        """
+
+        if a == b:
+            return 1.0
+
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is None or j is None:
+            return 0.0
+
+        return float(self.statistics()[2][i, j])
+
+    def count_correlated(self, instrument: tuple, others: list):
+        """
+        Return the number of instruments in others that are correlated with
+        instrument at or above CORRELATION_THRESHOLD, excluding instrument
+        itself.
+        """
+
+        return sum(
+            1 for i in others if i != instrument and abs(self.correlation(
+                instrument, i)) >= self.CORRELATION_THRESHOLD)
+
+    def kelly_fraction(self, instrument: tuple, direction: str):
+        """
+        Return the fractional Kelly bet for trading instrument in the given
+        direction, clipped to [0, MAX_KELLY_FRACTION].
+
+        The continuous Kelly fraction mean / variance does not depend on the
+        return horizon, but the mean of a window of 1 min returns is mostly
+        noise and its raw ratio is far above 1. The edge is therefore taken
+        as the lower confidence bound of the mean, KELLY_CONFIDENCE standard
+        errors below it, and the result scaled by KELLY_MULTIPLIER. Windows
+        without a significant edge size to 0.
+        """
+
+        i = self.index.get(instrument)
+        if i is None or self.count < 2:
+            return 0.0
+
+        mean, cov, corr = self.statistics()
+        variance = cov[i, i]
+        if variance <= 0:
+            return 0.0
+
+        edge = mean[i] if direction.upper() == "LONG" else -mean[i]
+        edge -= self.KELLY_CONFIDENCE * np.sqrt(variance / self.count)
+        fraction = self.KELLY_MULTIPLIER * edge / variance
+
+        return float(min(max(fraction, 0), self.MAX_KELLY_FRACTION))
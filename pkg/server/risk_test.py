@@ -0,0 +1,150 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+from risk import RiskEngine
+import unittest
+import logging
+import pandas as pd
+import numpy as np
+
+class StubExchange:
+    def __init__(self, name, symbols):
+        self.name = name
+        self.symbols = symbols
+
+    def get_name(self):
+        return self.name
+
+    def get_symbols(self):
+        return self.symbols
+
+def make_engine(window=20):
+    return RiskEngine(
+        [StubExchange("BitMEX", ["XBTUSD", "ETHUSD"]),
+         StubExchange("Binance", ["BTCUSDT"])],
+        logging.getLogger(__name__), window)
+
+def random_closes(rows, cols, seed=0):
+    rng = np.random.default_rng(seed)
+    return 1000 * np.cumprod(1 + rng.normal(0, 0.001, (rows, cols)), axis=0)
+
+class TestRiskEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = make_engine()
+        self.instruments = list(self.engine.index)
+
+    def feed(self, closes, start=0):
+        for bar, row in enumerate(closes):
+            for (venue, symbol), close in zip(self.instruments, row):
+                self.engine.update(venue, symbol, (start + bar) * 60, close)
+
+    def test_statistics(self):
+        # More bars than the window, so the ring buffer wraps.
+        closes = random_closes(57, 3)
+        self.feed(closes)
+        self.engine.commit()
+
+        rets = closes[1:] / closes[:-1] - 1
+        expected = rets[-self.engine.window:]
+        mean, cov, corr = self.engine.statistics()
+        self.assertEqual(self.engine.count, self.engine.window)
+        np.testing.assert_allclose(mean, expected.mean(axis=0), atol=1e-12)
+        np.testing.assert_allclose(cov, np.cov(expected.T), atol=1e-12)
+        np.testing.assert_allclose(corr, np.corrcoef(expected.T), atol=1e-9)
+
+    def test_seed_partial(self):
+        closes = random_closes(6, 3)
+        data = {"BitMEX": {
+            "XBTUSD": {"1Min": pd.DataFrame({'close': closes[:, 0]})},
+            "ETHUSD": {"1Min": pd.DataFrame({'close': closes[2:, 1]})}}}
+        self.engine.seed(data)
+
+        # Only the bars actually loaded count towards the window.
+        self.assertTrue(self.engine.seeded)
+        self.assertEqual(self.engine.count, 5)
+        rets = closes[1:] / closes[:-1] - 1
+        mean = self.engine.statistics()[0]
+        self.assertAlmostEqual(mean[0], rets[:, 0].mean())
+        self.assertAlmostEqual(mean[1], rets[2:, 1].sum() / 5)
+        self.assertEqual(mean[2], 0)
+
+        # New bars continue after the seeded rows.
+        self.engine.update("BitMEX", "XBTUSD", 0, closes[-1, 0] * 1.01)
+        self.engine.commit()
+        self.assertEqual(self.engine.count, 6)
+        self.assertAlmostEqual(self.engine.returns[5, 0], 0.01)
+
+    def test_seed_empty(self):
+        self.engine.seed({})
+        self.assertFalse(self.engine.seeded)
+        self.assertEqual(self.engine.count, 0)
+
+    def test_count_correlated(self):
+        rng = np.random.default_rng(1)
+        base = rng.normal(0, 0.001, 60)
+        noise = rng.normal(0, 0.001, 60)
+        rets = np.stack([base, base * 2, noise], axis=1)
+        self.feed(1000 * np.cumprod(1 + rets, axis=0))
+        self.engine.commit()
+
+        xbt, eth, btc = self.instruments
+        self.assertGreater(self.engine.correlation(xbt, eth), 0.99)
+        self.assertEqual(self.engine.count_correlated(xbt, [eth, btc]), 1)
+
+        # The instrument itself is not counted against its own trades.
+        self.assertEqual(self.engine.count_correlated(xbt, [xbt]), 0)
+        self.assertEqual(self.engine.count_correlated(xbt, [xbt, eth]), 1)
+
+    def test_kelly_noise(self):
+        # Driftless returns have no significant edge and size to 0.
+        self.feed(random_closes(21, 3, seed=2))
+        self.engine.commit()
+        for instrument in self.instruments:
+            for direction in ("LONG", "SHORT"):
+                self.assertEqual(
+                    self.engine.kelly_fraction(instrument, direction), 0)
+
+    def test_kelly_edge(self):
+        rng = np.random.default_rng(3)
+        rets = 0.001 + rng.normal(0, 0.0001, (21, 3))
+        self.feed(1000 * np.cumprod(1 + rets, axis=0))
+        self.engine.commit()
+        mean, cov, corr = self.engine.statistics()
+
+        edge = mean[0] - self.engine.KELLY_CONFIDENCE * np.sqrt(
+            cov[0, 0] / self.engine.count)
+        expected = self.engine.KELLY_MULTIPLIER * edge / cov[0, 0]
+        fraction = self.engine.kelly_fraction(self.instruments[0], "LONG")
+        self.assertAlmostEqual(
+            fraction, min(expected, self.engine.MAX_KELLY_FRACTION))
+        self.assertEqual(
+            self.engine.kelly_fraction(self.instruments[0], "SHORT"), 0)
+
+    def test_kelly_unknown(self):
+        self.assertEqual(
+            self.engine.kelly_fraction(("FTX", "BTC-PERP"), "LONG"), 0)
+
+if __name__ == '__main__':
+    unittest.main()
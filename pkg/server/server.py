@@ -30,13 +30,15 @@ from strategy import Strategy
 from threading import Thread
 from data import Datahandler
 from broker import Broker
+from clock import RealTimeClock
+from consolidate import Consolidator
+from binance import Binance
 from bitmex import Bitmex
-from time import sleep
+from ftx import FTX
 import pymongo
 import time
 import logging
 import queue
-import datetime
 
 class Server:
     """
@@ -65,15 +67,35 @@ class Server:
     # Mins between recurring data diagnostics.
     DIAG_DELAY = 45
 
+    # Exchange classes by venue name, and the venues to connect to.
+    VENUES = {"BitMEX": Bitmex, "Binance": Binance, "FTX": FTX}
+    EXCHANGES = ["BitMEX"]
+
+    # Composite symbols built across venues, e.g.
+    # {"BTCUSD": {"BitMEX": "XBTUSD", "Binance": "BTCUSDT"}}.
+    COMPOSITES = {}
+
+    # Account value in order size units, base for portfolio drawdown.
+    # Leave None to keep the stored value.
+    INITIAL_FUNDS = None
+
     def __init__(self):
 
         # Set False for forward testing.
         self.live_trading = True
 
+        # Set True to fill orders with the local simulator on live data.
+        self.paper_trading = False
+
+        # Time source for all components, replace to backtest or replay.
+        self.clock = RealTimeClock()
+
         self.log_level = logging.DEBUG
         self.logger = self.setup_logger()
 
         self.exchanges = self.load_exchanges(self.logger)
+        for exchange in self.exchanges:
+            exchange.set_clock(self.clock)
 
         # Database.
         self.db_client = MongoClient(
@@ -92,17 +114,26 @@ class Server:
         self.events = queue.Queue(0)
 
         # Producer/consumer worker classes.
+        self.consolidator = (
+            Consolidator(self.logger, self.COMPOSITES)
+            if self.COMPOSITES else None)
+
         self.data = Datahandler(self.exchanges, self.logger, self.db_prices,
-                                self.db_client)
+                                self.db_client, self.clock, self.consolidator)
 
-        self.strategy = Strategy(self.exchanges, self.logger, self.db_prices,
+        # Strategies treat the composite feed as another venue.
+        feeds = self.exchanges + (
+            [self.consolidator] if self.consolidator else [])
+        self.strategy = Strategy(feeds, self.logger, self.db_prices,
                                  self.db_other, self.db_client)
 
         self.portfolio = Portfolio(self.exchanges, self.logger, self.db_other,
-                                   self.db_client, self.strategy.models)
+                                   self.db_client, self.strategy.models,
+                                   self.strategy.data, self.INITIAL_FUNDS)
 
         self.broker = Broker(self.exchanges, self.logger, self.db_other,
-                             self.db_client, self.live_trading)
+                             self.db_client, self.live_trading,
+                             self.paper_trading)
 
         # Processing performance tracking variables.
         self.start_processing = None
@@ -126,7 +157,7 @@ class Server:
 
         self.cycle_count = 0
 
-        sleep(self.seconds_til_next_minute())
+        self.clock.sleep(self.seconds_til_next_minute())
 
         while True:
             if self.live_trading:
@@ -158,7 +189,7 @@ class Server:
                         thread.start()
 
                 # Sleep til the next minute begins.
-                sleep(self.seconds_til_next_minute())
+                self.clock.sleep(self.seconds_til_next_minute())
                 self.cycle_count += 1
 
             # Update data w/o delay when backtesting, no diagnostics.
@@ -193,6 +224,7 @@ class Server:
                 self.strategy.trim_datasets()
                 self.strategy.save_new_signals_to_db()
                 self.portfolio.save_new_trades_to_db()
+                self.portfolio.save_porfolio(self.portfolio.pf)
 
                 break
 
@@ -205,6 +237,7 @@ class Server:
                         self.strategy.new_data(
                             self.events, event, self.cycle_count)
                         self.portfolio.update_price(self.events, event)
+                        self.broker.update_price(self.events, event)
 
                     # Order Event generation.
                     elif event.type == "SIGNAL":
@@ -221,6 +254,10 @@ class Server:
                         self.logger.debug("Start processing fills.")
                         self.portfolio.new_fill(self.events, event)
 
+                    # Orders the venue did not accept.
+                    elif event.type == "REJECT":
+                        self.portfolio.order_rejected(self.events, event)
+
                 # Finished all jobs in queue.
                 self.events.task_done()
 
@@ -270,27 +307,24 @@ class Server:
             None.
         """
 
-        exchanges = []
-        exchanges.append(Bitmex(logger))
+        exchanges = [self.VENUES[name](logger) for name in self.EXCHANGES]
         self.logger.debug("Initialised exchanges.")
 
         return exchanges
 
-    def seconds_til_next_minute(self: int):
+    def seconds_til_next_minute(self):
         """
         Args:
             None.
 
         Returns:
-            Number of second to next minute (int).
+            Number of seconds to next minute (float).
 
         Raises:
             None.
         """
 
-        now = datetime.datetime.utcnow().second
-        delay = 60 - now
-        return delay
+        return self.clock.seconds_til_next_minute()
 
     def check_db_connection(self):
         """
@@ -0,0 +1,303 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from event_types import FillEvent
+import itertools
+import heapq
+
+class OrderBook:
+    """
+    Resting simulated orders for a single instrument.
+
+    Limit and stop orders are held in price-sorted heaps so each bar only
+    touches the orders it crosses. Cancelled orders are removed from the
+    live order map and skipped lazily when they reach the top of a heap.
+    """
+
+    def __init__(self):
+        self.bids = []          # Buy limits, (-price, seq, order_id).
+        self.asks = []          # Sell limits, (price, seq, order_id).
+        self.buy_stops = []     # Buy stops, (price, seq, order_id).
+        self.sell_stops = []    # Sell stops, (-price, seq, order_id).
+        self.market = []        # Market orders awaiting the next price.
+        self.orders = {}        # Live orders, {order_id: order dict}.
+        self.position = 0       # Net filled size, negative if short.
+        self.last_price = None
+
+    def add(self, order, seq):
+        """
+        Add order dict to the relevant queue.
+        """
+
+        self.orders[order['order_id']] = order
+        buy = order['direction'].upper() == "LONG"
+        price = order['price']
+        order_type = order['order_type'].upper()
+
+        if order_type == "MARKET":
+            self.market.append(order['order_id'])
+        elif order_type.startswith("STOP"):
+            if buy:
+                heapq.heappush(self.buy_stops, (price, seq, order['order_id']))
+            else:
+                heapq.heappush(
+                    self.sell_stops, (-price, seq, order['order_id']))
+        elif buy:
+            heapq.heappush(self.bids, (-price, seq, order['order_id']))
+        else:
+            heapq.heappush(self.asks, (price, seq, order['order_id']))
+
+    def pop_crossed(self, heap, crossed):
+        """
+        Pop and return live orders from the top of heap while crossed(key)
+        is true for the heap key.
+        """
+
+        popped = []
+        while heap and crossed(heap[0][0]):
+            order = self.orders.pop(heapq.heappop(heap)[2], None)
+            if order is not None:
+                popped.append(order)
+        return popped
+
+    def __len__(self):
+        return len(self.orders)
+
+class MatchingEngine:
+    """
+    Local order matching simulator for backtesting and paper trading.
+
+    Fills order dicts against the incoming bar or tick stream, per venue and
+    symbol. Market and triggered stop orders fill as taker with slippage,
+    resting limit orders fill at their limit price as maker. Post-only
+    orders that would cross on submission are cancelled, reduce-only orders
+    are clipped to the simulated net position. Reduce-only stops and limits
+    crossed before any position exists are retried after the bar's entries
+    have filled, and otherwise left resting.
+    """
+
+    TAKER_FEE = 0.075       # Percentage of fill value.
+    MAKER_FEE = -0.025      # Percentage of fill value, negative is a rebate.
+    SLIPPAGE = 0.05         # Percentage price slippage for taker fills.
+
+    def __init__(self, logger, taker_fee=TAKER_FEE, maker_fee=MAKER_FEE,
+                 slippage=SLIPPAGE):
+        self.logger = logger
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.slippage = slippage
+
+        # Order books, {(venue, symbol): OrderBook}.
+        self.books = {}
+        self.seq = itertools.count()
+
+    def get_book(self, venue, symbol):
+        key = (venue, symbol)
+        if key not in self.books:
+            self.books[key] = OrderBook()
+        return self.books[key]
+
+    def submit(self, order):
+        """
+        Accept a new order dict.
+
+        Args:
+            order: order dict, must include venue, symbol and order_id.
+
+        Returns:
+            True if the order is resting or queued, False if rejected.
+
+        Raises:
+            None.
+        """
+
+        book = self.get_book(order['venue'], order['symbol'])
+        order = dict(order)
+
+        # Reject post-only limits that would take liquidity.
+        if (order['post_only'] and book.last_price is not None and
+                order['order_type'].upper() == "LIMIT"):
+            buy = order['direction'].upper() == "LONG"
+            if ((buy and order['price'] >= book.last_price) or
+                    (not buy and order['price'] <= book.last_price)):
+                self.logger.debug(
+                    "Post-only order " + str(order['order_id']) +
+                    " would cross, cancelled.")
+                return False
+
+        book.add(order, next(self.seq))
+        return True
+
+    def cancel(self, venue, symbol, order_id):
+        """
+        Cancel a resting order. Returns True if the order was live.
+        """
+
+        book = self.books.get((venue, symbol))
+        if book is None:
+            return False
+        return book.orders.pop(order_id, None) is not None
+
+    def match_tick(self, venue, tick):
+        """
+        Match resting orders for the tick's symbol against a single trade.
+        """
+
+        price = tick['price']
+        return self.match(venue, tick['symbol'], tick['timestamp'],
+                          price, price, price)
+
+    def match_bar(self, venue, bar):
+        """
+        Match resting orders for the bar's symbol against its price range.
+        """
+
+        if bar['close'] is None:
+            return []
+        return self.match(venue, bar['symbol'], bar['timestamp'], bar['open'],
+                          bar['high'], bar['low'], bar['close'])
+
+    def match(self, venue, symbol, timestamp, open_price, high, low,
+              close=None):
+        """
+        Fill all orders crossed by the given price range.
+
+        Args:
+            venue: exchange name (string).
+            symbol: instrument ticker code (string).
+            timestamp: epoch timestamp of the bar or tick.
+            open_price, high, low, close: prices for the period.
+
+        Returns:
+            fills: list of FillEvents, in execution order.
+
+        Raises:
+            None.
+        """
+
+        book = self.books.get((venue, symbol))
+        fills = []
+
+        if book is not None and book.orders:
+            slip = self.slippage / 100
+
+            # Market orders fill at the first available price.
+            queued, book.market = book.market, []
+            for order_id in queued:
+                order = book.orders.pop(order_id, None)
+                if order is not None:
+                    buy = order['direction'].upper() == "LONG"
+                    price = open_price * (1 + slip if buy else 1 - slip)
+                    if not self.fill(fills, book, order, price, timestamp,
+                                     False):
+                        self.logger.debug(
+                            "Reduce-only order " + str(order['order_id']) +
+                            " has no position to reduce, cancelled.")
+
+            # Reduce-only orders crossed before their entry has filled in
+            # this bar, [(order, price, maker)].
+            deferred = []
+
+            # Stops trigger through their price, or at the open if gapped.
+            for order in book.pop_crossed(book.buy_stops, lambda p: p <= high):
+                self.trigger_stop(fills, deferred, book, order, max(
+                    order['price'], open_price) * (1 + slip), timestamp)
+            for order in book.pop_crossed(
+                    book.sell_stops, lambda p: -p >= low):
+                self.trigger_stop(fills, deferred, book, order, min(
+                    order['price'], open_price) * (1 - slip), timestamp)
+
+            # Limits fill at their price, or better if the bar opened beyond.
+            for order in book.pop_crossed(book.bids, lambda p: -p >= low):
+                price = min(order['price'], open_price)
+                maker = open_price >= order['price']
+                if not self.fill(fills, book, order, price, timestamp, maker):
+                    deferred.append((order, price, maker))
+            for order in book.pop_crossed(book.asks, lambda p: p <= high):
+                price = max(order['price'], open_price)
+                maker = open_price <= order['price']
+                if not self.fill(fills, book, order, price, timestamp, maker):
+                    deferred.append((order, price, maker))
+
+            # Retry reduce-only orders against entries filled in the bar,
+            # rest them again if there is still no position to reduce.
+            for order, price, maker in deferred:
+                if not self.fill(fills, book, order, price, timestamp, maker):
+                    self.logger.debug(
+                        "Reduce-only order " + str(order['order_id']) +
+                        " has no position to reduce, resting.")
+                    book.add(order, next(self.seq))
+
+        if book is None:
+            book = self.get_book(venue, symbol)
+        book.last_price = close if close is not None else open_price
+
+        return fills
+
+    def trigger_stop(self, fills, deferred, book, order, price, timestamp):
+        """
+        Fill a triggered stop market order, or rest a triggered stop limit.
+        Reduce-only stops without a position are appended to deferred.
+        """
+
+        if order['order_type'].upper() == "STOP_LIMIT":
+            order['order_type'] = "LIMIT"
+            book.add(order, next(self.seq))
+        elif not self.fill(fills, book, order, price, timestamp, False):
+            deferred.append((order, price, False))
+
+    def fill(self, fills, book, order, price, timestamp, maker):
+        """
+        Execute order at price, update the net position and append a
+        FillEvent to fills.
+
+        Returns:
+            False if a reduce-only order has no position to reduce, in
+            which case nothing is filled, otherwise True.
+        """
+
+        buy = order['direction'].upper() == "LONG"
+        size = order['size']
+
+        # Reduce-only orders may only shrink an opposing position.
+        if order['reduce_only']:
+            if (buy and book.position >= 0) or (
+                    not buy and book.position <= 0):
+                return False
+            size = min(size, abs(book.position))
+
+        book.position += size if buy else -size
+
+        # Portfolio sizes orders in notional account denomination, so the
+        # fill value is the size and fees are a percentage of it, as in
+        # FillEvent.
+        value = size
+        fee = self.maker_fee if maker else self.taker_fee
+        order['status'] = "FILLED"
+
+        fills.append(FillEvent(
+            timestamp, order['symbol'], order['venue'], size,
+            order['direction'], value, (value / 100) * fee, price, order))
+        return True
@@ -0,0 +1,153 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from simulator import MatchingEngine
+import unittest
+import logging
+
+def make_order(order_id, direction, order_type, price, size,
+               reduce_only=False, post_only=False):
+    return {
+        'order_id': order_id, 'venue': "BitMEX", 'symbol': "XBTUSD",
+        'direction': direction, 'order_type': order_type, 'price': price,
+        'size': size, 'reduce_only': reduce_only, 'post_only': post_only,
+        'status': "NEW"}
+
+def make_bar(open_price, high, low, close, timestamp=0):
+    return {
+        'symbol': "XBTUSD", 'timestamp': timestamp, 'open': open_price,
+        'high': high, 'low': low, 'close': close}
+
+class TestMatchingEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = MatchingEngine(
+            logging.getLogger(__name__), taker_fee=0.075, maker_fee=-0.025,
+            slippage=0)
+
+    def test_limit_fill(self):
+        self.engine.submit(make_order("a", "LONG", "LIMIT", 100, 1000))
+        self.assertEqual(
+            self.engine.match_bar("BitMEX", make_bar(105, 106, 101, 104)), [])
+
+        fills = self.engine.match_bar("BitMEX", make_bar(102, 103, 99, 100))
+        self.assertEqual(len(fills), 1)
+        self.assertEqual(fills[0].price, 100)
+        self.assertEqual(fills[0].quantity, 1000)
+
+        # Resting limits are makers and earn the rebate.
+        self.assertAlmostEqual(fills[0].commission, 1000 / 100 * -0.025)
+
+    def test_gapped_limit_is_taker(self):
+        self.engine.submit(make_order("a", "LONG", "LIMIT", 100, 1000))
+        fills = self.engine.match_bar("BitMEX", make_bar(95, 97, 94, 96))
+        self.assertEqual(fills[0].price, 95)
+        self.assertAlmostEqual(fills[0].commission, 1000 / 100 * 0.075)
+
+    def test_market_fee_and_slippage(self):
+        engine = MatchingEngine(logging.getLogger(__name__), slippage=0.1)
+        engine.submit(make_order("a", "SHORT", "MARKET", None, 2000))
+        fills = engine.match_bar("BitMEX", make_bar(100, 101, 99, 100))
+
+        # Fees are TAKER_FEE percent of the notional fill value.
+        self.assertAlmostEqual(fills[0].price, 100 * (1 - 0.001))
+        self.assertEqual(fills[0].fill_cost, 2000)
+        self.assertAlmostEqual(fills[0].commission, 2000 * 0.075 / 100)
+
+    def test_stop_gapped(self):
+        self.engine.submit(make_order("a", "SHORT", "STOP_MARKET", 100, 10))
+        fills = self.engine.match_bar("BitMEX", make_bar(97, 98, 95, 96))
+        self.assertEqual(fills[0].price, 97)
+
+    def test_post_only_cross(self):
+        self.engine.match_bar("BitMEX", make_bar(100, 101, 99, 100))
+        self.assertFalse(self.engine.submit(
+            make_order("a", "LONG", "LIMIT", 101, 10, post_only=True)))
+        self.assertTrue(self.engine.submit(
+            make_order("b", "LONG", "LIMIT", 99, 10, post_only=True)))
+
+    def test_reduce_only_clipped(self):
+        self.engine.submit(make_order("a", "LONG", "MARKET", None, 10))
+        self.engine.match_bar("BitMEX", make_bar(100, 101, 99, 100))
+        self.engine.submit(
+            make_order("b", "SHORT", "LIMIT", 102, 50, reduce_only=True))
+        fills = self.engine.match_bar("BitMEX", make_bar(100, 103, 99, 102))
+        self.assertEqual(fills[0].quantity, 10)
+        self.assertEqual(self.engine.get_book("BitMEX", "XBTUSD").position, 0)
+
+    def test_reduce_only_rests_without_position(self):
+        self.engine.submit(
+            make_order("a", "SHORT", "STOP_MARKET", 95, 10, reduce_only=True))
+        self.assertEqual(
+            self.engine.match_bar("BitMEX", make_bar(100, 101, 94, 96)), [])
+        book = self.engine.get_book("BitMEX", "XBTUSD")
+        self.assertIn("a", book.orders)
+
+        # Once the entry fills, the resting stop protects it.
+        self.engine.submit(make_order("b", "LONG", "MARKET", None, 10))
+        fills = self.engine.match_bar("BitMEX", make_bar(96, 97, 93, 94))
+        self.assertEqual([f.order_dict['order_id'] for f in fills],
+                         ["b", "a"])
+        self.assertEqual(book.position, 0)
+        self.assertEqual(len(book), 0)
+
+    def test_same_bar_entry_and_stop(self):
+        self.engine.submit(make_order("entry", "LONG", "LIMIT", 100, 10))
+        self.engine.submit(
+            make_order("stop", "SHORT", "STOP_MARKET", 98, 10,
+                       reduce_only=True))
+        self.engine.submit(
+            make_order("target", "SHORT", "LIMIT", 110, 10,
+                       reduce_only=True))
+
+        # Entry and stop both cross in one bar, the stop closes the entry.
+        fills = self.engine.match_bar("BitMEX", make_bar(101, 102, 97, 98))
+        self.assertEqual([f.order_dict['order_id'] for f in fills],
+                         ["entry", "stop"])
+        self.assertEqual(fills[1].price, 98)
+        book = self.engine.get_book("BitMEX", "XBTUSD")
+        self.assertEqual(book.position, 0)
+
+        # The target was not crossed and remains resting.
+        self.assertEqual(list(book.orders), ["target"])
+
+    def test_same_bar_entry_and_target(self):
+        self.engine.submit(
+            make_order("target", "SHORT", "LIMIT", 104, 10, reduce_only=True))
+        self.engine.submit(make_order("entry", "LONG", "LIMIT", 100, 10))
+        fills = self.engine.match_bar("BitMEX", make_bar(101, 105, 99, 104))
+        self.assertEqual([f.order_dict['order_id'] for f in fills],
+                         ["entry", "target"])
+        self.assertEqual(self.engine.get_book("BitMEX", "XBTUSD").position, 0)
+
+    def test_cancel(self):
+        self.engine.submit(make_order("a", "LONG", "LIMIT", 100, 10))
+        self.assertTrue(self.engine.cancel("BitMEX", "XBTUSD", "a"))
+        self.assertFalse(self.engine.cancel("BitMEX", "XBTUSD", "a"))
+        self.assertEqual(
+            self.engine.match_bar("BitMEX", make_bar(99, 100, 98, 99)), [])
+
+if __name__ == '__main__':
+    unittest.main()
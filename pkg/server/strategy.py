@@ -27,6 +27,7 @@ from datetime import date, datetime, timedelta
 from model import EMACrossTestingOnly
 from pymongo import MongoClient, errors
 from features import Features
+from orderbook import OrderBook
 from dateutil import parser
 import pandas as pd
 import calendar
@@ -57,6 +58,9 @@ class Strategy:
         'open': 'first', 'high': 'max', 'low': 'min',
         'close': 'last', 'volume': 'sum'}
 
+    # Order book feature columns, present only for venues streaming L2.
+    BOOK_RESAMPLE_KEY = OrderBook.AGGREGATES
+
     MINUTE_TIMEFRAMES = [1, 3, 5, 15, 30]
     HOUR_TIMEFRAMES = [1, 2, 3, 4, 6, 8, 12, 16]
     DAY_TIMEFRAMES = [1, 2, 3, 4, 7, 14, 28]
@@ -203,7 +207,7 @@ class Strategy:
         for model in self.models:
 
             venue = exc.get_name()
-            inst = model.get_instruments()[venue][sym]
+            inst = model.get_instruments().get(venue, {}).get(sym)
 
             if inst == sym:
                 self.logger.debug(
@@ -233,7 +237,7 @@ class Strategy:
 
             lb = model.get_lookback()
             venue = exc.get_name()
-            inst = model.get_instruments()[venue][sym]
+            inst = model.get_instruments().get(venue, {}).get(sym)
 
             # Check if model is applicable to the event.
             if inst == sym:
@@ -293,7 +297,7 @@ class Strategy:
         for model in self.models:
 
             venue = exc.get_name()
-            inst = model.get_instruments()[venue][sym]
+            inst = model.get_instruments().get(venue, {}).get(sym)
 
             if inst == sym:
                 for tf in op_timeframes:
@@ -396,7 +400,7 @@ class Strategy:
         # Downsample 1 min data to target timeframe
         resampled_df = pd.DataFrame()
         try:
-            resampled_df = (df.resample(tf).agg(self.RESAMPLE_KEY))
+            resampled_df = (df.resample(tf).agg(self.resample_key(df)))
         except Exception as exc:
             print("Resampling error", exc)
 
@@ -455,7 +459,7 @@ class Strategy:
         # Downsample 1 min data to target timeframe.
         resampled = pd.DataFrame()
         try:
-            resampled = (df.resample(tf).agg(self.RESAMPLE_KEY))
+            resampled = (df.resample(tf).agg(self.resample_key(df)))
         except Exception as exc:
             print("Resampling error", exc)
 
@@ -466,6 +470,30 @@ class Strategy:
 
         return new_row
 
+    def resample_key(self, df):
+        """
+        Return the resample aggregation for the columns present in df.
+        Order book feature columns are cast to float so null minutes
+        aggregate as NaN.
+
+        Args:
+            df: 1 min bar dataframe.
+
+        Returns:
+            Column aggregation dict for DataFrame.agg().
+
+        Raises:
+            None.
+        """
+
+        key = dict(self.RESAMPLE_KEY)
+        for col, agg in self.BOOK_RESAMPLE_KEY.items():
+            if col in df.columns:
+                df[col] = df[col].astype(float)
+                key[col] = agg
+
+        return key
+
     def remove_element(self, dictionary, element):
         """
         Return a shallow copy of dictionary less the given element.
@@ -0,0 +1,270 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+
+from abc import ABC, abstractmethod
+from threading import Thread, Event
+from time import sleep
+import websocket
+import traceback
+import random
+import time
+
+class WebsocketStream(ABC):
+    """
+    Supervised websocket connection, base class for venue streams.
+
+    A supervisor thread owns the connection and reconnects with bounded
+    exponential backoff and jitter whenever it drops. Keepalive pings are
+    sent by the websocket client, and a watchdog restarts feeds that have
+    gone silent. Outage windows are recorded so subclasses can backfill.
+    """
+
+    # Reconnection backoff bounds (seconds) and random jitter fraction.
+    BACKOFF_MIN = 1
+    BACKOFF_MAX = 60
+    BACKOFF_JITTER = 0.25
+
+    # Connections lasting this long (seconds) reset the backoff delay.
+    STABLE_CONNECTION = 60
+
+    # Keepalive ping interval and pong timeout (seconds).
+    PING_INTERVAL = 15
+    PING_TIMEOUT = 10
+
+    # Feed is considered stale if no message arrives for this long (seconds).
+    STALE_TIMEOUT = 60
+
+    # Seconds connect() waits for the first connection.
+    RECONNECT_TIMEOUT = 10
+
+    def __init__(self, logger, URL, name="Websocket"):
+        self.logger = logger
+        self.URL = URL
+        self.name = name
+
+        # Outage windows as (start, end) epoch timestamps, and the start of
+        # the current outage if disconnected.
+        self.outages = []
+        self.outage_start = None
+
+        self.ws = None
+        self.last_message = time.time()
+        self.opened = Event()
+        self.closing = False
+
+    def connect(self):
+        """
+        Args:
+            None
+
+        Returns:
+            Starts the websocket supervisor and watchdog threads, waits up to
+            RECONNECT_TIMEOUT seconds for the first connection.
+
+        Raises:
+            None.
+        """
+
+        Thread(target=self.supervise, daemon=True).start()
+        Thread(target=self.watchdog, daemon=True).start()
+        self.logger.debug("Started " + self.name + " websocket daemon.")
+
+        if not self.opened.wait(self.RECONNECT_TIMEOUT):
+            self.logger.debug(
+                "Websocket connection timed out, supervisor will retry.")
+
+    def supervise(self):
+        """
+        Runs the websocket, reconnecting with bounded exponential backoff
+        and jitter whenever the connection drops.
+
+        Args:
+            None
+
+        Returns:
+            None, runs until close() is called.
+
+        Raises:
+            None.
+        """
+
+        delay = self.BACKOFF_MIN
+
+        while not self.closing:
+            self.opened.clear()
+            self.ws = websocket.WebSocketApp(
+                self.URL,
+                on_message=lambda ws, msg: self.on_message(ws, msg),
+                on_error=lambda ws, msg: self.on_error(ws, msg),
+                on_close=lambda ws, *args: self.on_close(ws),
+                on_open=lambda ws: self.opened_connection(ws))
+
+            started = time.time()
+            try:
+                self.ws.run_forever(ping_interval=self.PING_INTERVAL,
+                                    ping_timeout=self.PING_TIMEOUT)
+            except Exception:
+                self.logger.debug(traceback.format_exc())
+
+            if self.closing:
+                break
+
+            self.mark_disconnected()
+
+            if time.time() - started > self.STABLE_CONNECTION:
+                delay = self.BACKOFF_MIN
+
+            wait = delay + random.uniform(0, delay * self.BACKOFF_JITTER)
+            self.logger.debug(
+                self.name + " websocket disconnected, reconnecting in " +
+                str(round(wait, 1)) + " seconds.")
+            sleep(wait)
+            delay = min(delay * 2, self.BACKOFF_MAX)
+
+    def watchdog(self):
+        """
+        Closes the websocket if no message has arrived within STALE_TIMEOUT
+        seconds, so the supervisor reconnects a silently stalled feed.
+
+        Args:
+            None
+
+        Returns:
+            None, runs until close() is called.
+
+        Raises:
+            None.
+        """
+
+        while not self.closing:
+            sleep(self.STALE_TIMEOUT / 4)
+            if (self.monitored() and self.connected() and
+                    time.time() - self.last_message > self.STALE_TIMEOUT):
+                self.logger.debug(
+                    self.name + " websocket feed stale, restarting.")
+                self.ws.close()
+
+    def monitored(self):
+        """
+        Returns True if the feed is expected to be continuously active and
+        should be restarted by the watchdog when silent.
+        """
+
+        return True
+
+    def connected(self):
+        """
+        Returns True if the websocket is currently connected.
+        """
+
+        return bool(self.ws and self.ws.sock and self.ws.sock.connected)
+
+    def close(self):
+        """
+        Stops the supervisor and closes the websocket.
+        """
+
+        self.closing = True
+        if self.ws:
+            self.ws.close()
+
+    def mark_disconnected(self):
+        """
+        Records the start of an outage as the time of the last message.
+        """
+
+        if self.outage_start is None:
+            self.outage_start = self.last_message
+
+    def opened_connection(self, ws):
+        """
+        Invoked when the websocket connects. Closes any open outage window,
+        then lets the subclass subscribe via on_open.
+        """
+
+        self.last_message = time.time()
+
+        if self.outage_start is not None:
+            outage = (self.outage_start, self.last_message)
+            self.outages.append(outage)
+            self.outage_start = None
+            self.logger.debug(
+                self.name + " websocket reconnected after " +
+                str(round(outage[1] - outage[0])) + " seconds.")
+            self.on_reconnect(outage)
+
+        self.on_open(ws)
+        self.opened.set()
+
+    def on_reconnect(self, outage):
+        """
+        Invoked after reconnecting with the (start, end) outage window.
+        """
+
+    @abstractmethod
+    def on_open(self, ws):
+        """
+        Invoked when websocket starts. Used to subscribe to channels.
+
+        Args:
+            ws: WebSocketApp object
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+    @abstractmethod
+    def on_message(self, ws, msg):
+        """
+        Handles incoming websocket messages.
+
+        Args:
+            ws: WebSocketApp object
+            msg: message object
+
+        Returns:
+            None.
+
+        Raises:
+            None.
+        """
+
+    def on_error(self, ws, msg):
+        """
+        Invoked when websocket encounters an error. Reconnection is left to
+        the supervisor once the connection closes.
+        """
+
+        self.logger.debug(self.name + " websocket error: " + str(msg))
+
+    def on_close(self, ws):
+        """
+        Invoked when websocket closes.
+        """
+
+        self.logger.debug(self.name + " websocket closed.")
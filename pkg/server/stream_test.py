@@ -0,0 +1,242 @@
+# Copyright (c) 2018 Bhojpur Consulting Private Limited, India. All rights reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+The server is a multi-asset, multi-strategy, event-driven trade execution and
+backtesting platform for trading common markets.
+"""
+from bitmex_ws import Bitmex_WS
+from stream import WebsocketStream
+import stream
+import unittest
+import logging
+import json
+import time
+
+class FakeSocket:
+    connected = True
+
+class FakeApp:
+    """
+    WebSocketApp stand-in whose connections open, then drop immediately.
+    """
+
+    instances = []
+
+    def __init__(self, URL, on_message, on_error, on_close, on_open):
+        self.on_open = on_open
+        self.sock = FakeSocket()
+        self.closed = False
+        FakeApp.instances.append(self)
+
+    def run_forever(self, ping_interval, ping_timeout):
+        self.on_open(self)
+        self.sock = None
+
+    def close(self):
+        self.closed = True
+
+class Stream(WebsocketStream):
+
+    BACKOFF_MIN = 1
+    BACKOFF_MAX = 4
+    BACKOFF_JITTER = 0
+    STALE_TIMEOUT = 0.04
+
+    def __init__(self):
+        super().__init__(logging.getLogger(__name__), "wss://test")
+        self.opens = 0
+        self.reconnects = []
+
+    def on_open(self, ws):
+        self.opens += 1
+        if self.opens == 5:
+            self.closing = True
+
+    def on_message(self, ws, msg):
+        pass
+
+    def on_reconnect(self, outage):
+        self.reconnects.append(outage)
+
+def make_tick(n, second):
+    return {
+        'timestamp': "2020-01-01T00:00:%02d.000Z" % second, 'symbol': "XBTUSD",
+        'side': "Buy", 'size': 1, 'price': 100 + n, 'trdMatchID': str(n)}
+
+def message(action, ticks, table="trade"):
+    return json.dumps({
+        'table': table, 'action': action, 'keys': [], 'data': ticks})
+
+def make_execution(n, second, exec_type="Trade"):
+    return {
+        'timestamp': "2020-01-01T00:00:%02d.000Z" % second, 'symbol': "XBTUSD",
+        'execID': str(n), 'clOrdID': "1-1", 'execType': exec_type,
+        'lastQty': 1, 'lastPx': 100, 'leavesQty': 0}
+
+class TestSupervisor(unittest.TestCase):
+
+    def setUp(self):
+        self.websocket, stream.websocket.WebSocketApp = (
+            stream.websocket.WebSocketApp, FakeApp)
+        self.sleep, stream.sleep = stream.sleep, self.record_sleep
+        self.sleeps = []
+        FakeApp.instances = []
+
+    def tearDown(self):
+        stream.websocket.WebSocketApp = self.websocket
+        stream.sleep = self.sleep
+
+    def record_sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+    def test_reconnect_backoff(self):
+        feed = Stream()
+        feed.supervise()
+
+        # Each drop is followed by a doubling delay, capped at BACKOFF_MAX.
+        self.assertEqual(feed.opens, 5)
+        self.assertEqual(self.sleeps, [1, 2, 4, 4])
+
+        # Every reconnection closes an outage window.
+        self.assertEqual(len(feed.outages), 4)
+        self.assertEqual(feed.reconnects, feed.outages)
+        self.assertIsNone(feed.outage_start)
+        for start, end in feed.outages:
+            self.assertLessEqual(start, end)
+
+    def test_watchdog(self):
+        stream.sleep = self.sleep
+        feed = Stream()
+        feed.ws = FakeApp(None, None, None, None, None)
+
+        # A silent feed is closed for the supervisor to reconnect.
+        feed.last_message = time.time() - 1
+        thread = stream.Thread(target=feed.watchdog, daemon=True)
+        thread.start()
+        time.sleep(Stream.STALE_TIMEOUT)
+        feed.closing = True
+        thread.join()
+        self.assertTrue(feed.ws.closed)
+
+    def test_watchdog_active(self):
+        stream.sleep = self.sleep
+        feed = Stream()
+        feed.ws = FakeApp(None, None, None, None, None)
+        feed.last_message = time.time() + 10
+        thread = stream.Thread(target=feed.watchdog, daemon=True)
+        thread.start()
+        time.sleep(Stream.STALE_TIMEOUT)
+        feed.closing = True
+        thread.join()
+        self.assertFalse(feed.ws.closed)
+
+class TestBackfill(unittest.TestCase):
+
+    def setUp(self):
+        self.ws = Bitmex_WS(
+            logging.getLogger(__name__), ["XBTUSD"], ["trade"], None, None,
+            None, trade_callback=self.callback, connect=False)
+        self.ws.backfill = self.backfill
+        self.received = []
+        self.requests = []
+        self.history = [make_tick(i, i) for i in range(10)]
+
+    def callback(self, ticks):
+        self.received += ticks
+
+    def backfill(self, symbol, start, end):
+        self.requests.append((symbol, start, end))
+        return self.history[3:8]
+
+    def test_partial_merge(self):
+        self.ws.on_message(None, message("partial", self.history[:4]))
+        self.ws.on_message(None, message("insert", self.history[4:5]))
+        self.assertEqual(self.received, self.history[4:5])
+
+        # The partial after reconnecting only repeats the latest trades.
+        self.ws.on_reconnect((1000, 1030))
+        self.ws.on_message(None, message("partial", self.history[8:10]))
+
+        self.assertEqual(self.ws.data['trade'], self.history)
+        self.assertEqual(self.ws.pending_backfill, [])
+        self.assertEqual(self.requests, [("XBTUSD", 1000, 1030)])
+        self.assertEqual(
+            sorted(i['trdMatchID'] for i in self.received),
+            [str(i) for i in range(4, 10)])
+
+    def test_max_backfill(self):
+        self.ws.on_message(None, message("partial", self.history[:1]))
+        self.ws.on_reconnect((0, 5000))
+        self.ws.on_message(None, message("partial", []))
+        self.assertEqual(
+            self.requests, [("XBTUSD", 5000 - Bitmex_WS.MAX_BACKFILL, 5000)])
+        self.assertEqual(
+            self.ws.data['trade'], self.history[:1] + self.history[3:8])
+
+    def test_failed_backfill(self):
+        def fail(symbol, start, end):
+            raise Exception("Request failed.")
+
+        self.ws.backfill = fail
+        self.ws.on_message(None, message("partial", self.history[:2]))
+        self.ws.on_reconnect((0, 10))
+        self.ws.on_message(None, message("partial", self.history[5:6]))
+        self.assertEqual(
+            self.ws.data['trade'], self.history[:2] + self.history[5:6])
+
+class TestExecutions(unittest.TestCase):
+
+    def setUp(self):
+        self.ws = Bitmex_WS(
+            logging.getLogger(__name__), ["XBTUSD"], ["trade"], None, None,
+            None, connect=False)
+
+    def stream(self, action, executions):
+        self.ws.on_message(None, message(action, executions, "execution"))
+        return [i['execID'] for i in self.ws.get_executions()]
+
+    def test_reconnect_partial(self):
+        history = [make_execution(0, 0, "New"), make_execution(1, 1)]
+
+        # Executions before the session started are not fills to process.
+        self.assertEqual(self.stream("partial", history), [])
+        self.assertEqual(
+            self.stream("insert", [make_execution(2, 2)]), ["2"])
+
+        # Fills during the outage arrive only in the new partial, possibly
+        # alongside executions already received.
+        partial = [make_execution(i, i) for i in (5, 1, 2, 3)] + [
+            make_execution(4, 4, "Canceled")]
+        self.assertEqual(self.stream("partial", partial), ["3", "5"])
+        self.assertEqual(
+            sorted(i['execID'] for i in self.ws.data['execution']),
+            [str(i) for i in range(6)])
+
+        # A repeated partial adds nothing.
+        self.assertEqual(self.stream("partial", partial), [])
+
+    def test_empty_first_partial(self):
+        self.assertEqual(self.stream("partial", []), [])
+        self.assertEqual(
+            self.stream("partial", [make_execution(1, 1)]), ["1"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -71,7 +71,7 @@ class SingleInstrumentTrade(Trade):
         self.venue = venue                  # Exchange or broker traded with.
         self.symbol = symbol                # Instrument ticker code.
         self.model = model                  # Name of triggerstrategy.
-        self.position = position            # Position object, if positioned.
+        self.position = position            # Position dict, if positioned.
         self.open_orders = open_orders      # List of active orders.
         self.filled_orders = filled_orders  # List of filled orders.
 
@@ -89,6 +89,7 @@ class SingleInstrumentTrade(Trade):
             'exposure': self.exposure,
             'venue': self.venue,
             'symbol': self.symbol,
+            'position': self.position,
             'open_orders': self.open_orders,
             'filled_orders': self.filled_orders}
 
@@ -126,7 +127,8 @@ class Order:
 
     def __init__(self, logger, trade_id, p_id, order_id, direction,
                  size, price, order_type, metatype, void_price, trail,
-                 reduce_only, post_only, status="UNFILLED"):
+                 reduce_only, post_only, status="UNFILLED", venue=None,
+                 symbol=None):
         self.logger = logger
         self.trade_id = trade_id        # Parent trade ID.
         self.position_id = p_id         # Related position ID.
@@ -141,6 +143,8 @@ class Order:
         self.reduce_only = reduce_only  # True or False.
         self.post_only = post_only      # True of False.
         self.status = status            # FILLED, UNFILLED, PARTIAL.
+        self.venue = venue              # Exchange or broker traded with.
+        self.symbol = symbol            # Instrument ticker code.
 
     def get_order_dict(self):
         """
@@ -159,7 +163,9 @@ class Order:
             'trail': self.trail,
             'reduce_only': self.reduce_only,
             'post_only': self.post_only,
-            'status': self.status}
+            'status': self.status,
+            'venue': self.venue,
+            'symbol': self.symbol}
 
 class TradeID():
     """